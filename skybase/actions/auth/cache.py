@@ -0,0 +1,89 @@
+import time
+import threading
+import collections
+
+# process-wide cache of auth db lookups made on every REST request.  entries expire after
+# ttl seconds and all are dropped when auth db generation changes; generation bumped by
+# every user write in any process and read from auth db at most every check interval
+# seconds.  writes within process invalidate immediately.
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_CHECK_INTERVAL = 1
+
+
+class AuthCache(object):
+    '''
+    least recently used cache of auth lookups bounded by entry count and ttl, validated
+    against auth db generation.  cached values shared between callers and must be
+    treated as read-only.
+    '''
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._generation = None
+        self._checked = 0
+        # incremented whenever entries dropped; loads started before drop not stored
+        self._epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _clear(self):
+        self._entries.clear()
+        self._epoch += 1
+
+    def get(self, key, loader, read_generation):
+        '''
+        return cached value for key, calling loader on miss; errors raised by loader not cached
+        '''
+        now = time.time()
+        with self._lock:
+            if now - self._checked >= self.check_interval:
+                generation = read_generation()
+                if generation != self._generation:
+                    self._clear()
+                    self._generation = generation
+                self._checked = now
+
+            entry = self._entries.pop(key, None)
+            if entry and entry[0] > now:
+                # most recently used entries kept at end
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            epoch = self._epoch
+
+        value = loader()
+
+        with self._lock:
+            if epoch == self._epoch:
+                self._entries[key] = (now + self.ttl, value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        # drop all entries and re-read generation on next lookup
+        with self._lock:
+            self._clear()
+            self._checked = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'generation': self._generation,
+            }
+
+
+# shared by all auth lookups within process
+auth_cache = AuthCache()
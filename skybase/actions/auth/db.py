@@ -1,11 +1,22 @@
 from skybase.auth import schema
 from skybase.exceptions import SkyBaseRoleNotFoundError, SkyBaseUserIdNotFoundError, SkyBaseError
+from skybase.actions.auth.cache import auth_cache
 
 
 def get_db_conn():
     return schema.connect()
 
 
+def read_generation():
+    db_conn = get_db_conn()
+    return db_conn.execute('select value from generation where id = 1').fetchone()[0]
+
+
+def bump_generation(db_conn):
+    # within caller's write transaction; auth caches in all processes drop entries
+    db_conn.execute('update generation set value = value + 1 where id = 1')
+
+
 def create_user(user_id, key, email, role):
     db_conn = get_db_conn()
 
@@ -13,22 +24,31 @@ def create_user(user_id, key, email, role):
         "select count(id) from credentials where user_id = ?", (user_id,))
 
     count = cursor.fetchone()[0]
-    if count > 0:
-        if not email or email == '':
-            db_conn.execute("update credentials set key = ? where user_id = ?",
-                            (key, user_id))
+
+    # connection shared within thread; failed write rolled back rather than left open
+    with db_conn:
+        if count > 0:
+            if not email or email == '':
+                db_conn.execute("update credentials set key = ? where user_id = ?",
+                                (key, user_id))
+            else:
+                db_conn.execute("update credentials set key = ?, email = ? where user_id = ?",
+                                (key, user_id, email))
         else:
-            db_conn.execute("update credentials set key = ?, email = ? where user_id = ?",
-                            (key, user_id, email))
-    else:
-        db_conn.execute(
-            "insert or replace into credentials (user_id,key, email) values (?,?,?)",
-            (user_id, key, email))
-    db_conn.commit()
+            db_conn.execute(
+                "insert or replace into credentials (user_id,key, email) values (?,?,?)",
+                (user_id, key, email))
+        bump_generation(db_conn)
+    auth_cache.invalidate()
     upsert_userroles(user_id, role)
 
 
 def lookup_key(user_id):
+    # secret key served from process auth cache
+    return auth_cache.get(('key', user_id), lambda: _lookup_key(user_id), read_generation)
+
+
+def _lookup_key(user_id):
     db_conn = get_db_conn()
 
     cursor = db_conn.execute("select key from credentials where user_id = ?",
@@ -40,6 +60,11 @@ def lookup_key(user_id):
     return result[0]
 
 def find_user_roles(user_id):
+    # role names served from process auth cache
+    return list(auth_cache.get(('roles', user_id), lambda: tuple(_find_user_roles(user_id)), read_generation))
+
+
+def _find_user_roles(user_id):
     db_conn = get_db_conn()
 
     with db_conn:
@@ -58,9 +83,11 @@ def find_user_roles(user_id):
 
 def delete_user(user_id):
     db_conn = get_db_conn()
-    db_conn.execute("delete from userroles where user_id = (select id from credentials where user_id = ?)", (user_id,))
-    db_conn.execute("delete from credentials where user_id = ?", (user_id,))
-    db_conn.commit()
+    with db_conn:
+        db_conn.execute("delete from userroles where user_id = (select id from credentials where user_id = ?)", (user_id,))
+        db_conn.execute("delete from credentials where user_id = ?", (user_id,))
+        bump_generation(db_conn)
+    auth_cache.invalidate()
 
 
 def unique_user_exists(user_id):
@@ -105,7 +132,9 @@ def upsert_userroles(user_id, role):
                 update_result = c.execute('update userroles set role_id = ? where user_id = ?', (roleid[0], userid[0]))
                 if update_result.rowcount == 0:
                     c.execute("insert into userroles (user_id, role_id) values (?,?)", (userid[0], roleid[0]))
+                bump_generation(db_conn)
                 db_conn.commit()
+                auth_cache.invalidate()
             else:
                 raise SkyBaseUserIdNotFoundError(user_id + 'not found')
         else:
@@ -124,7 +153,9 @@ def update_email(user_id, user_email):
         else:
             c.execute("update credentials set email = ? where user_id = ?",
                             (user_email, user_id))
+            bump_generation(db_conn)
             db_conn.commit()
+            auth_cache.invalidate()
 
 
 def reset_password(user_id, user_password):
@@ -139,7 +170,9 @@ def reset_password(user_id, user_password):
         else:
             c.execute("update credentials set key = ? where user_id = ?",
                             (user_password, user_id))
+            bump_generation(db_conn)
             db_conn.commit()
+            auth_cache.invalidate()
 
 
 def list_users(user_id='%'):
@@ -150,3 +183,94 @@ def list_users(user_id='%'):
                   (user_id,))
         records= c.fetchall()
         return records
+
+
+if __name__ == '__main__':
+    # auth lookups per second against temporary auth db: connection per lookup as before
+    # pooling, pooled and cached:
+    #   python -m skybase.actions.auth.db [lookups] [threads]
+    import os
+    import sys
+    import time
+    import shutil
+    import sqlite3
+    import tempfile
+    import threading
+    from skybase import config as sky_cfg
+
+    LOOKUPS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    USERS = 1000
+    # handful of keys used by automation
+    ACTIVE_USERS = 10
+
+    temp_dir = tempfile.mkdtemp()
+    with open(os.path.join(temp_dir, 'runner.yaml'), 'w') as f:
+        f.write('dbauth:\n  dir: {0}\n  filename: auth.sq3\n'.format(temp_dir))
+    sky_cfg.CONFIG_DIR = temp_dir
+
+    for n in range(USERS):
+        create_user('user{0}'.format(n), 'key{0}'.format(n), 'user{0}@example.com'.format(n), 'developer')
+
+    def unpooled_lookup_key(user_id):
+        # as before pooling: config lookup, db file stat and new connection per call
+        db_file = schema.get_db_file()
+        os.path.isfile(db_file)
+        db_conn = sqlite3.connect(db_file)
+        return db_conn.execute("select key from credentials where user_id = ?", (user_id,)).fetchone()[0]
+
+    def run(lookup, threads, users=USERS):
+        def reader(offset):
+            for n in range(offset, LOOKUPS, threads):
+                assert lookup('user{0}'.format(n % users)) == 'key{0}'.format(n % users)
+            schema.close()
+        workers = [threading.Thread(target=reader, args=(t,)) for t in range(threads)]
+        start = time.time()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return LOOKUPS / (time.time() - start)
+
+    def run_roles(lookup, threads):
+        return run(lambda user_id: lookup(user_id) and 'key' + user_id[4:], threads, ACTIVE_USERS)
+
+    for threads in [1, THREADS]:
+        for name, lookup in [('unpooled', unpooled_lookup_key), ('pooled', _lookup_key)]:
+            print '{0:8} {1:2} threads: {2:.0f} key lookups/s'.format(name, threads, run(lookup, threads))
+        print '{0:8} {1:2} threads: {2:.0f} key lookups/s ({3} keys)'.format(
+            'cached', threads, run(lookup_key, threads, ACTIVE_USERS), ACTIVE_USERS)
+        for name, lookup in [('pooled', _find_user_roles), ('cached', find_user_roles)]:
+            print '{0:8} {1:2} threads: {2:.0f} role lookups/s ({3} users)'.format(
+                name, threads, run_roles(lookup, threads), ACTIVE_USERS)
+
+    # readers continue while user updates written
+    stop = threading.Event()
+    updates = [0]
+    def writer():
+        while not stop.is_set():
+            n = updates[0] % USERS
+            reset_password('user{0}'.format(n), 'key{0}'.format(n))
+            updates[0] += 1
+        schema.close()
+    w = threading.Thread(target=writer)
+    w.start()
+    rate = run(_lookup_key, THREADS)
+    stop.set()
+    w.join()
+    print 'pooled   {0:2} threads with writer: {1:.0f} key lookups/s, {2} updates'.format(THREADS, rate, updates[0])
+
+    # key reset in another process seen by cached lookups within generation check interval
+    lookup_key('user0')
+    pid = os.fork()
+    if pid == 0:
+        reset_password('user0', 'changed')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    start = time.time()
+    while lookup_key('user0') != 'changed':
+        time.sleep(0.01)
+    print 'key reset in other process seen after {0:.2f}s'.format(time.time() - start)
+
+    schema.close_all()
+    shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,751 @@
+import os
+import errno
+import fcntl
+import shutil
+import itertools
+import contextlib
+
+from skybase import config as sky_cfg
+
+from skybase.utils import mkdir_path, basic_timestamp
+from skybase.planet import planet_registry
+from skybase.utils import simple_error_format
+from skybase.utils import yamlio
+import skybase.actions.skycloud
+import skybase.exceptions
+from . import sqlite
+from . import stackindex
+from . import servicelog
+from . import commit
+from . import changes
+from .index import state_index_registry, DEFAULT_REFRESH_INTERVAL
+
+
+DEFAULT_LOG_TAIL = 50
+DEFAULT_CHANGES_MAX_ENTRIES = 100000
+
+# service record version kept in versioned service file; incremented on every write
+RECORD_VERSION_KEY = 'record_version'
+# per-record lock file kept beside service tag directory, which commit may replace
+RECORD_LOCK_SUFFIX = '.record.lock'
+
+
+class PlanetStateDb(object):
+    # planet state record storage backends selected by runner service_state.backend
+    DIRECTORY = 'directory'
+    SQLITE = 'sqlite'
+    BACKENDS = [DIRECTORY, SQLITE]
+
+    def __init__(self, db=None, archive=None, resources=None, runner_cfg=None, backend=None):
+
+        if runner_cfg:
+            self.runner_cfg = runner_cfg
+        else:
+            # initialize runner config from default if not provided
+            self.runner_cfg = sky_cfg.SkyConfig.init_from_file('runner', config_dir=sky_cfg.CONFIG_DIR)
+
+        self.db = db if db else self.runner_cfg.data['service_state']['db']
+        self.archive = archive if archive else self.runner_cfg.data['service_state']['archive']
+        self.resources = resources if resources else self.runner_cfg.data['service_state']['resources']
+
+        # service metadata, blueprint and log always kept in directory layout under db;
+        # stack records stored according to backend
+        self.backend = backend if backend else self.runner_cfg.data['service_state'].get('backend', self.DIRECTORY)
+        self.sqlite_file = self.runner_cfg.data['service_state'].get('sqlite_file')
+
+        # reverse index from provider stack id and launch name to record id (directory backend)
+        self.stack_index = self.runner_cfg.data['service_state'].get(
+            'stack_index', os.path.join(os.path.dirname(os.path.normpath(self.db)), 'STACK_INDEX'))
+
+        # service records staged here before rename into db; must be on same filesystem as db
+        self.staging = self.runner_cfg.data['service_state'].get(
+            'staging', os.path.join(os.path.dirname(os.path.normpath(self.db)), 'STAGING'))
+
+        # change feed of state db mutations; most recent changes_max_entries retained
+        self.changes_file = self.runner_cfg.data['service_state'].get(
+            'changes_file', os.path.join(os.path.dirname(os.path.normpath(self.db)), 'changes.sq3'))
+        self.changes_max_entries = self.runner_cfg.data['service_state'].get(
+            'changes_max_entries', DEFAULT_CHANGES_MAX_ENTRIES)
+
+        # number of most recent service log entries returned by default with service record;
+        # log rotated into archive once log_max_entries exceeded (never if not set)
+        self.log_tail = self.runner_cfg.data['service_state'].get('log_tail', DEFAULT_LOG_TAIL)
+        self.log_max_entries = self.runner_cfg.data['service_state'].get('log_max_entries')
+
+        # seconds between revalidation of in-memory state db index against disk
+        self.index_refresh = self.runner_cfg.data['service_state'].get('index_refresh', DEFAULT_REFRESH_INTERVAL)
+
+        if self.backend not in self.BACKENDS:
+            raise skybase.exceptions.StateDBError('unknown service_state backend: {0}'.format(self.backend))
+
+    @property
+    def index(self):
+        # process-wide in-memory index of directory layout under db
+        return state_index_registry.get(self.db, self.index_refresh)
+
+    def list_stacks(self, service_id):
+        # names of stacks deployed for service id
+        list_stacks_switch = {
+            self.DIRECTORY: lambda: self._list_directory_stacks(service_id),
+            self.SQLITE: lambda: sqlite.list_stacks(self, service_id),
+        }
+        return list_stacks_switch[self.backend]()
+
+    def list_service_ids(self, planet=None, service=None, tag=None):
+        # ids of service records matching planet / service / tag; blank matches all
+        pattern = os.path.join(self.db, planet or '*', service or '*', tag or '*')
+        return [prepare_record_id(self.db, self.resources, path)
+                for path in self.index.glob(pattern) if self.index.isdir(path)]
+
+    def write_stack_record(self, recid, resources):
+        # create or replace stack record and return its id
+        write_switch = {
+            self.DIRECTORY: lambda: self._write_directory_stack_record(recid, resources),
+            self.SQLITE: lambda: sqlite.write_stack_record(self, recid, resources),
+        }
+        return write_switch[self.backend]()
+
+    def archive_stack_record(self, recid):
+        # move stack record from db to archive
+        archive_switch = {
+            self.DIRECTORY: lambda: self._archive_directory_stack_record(recid),
+            self.SQLITE: lambda: sqlite.archive_stack_record(self, recid),
+        }
+        return archive_switch[self.backend]()
+
+    def append_service_log(self, service_id, entries, sync=False):
+        # append entries (each a list of fields) to service log; rotate oldest half into archive when full
+        log_file = os.path.join(self.db, service_id.strip('/'), servicelog.FILENAME)
+        count = servicelog.append(log_file, entries, sync)
+        self.rotate_service_log(service_id, count)
+        self.index.invalidate(os.path.dirname(log_file))
+
+    def rotate_service_log(self, service_id, count):
+        # rotate oldest half of service log holding count entries into archive when full
+        if self.log_max_entries and count > self.log_max_entries:
+            log_file = os.path.join(self.db, service_id.strip('/'), servicelog.FILENAME)
+            archive_file = os.path.join(self.archive, service_id.strip('/'), servicelog.FILENAME)
+            servicelog.rotate(log_file, archive_file, self.log_max_entries // 2)
+
+    def append_change(self, action, record_id, detail=None):
+        # record mutation in change feed; return change sequence number
+        return changes.append(self, action, record_id, detail)
+
+    @contextlib.contextmanager
+    def lock_service_record(self, service_id):
+        # exclusive per-record lock held across record version check and write
+        parent, tag = os.path.split(os.path.join(self.db, service_id.strip('/')))
+        lock_file = os.path.join(parent, '.' + tag + RECORD_LOCK_SUFFIX)
+        with open(lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def read_service_version(self, service_id, filename):
+        # record version from versioned service file on disk, bypassing index; caller holds record lock
+        try:
+            with open(os.path.join(self.db, service_id.strip('/'), filename)) as f:
+                data = yamlio.load_file_data(f) or {}
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            raise skybase.exceptions.StateDBRecordNotFoundError(service_id)
+        return data.get(RECORD_VERSION_KEY, 0)
+
+    def find_stack_record_id(self, key):
+        # record id of stack with provider stack id or launch name; None if not found
+        find_switch = {
+            self.DIRECTORY: lambda: self._find_directory_stack_record_id(key),
+            self.SQLITE: lambda: sqlite.find_record_id(self, key),
+        }
+        return find_switch[self.backend]()
+
+    def _find_directory_stack_record_id(self, key):
+        # records written before reverse index existed backfilled at index build;
+        # key missing from index not found
+        recid = stackindex.find_record_id(self, key)
+
+        # discard entry for record no longer in db
+        if recid and self.index.isdir(os.path.join(self.db, recid.strip('/'))):
+            return recid
+        return None
+
+    def _list_directory_stacks(self, service_id):
+        service_path = os.path.join(self.db, service_id.strip('/'))
+
+        # any/all subdirs to service are assumed to be a deployed stack
+        try:
+            return [stack for stack in self.index.listdir(service_path)
+                    if self.index.isdir(os.path.join(service_path, stack))]
+        except OSError:
+            return []
+
+    def _write_directory_stack_record(self, recid, resources):
+        # make unique stack directory
+        planetdb_stack_path = os.path.join(self.db, recid.strip('/'))
+        mkdir_path(planetdb_stack_path)
+
+        # write stack launch information to resource file
+        planetdb_record = os.path.join(planetdb_stack_path, self.resources)
+        with open(planetdb_record, 'w') as f:
+            yamlio.dump(resources, f)
+        self.index.invalidate(planetdb_stack_path)
+
+        stackindex.index_stack_record(self, recid, resources)
+
+        # planet state response points to file
+        return prepare_record_id(self.db, self.resources, planetdb_record)
+
+    def _archive_directory_stack_record(self, recid):
+        # identify record source and archive destination
+        src = os.path.join(self.db, recid.strip('/'))
+        dst = os.path.join(self.archive, recid.strip('/'))
+
+        # identify resources file
+        srcfile = os.path.join(src, self.resources)
+        dstfile = os.path.join(dst, self.resources)
+
+        # remove reverse index entries before record leaves db
+        stackindex.unindex_stack_record(self, recid, self.index.read_yaml(srcfile))
+
+        # make archive folder path
+        mkdir_path(dst)
+        shutil.move(srcfile, dstfile)
+
+        # clean-up non-empty planet registry directory tree from bottom to top
+        while recid:
+            # join database and key
+            target_dir = os.path.join(self.db, recid.strip('/'))
+
+            # attempt to remove bottom stack path directory
+            # discontinue if not empty of file or other directory
+            try:
+                os.rmdir(target_dir)
+            except OSError:
+                if errno.ENOTEMPTY:
+                    break
+                else:
+                    raise
+
+            # remove last element of stack path
+            tempdir = recid.split(os.path.sep)
+            tempdir.pop()
+            recid = os.path.sep.join(tempdir)
+
+        self.index.invalidate(src)
+        return True
+
+class PlanetStateQueryTypes(object):
+    DEPTH = 'depth'
+    DRILLDOWN = 'drilldown'
+    WILDCARD = 'wildcard'
+    EXACT = 'exact'
+    PROVIDER = 'provider'
+
+class PlanetStateRecord(object):
+    # one per query result; slots keep per record footprint small for large result sets
+    __slots__ = ['id', 'cloud']
+
+    def __init__(self, recid, cloud=None):
+        self.id = recid
+        self.cloud = cloud
+
+class PlanetStateCloudRecord(object):
+    __slots__ = ['id', 'stack_id', 'stack_name']
+
+    # cloud information reported for record
+    CLOUD_INFO_FIELDS = ['stack_id', 'stack_name']
+
+    def __init__(self, recid, stack_id=None, stack_name=None):
+        self.id = recid
+        self.stack_id = stack_id
+        self.stack_name = stack_name
+
+    def get_cloud_info(self, fields=None):
+        # project cloud information onto requested fields
+        cloud_info = dict((k, getattr(self, k)) for k in self.CLOUD_INFO_FIELDS if not fields or k in fields)
+        return {'cloud': cloud_info}
+
+
+class PlanetStateDbQuery(PlanetStateDb, PlanetStateQueryTypes):
+    def __init__(self, planet=None, service=None, tag=None, stack=None, query_type=PlanetStateQueryTypes.WILDCARD,
+                 provider_key=None, limit=None, offset=0, fields=None):
+        super(PlanetStateDbQuery, self).__init__()
+        self.planet = planet
+        self.service = service
+        self.tag = tag
+        self.stack = stack
+        self.query_type = query_type
+        self.provider_key = provider_key
+        self.provider_recid = None
+
+        # page of limit results after offset in record id order; records read only for page.
+        # total number of matching results set on execution
+        self.limit = limit
+        self.offset = offset or 0
+        self.total = None
+
+        # cloud record fields included in formatted results; all if not provided
+        self.fields = fields
+
+        self.query = self.make_query()
+
+    @classmethod
+    def init_from_id(cls, id, query_type=PlanetStateQueryTypes.EXACT, **kwargs):
+        '''
+        split query args on '/' and instantiate class with/out stack element
+        expectation is that elements of id agree with positional arguments to class
+        examples:
+            /dev-os-sjc1-1/serviceX/0.0.1/12345/MTW0501-LOCAL-00/galacticEmpire
+            /dev-os-sjc1-1/serviceX/0.0.1/12345/MTW0501-LOCAL-00
+        query_type default as EXACT anticipating service.(delete|record|read\update)
+        query_type WILDCARD can be used as short-hand for option in service.get-ips
+        '''
+        query_args = id.split('/')[1:]
+        return cls(*query_args, query_type=query_type, **kwargs)
+
+    @classmethod
+    def init_from_provider_key(cls, provider_key):
+        '''
+        exact query on stack record found by provider stack id or stack launch name
+        using reverse index maintained on stack record write and archive.
+        '''
+        return cls(query_type=PlanetStateQueryTypes.PROVIDER, provider_key=provider_key)
+
+
+    def _get_query_depth(self):
+        if self.query_type in [self.EXACT, self.PROVIDER]:
+            query_depth = len(self.query[len(self.db):].split('/')) - 1
+        else:
+            query_depth = len(self.query[len(self.db):].split('/')) - 2
+        return query_depth
+
+    def _order_query_args(self):
+        # order query args into planet state DB hierarchy
+        query_args = [self.planet,
+                      self.service,
+                      self.tag,
+                      self.stack]
+        return query_args
+
+    def _make_depth_query(self):
+        # order query args into planet state DB hierarchy
+        query_args = self._order_query_args()
+        # initialize query with root of planet state db
+        query = self.db
+
+        # prune undefined criteria from tail of arg list
+        while query_args and query_args[-1] is None:
+            query_args.pop()
+
+        # add ordered query criteria or wildcard to query if blank
+        for attr in query_args:
+            if attr:
+                query = os.path.join(query, attr)
+            else:
+                query = os.path.join(query, '*')
+        return query
+
+    def _make_drilldown_query(self):
+        # order query args into planet state DB hierarchy
+        query_args = self._order_query_args()
+        # initialize query with root of planet state db
+        query = self.db
+
+        # add ordered query criteria to query, stopping at first blank
+        for attr in query_args:
+            if attr:
+                query = os.path.join(query, attr)
+            else:
+                break
+
+        # append wildcard to view contents of next lower directory level
+        query += '/*'
+        return query
+
+    def _make_exact_query(self):
+        # order query args into planet state DB hierarchy
+        query_args = self._order_query_args()
+        # initialize query with root of planet state db
+        query = self.db
+
+        # add ordered query criteria to query, stopping at first blank
+        for attr in query_args:
+            if attr:
+                query = os.path.join(query, attr)
+            else:
+                break
+        return query
+
+    def _make_provider_query(self):
+        # resolve provider key to record id and query record exactly
+        self.provider_recid = self.find_stack_record_id(self.provider_key)
+        if self.provider_recid:
+            self.planet, self.service, self.tag, self.stack = self.provider_recid.split('/')[1:]
+        return self._make_exact_query()
+
+    def _make_wildcard_query(self):
+        # order query args into planet state DB hierarchy
+        query_args = self._order_query_args()
+        # initialize query with root of planet state db
+        query = self.db
+
+        # add ordered query criteria or wildcard to query if blank
+        for attr in query_args:
+            if attr:
+                query = os.path.join(query, attr)
+            else:
+                query = os.path.join(query, '*')
+
+        # append wildcard to view contents of lowest directory level
+        query += '/*'
+        return query
+
+    def _iter_depth_result_set(self, query_results):
+        return self._iter_record_ids(query_results)
+
+    def _iter_drilldown_result_set(self, query_results):
+        # return contents of resource files if at lowest level, else record ids
+        if len(self._order_query_args()) == self._get_query_depth():
+            return self._iter_result_data(query_results)
+        return self._iter_record_ids(query_results)
+
+    def _iter_exact_result_set(self, query_results):
+        return self._iter_drilldown_result_set(query_results)
+
+    def _iter_wildcard_result_set(self, query_results):
+        # return contents of resource files
+        return self._iter_result_data(query_results)
+
+    def _iter_record_ids(self, query_results):
+        # remove absolute path to state db from results
+        for record in query_results:
+            yield PlanetStateRecord(recid=self._prepare_record_id(record))
+
+    def _prepare_record_id(self, record):
+        return prepare_record_id(self.db, self.resources, record)
+
+    def _iter_result_data(self, record_set):
+        # resource files read as records consumed
+        for record in record_set:
+            recid = self._prepare_record_id(record)
+            data = self.index.read_yaml(record)
+            yield self._make_cloud_record(recid, data)
+
+    def _make_cloud_record(self, recid, data):
+        return PlanetStateRecord(
+            recid=recid,
+            cloud=PlanetStateCloudRecord(
+                recid=recid,
+                stack_id=data.get('cloud', {}).get('id'),
+                stack_name=data.get('cloud', {}).get('name'),
+            )
+        )
+
+    def _iter_sqlite_result_set(self, query_results):
+        # indexed query results are (record id, resources) pairs; resources None for record id only
+        for recid, data in query_results:
+            if data is None:
+                yield PlanetStateRecord(recid=recid)
+            else:
+                yield self._make_cloud_record(recid, data)
+
+    def make_query(self):
+        # derive filesystem glob query by query type
+        query_switch = {
+            self.DEPTH: self._make_depth_query,
+            self.DRILLDOWN: self._make_drilldown_query,
+            self.EXACT: self._make_exact_query,
+            self.WILDCARD: self._make_wildcard_query,
+            self.PROVIDER: self._make_provider_query,
+            }
+        return query_switch[self.query_type]()
+
+    def _get_query_criteria(self):
+        # ordered query criteria up to first blank
+        criteria = []
+        for attr in self._order_query_args():
+            if not attr:
+                break
+            criteria.append(attr)
+        return criteria
+
+    def can_find_exact(self):
+        # service level records always exist in directory layout
+        if self.index.isdir(self.query):
+            return True
+        if self.backend == self.SQLITE and self.query_type in [self.EXACT, self.PROVIDER]:
+            return sqlite.exists(self, self._get_query_criteria())
+        return False
+
+    def show_query_path(self):
+        return self._prepare_record_id(self.query)
+
+    def is_paged(self):
+        return bool(self.limit or self.offset)
+
+    def _iter_page(self, query_results):
+        # page of results in record id order
+        self.total = len(query_results)
+        if self.is_paged():
+            query_results = sorted(query_results)
+        end = self.offset + self.limit if self.limit else None
+        return itertools.islice(query_results, self.offset, end)
+
+    def _iter_counted(self, query_results):
+        # total known once all results consumed
+        count = 0
+        for result in query_results:
+            count += 1
+            yield result
+        self.total = count
+
+    def iter_execute_query(self):
+        # total set here for paged and directory queries, else once results consumed
+        self.total = None
+
+        # unresolved provider key matches nothing
+        if self.query_type == self.PROVIDER and not self.provider_recid:
+            self.total = 0
+            return iter([])
+
+        # generate all records matching query from backend
+        execute_query_switch = {
+            self.DIRECTORY: self._execute_directory_query,
+            self.SQLITE: self._execute_sqlite_query,
+        }
+        return execute_query_switch[self.backend]()
+
+    def execute_query(self):
+        return list(self.iter_execute_query())
+
+    def _execute_sqlite_query(self):
+        query_args = self._order_query_args()
+
+        if self.query_type in [self.DRILLDOWN, self.EXACT, self.PROVIDER]:
+            # stack records if all criteria provided, else ids of next lower level
+            criteria = self._get_query_criteria()
+            if len(criteria) == len(query_args):
+                return self._iter_sqlite_records(criteria)
+            return self._iter_sqlite_record_ids(criteria, len(criteria) + 1)
+
+        elif self.query_type == self.DEPTH:
+            # prune undefined criteria from tail of arg list; ids at remaining depth
+            while query_args and query_args[-1] is None:
+                query_args.pop()
+            return self._iter_sqlite_record_ids(query_args, len(query_args))
+
+        # WILDCARD: stack records matching any provided criteria
+        return self._iter_sqlite_records(query_args)
+
+    def _iter_sqlite_records(self, criteria):
+        # page selected in sqlite; total counted separately only when paged
+        if self.is_paged():
+            self.total = sqlite.count_records(self, criteria)
+            return sqlite.iter_records(self, criteria, self.limit, self.offset)
+        return self._iter_counted(sqlite.iter_records(self, criteria))
+
+    def _iter_sqlite_record_ids(self, criteria, depth):
+        if self.is_paged():
+            self.total = sqlite.count_record_ids(self, criteria, depth)
+            return sqlite.iter_record_ids(self, criteria, depth, self.limit, self.offset)
+        return self._iter_counted(sqlite.iter_record_ids(self, criteria, depth))
+
+    def _execute_directory_query(self):
+        # return all contents matching query pattern
+        if self.query_type in [self.EXACT, self.PROVIDER]:
+            try:
+                listdir_results = self.index.listdir(self.query)
+            except OSError, e:
+                if e.errno != errno.ENOENT:
+                    raise e
+                else:
+                    listdir_results = []
+            # hidden lock and index files not part of record, as with glob
+            query_results = [os.path.join(self.query, item) for item in listdir_results if not item.startswith('.')]
+        else:
+            query_results = self.index.glob(self.query)
+        return self._iter_page(query_results)
+
+    def iter_result_set(self, query_results):
+        if self.backend == self.SQLITE:
+            return self._iter_sqlite_result_set(query_results)
+
+        # produce results by query type based upon records ids found from query
+        result_set_switch = {
+            self.DEPTH: self._iter_depth_result_set,
+            self.DRILLDOWN: self._iter_drilldown_result_set,
+            self.EXACT: self._iter_exact_result_set,
+            self.WILDCARD: self._iter_wildcard_result_set,
+            self.PROVIDER: self._iter_exact_result_set,
+            }
+        return result_set_switch[self.query_type](query_results)
+
+    def get_result_set(self, query_results):
+        return list(self.iter_result_set(query_results))
+
+    def format_record(self, record):
+        if record.cloud:
+            return {record.id: record.cloud.get_cloud_info(self.fields)}
+        return record.id
+
+    # TODO: DECISION: should formatting be left to calling module (planet state)
+    def iter_format_result_set(self, result_set):
+        for record in result_set:
+            yield self.format_record(record)
+
+    def format_result_set(self, result_set):
+        return list(self.iter_format_result_set(result_set))
+
+    def iter_execute(self):
+        # generate records as query results consumed; nothing read from state db beyond
+        # records consumed so far
+        return self.iter_result_set(self.iter_execute_query())
+
+    def execute(self):
+        # convenience method to execute query and provide results
+        return list(self.iter_execute())
+
+    def count(self):
+        # convenience method to execute query and provide total number of results
+        query_results = self.iter_execute_query()
+        if self.total is None:
+            for result in query_results:
+                pass
+        return self.total
+
+    def execount(self):
+        result_set = self.execute()
+        return (result_set, len(result_set))
+
+
+def build_state_index():
+    # load planet state db directory tree and records into process-wide index
+    db = PlanetStateDb()
+    commit.cleanup_staging(db)
+    count = db.index.build()
+    if db.backend == db.DIRECTORY:
+        stackindex.backfill(db)
+    return count
+
+
+def prepare_record_id(db, resources, record):
+    spos = len(db)
+    if record.find(resources) > 0:
+        epos = record.find(resources) - 1
+        return record[spos:epos]
+    else:
+        return record[spos:]
+
+
+def write_service_state_record(planet_name, service_name, tag, registration, provider, stacks):
+
+    from skybase.service.state import ServiceRegistryMetadata, ServiceRegistryBlueprint
+
+    # connect to database
+    db = PlanetStateDb()
+
+    # define record format as list of directory names based on deployment
+    service_id = os.path.join('/', planet_name, service_name, tag)
+
+    response = dict()
+    stack_records = dict()
+    log_entries = []
+
+    # planet state record for each stack
+    for stack_name, stack_info in stacks.items():
+
+        # template for cloud resource file contents
+        cloud_resource = {
+            'cloud': {
+                'provider': provider,
+            }
+        }
+
+        # merge stack information into template
+        cloud_resource['cloud'].update(stack_info)
+        stack_records[stack_name] = cloud_resource
+        response[stack_name] = os.path.join(service_id, stack_name)
+
+        # service log entry for stack deployment
+        log_entries.append([
+            basic_timestamp(),
+            'DEPLOY',
+            service_name,
+            registration.get('metadata', {}).get('app_version'),
+            registration.get('metadata', {}).get('build_id'),
+            tag,
+            stack_info['name'],
+            registration.get('metadata', {}).get('source_artiball')])
+
+    # service metadata (manifest + artiball source), original main deployment yaml
+    # contents as 'blueprint', stack records and log committed together
+    record = commit.StagedServiceRecord(
+        service_id=service_id,
+        files={
+            ServiceRegistryMetadata.FILENAME: registration.get('metadata'),
+            ServiceRegistryBlueprint.FILENAME: registration.get('blueprint'),
+        },
+        stacks=stack_records,
+        log_entries=log_entries,
+        version_file=ServiceRegistryMetadata.FILENAME)
+    commit.commit_service_record(db, record)
+
+    db.append_change(changes.DEPLOY, service_id, {'stacks': sorted(response.values())})
+
+    return response
+
+def delete_stacks(planet_name, service_name, tag, stacks, apply):
+
+    result = dict()
+    result['archive'] = []
+    result['stack_status'] = dict()
+
+    if not apply:
+        result = {
+            'delete_stacks': {
+                'planet_name': planet_name,
+                'stacks': stacks,
+                'apply': apply,
+            }
+        }
+    else:
+        # acquire planet state db and connection to cloud provider
+        db = PlanetStateDb()
+
+        # service record id as list of directory names based on deployment
+        service_id = os.path.join('/', planet_name, service_name, tag)
+
+        for recid, stack_info in stacks.items():
+            # unpack stack_info
+            stack_id = stack_info.get('stack_id')
+            stack_launch_name = stack_info.get('stack_name')
+
+            # verify cloud provider DELETE* status for stack id
+            stack_status = skybase.actions.skycloud.call_cloud_api (
+                planet=planet_registry.get(planet_name),
+                stack_name=stack_id,
+                action='get_stack_status')
+
+            result['stack_status'][stack_id] = stack_status
+            if not stack_status.startswith('DELETE'):
+                continue
+
+            # move stack record to archive
+            db.archive_stack_record(recid)
+            result['archive'].append(recid)
+            db.append_change(changes.DELETE, recid, {'stack_id': stack_id, 'stack_name': stack_launch_name})
+
+            # DECISION: need globally/app available execution mode setting to be able to read from state db api. how?
+            # TODO: need to acquire current service metadata from state db service.
+            # write service log entry for stack deployment
+            db.append_service_log(service_id, [[
+                basic_timestamp(),
+                'DELETE',
+                service_name,
+                'TODO_METADATA_VERSION',
+                'TODO_METADATA_BUILD_ID',
+                tag,
+                stack_launch_name,
+                'TODO_METADATA_SOURCE_ARTIBALL']])
+
+    return result
\ No newline at end of file
@@ -0,0 +1,392 @@
+import os
+import time
+import zlib
+import errno
+import fcntl
+import shelve
+import struct
+import whichdb
+import contextlib
+import cPickle as pickle
+
+from skybase.utils import mkdir_path
+import skybase.exceptions
+from . import sqlite
+
+# before image store.  pickled before images appended to numbered segment files in store
+# directory; sqlite key index maps key to (segment, offset, length) and record id so
+# before images of record listed in time order.  writers from all processes serialized by
+# flock on store lock file.  retention drops index entries; compaction copies live before
+# images out of mostly dead segments and removes them.  readers take no lock: compaction
+# moves index entries before removing segment, so reader finding segment removed repeats
+# index lookup.
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.dat'
+INDEX_FILENAME = 'index.sq3'
+LOCK_FILENAME = '.lock'
+
+# frame header: magic, key length, data length, crc32 of data
+FRAME_MAGIC = 'SKBI'
+FRAME_HEADER = struct.Struct('<4sIIi')
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# segments with less than this fraction of live bytes compacted at segment rollover
+COMPACT_LIVE_RATIO = 0.5
+
+# index lookups repeated by reader racing compactions before giving up
+READ_RETRIES = 3
+
+
+def create_index(conn):
+    schema = '''
+        BEGIN TRANSACTION;
+
+        CREATE TABLE IF NOT EXISTS before_images(
+          id INTEGER PRIMARY KEY ASC,
+          key varchar(250) NOT NULL UNIQUE,
+          record_id varchar(250) NOT NULL,
+          timestamp INTEGER NOT NULL,
+          segment INTEGER NOT NULL,
+          offset INTEGER NOT NULL,
+          length INTEGER NOT NULL);
+
+        CREATE INDEX IF NOT EXISTS before_images_record_idx on before_images (record_id, timestamp);
+        CREATE INDEX IF NOT EXISTS before_images_timestamp_idx on before_images (timestamp);
+        CREATE INDEX IF NOT EXISTS before_images_segment_idx on before_images (segment);
+
+        COMMIT;
+    '''
+
+    c = conn.cursor()
+    c.executescript(schema)
+
+
+def pack_frame(key, data):
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(key), len(data), zlib.crc32(data)) + key + data
+
+
+class BeforeImageStore(object):
+    '''
+    append-only before image store with on-disk key index
+    '''
+
+    def __init__(self, store_dir, segment_size=DEFAULT_SEGMENT_SIZE, retention_days=None, retention_count=None):
+        self.store_dir = store_dir
+        self.segment_size = segment_size
+        # before images older than retention_days or beyond retention_count most recent
+        # per record id dropped as new before images written; unlimited if not set
+        self.retention_days = retention_days
+        self.retention_count = retention_count
+
+        mkdir_path(self.store_dir)
+        self.index_file = os.path.join(self.store_dir, INDEX_FILENAME)
+
+    @property
+    def conn(self):
+        return sqlite.connect(self.index_file, create=self._create_index)
+
+    def _create_index(self, conn):
+        # first connections from concurrent processes race on schema creation
+        with self.lock():
+            create_index(conn)
+
+    @contextlib.contextmanager
+    def lock(self):
+        # exclusive store lock held by writer; closing file releases lock
+        with open(os.path.join(self.store_dir, LOCK_FILENAME), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def get_segment_filename(self, segment):
+        return os.path.join(self.store_dir, '{0}{1:06d}{2}'.format(SEGMENT_PREFIX, segment, SEGMENT_SUFFIX))
+
+    def list_segments(self):
+        segments = []
+        for name in os.listdir(self.store_dir):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                segments.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _get_active_segment(self):
+        # latest segment accepting appends; roll over to new segment when full
+        segments = self.list_segments()
+        if not segments:
+            return 1, False
+        segment = segments[-1]
+        if os.path.getsize(self.get_segment_filename(segment)) >= self.segment_size:
+            return segment + 1, True
+        return segment, False
+
+    def _append(self, items):
+        # append (key, record_id, timestamp, data) items to active segment; caller holds lock
+        segment, is_rollover = self._get_active_segment()
+        rows = []
+        with open(self.get_segment_filename(segment), 'ab') as f:
+            offset = f.tell()
+            for key, record_id, timestamp, data in items:
+                frame = pack_frame(key, data)
+                f.write(frame)
+                rows.append((key, record_id, timestamp, segment, offset, len(frame)))
+                offset += len(frame)
+        return rows, is_rollover
+
+    def put(self, key, record_id, timestamp, value):
+        '''
+        write before image value for record id under key
+        '''
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        conn = self.conn
+
+        with self.lock():
+            rows, is_rollover = self._append([(key, record_id, timestamp, data)])
+            with conn:
+                conn.executemany(
+                    'insert or replace into before_images '
+                    '(key, record_id, timestamp, segment, offset, length) values (?,?,?,?,?,?)', rows)
+                self._apply_retention(conn, record_id)
+            if is_rollover:
+                self._compact()
+
+        return key
+
+    def _read_frame(self, segment, offset, length):
+        with open(self.get_segment_filename(segment), 'rb') as f:
+            f.seek(offset)
+            frame = f.read(length)
+
+        magic, key_length, data_length, crc = FRAME_HEADER.unpack(frame[:FRAME_HEADER.size])
+        data = frame[FRAME_HEADER.size + key_length:]
+        if magic != FRAME_MAGIC or len(data) != data_length or zlib.crc32(data) != crc:
+            raise skybase.exceptions.StateDBError('corrupt before image frame: segment {0} offset {1}'.format(segment, offset))
+        return data
+
+    def _lookup(self, key):
+        return self.conn.execute(
+            'select segment, offset, length from before_images where key = ?', (key,)).fetchone()
+
+    def _read_live_frame(self, key, row):
+        # frame at indexed location; None if before image dropped since lookup
+        for attempt in range(READ_RETRIES + 1):
+            if row is None:
+                return None
+            try:
+                return self._read_frame(*row)
+            except IOError as e:
+                if e.errno != errno.ENOENT or attempt == READ_RETRIES:
+                    raise
+            # segment removed by compaction after lookup; before image moved
+            row = self._lookup(key)
+
+    def get(self, key):
+        '''
+        return before image value for key; None if not found
+        '''
+        data = self._read_live_frame(key, self._lookup(key))
+        if data is None:
+            return None
+        return pickle.loads(data)
+
+    def list_keys(self, record_id):
+        '''
+        return (key, timestamp) of before images for record id in time order
+        '''
+        cursor = self.conn.execute(
+            'select key, timestamp from before_images where record_id = ? order by timestamp, id', (record_id,))
+        return cursor.fetchall()
+
+    def put_many(self, items):
+        '''
+        write (key, record_id, timestamp, value) before images in single append and
+        index transaction; return number written
+        '''
+        items = [(key, record_id, timestamp, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+                 for key, record_id, timestamp, value in items]
+        if not items:
+            return 0
+        conn = self.conn
+
+        with self.lock():
+            rows, is_rollover = self._append(items)
+            with conn:
+                conn.executemany(
+                    'insert or replace into before_images '
+                    '(key, record_id, timestamp, segment, offset, length) values (?,?,?,?,?,?)', rows)
+            if is_rollover:
+                self._compact()
+
+        return len(rows)
+
+    def iter_items(self):
+        '''
+        generate (key, record_id, timestamp, value) for all before images in write order
+        '''
+        rows = self.conn.execute(
+            'select key, record_id, timestamp, segment, offset, length from before_images order by id').fetchall()
+        for key, record_id, timestamp, segment, offset, length in rows:
+            data = self._read_live_frame(key, (segment, offset, length))
+            if data is not None:
+                yield key, record_id, timestamp, pickle.loads(data)
+
+    def count(self):
+        return self.conn.execute('select count(*) from before_images').fetchone()[0]
+
+    def _apply_retention(self, conn, record_id=None):
+        # drop index entries outside retention; space recovered by compaction
+        if self.retention_days:
+            cutoff = int(time.time()) - self.retention_days * 86400
+            conn.execute('delete from before_images where timestamp < ?', (cutoff,))
+
+        if self.retention_count:
+            if record_id is None:
+                record_ids = [row[0] for row in conn.execute('select distinct record_id from before_images')]
+            else:
+                record_ids = [record_id]
+            for rid in record_ids:
+                conn.execute(
+                    'delete from before_images where record_id = ? and id not in '
+                    '(select id from before_images where record_id = ? order by timestamp desc, id desc limit ?)',
+                    (rid, rid, self.retention_count))
+
+    def _compact(self):
+        # copy live before images out of mostly dead inactive segments; caller holds lock
+        conn = self.conn
+        segments = self.list_segments()
+        live = dict(conn.execute('select segment, sum(length) from before_images group by segment').fetchall())
+
+        for segment in segments[:-1]:
+            segment_file = self.get_segment_filename(segment)
+            if live.get(segment, 0) >= COMPACT_LIVE_RATIO * os.path.getsize(segment_file):
+                continue
+
+            rows = conn.execute(
+                'select key, record_id, timestamp, offset, length from before_images '
+                'where segment = ? order by offset', (segment,)).fetchall()
+            items = [(key, record_id, timestamp, self._read_frame(segment, offset, length))
+                     for key, record_id, timestamp, offset, length in rows]
+
+            new_rows, is_rollover = self._append(items)
+            with conn:
+                conn.executemany(
+                    'update before_images set segment = ?, offset = ?, length = ? where key = ?',
+                    [(new_segment, offset, length, key) for key, rid, ts, new_segment, offset, length in new_rows])
+            os.remove(segment_file)
+
+    def apply_retention(self):
+        '''
+        drop before images outside retention policy and compact segments
+        '''
+        conn = self.conn
+        with self.lock():
+            with conn:
+                self._apply_retention(conn)
+            self._compact()
+
+    def import_shelve(self, shelve_file):
+        '''
+        one-shot move of before images from shelve store used by earlier releases.
+        shelve files renamed with .imported suffix; return number imported
+        '''
+        conn = self.conn
+        with self.lock():
+            # another process may have completed import while waiting for lock
+            if not whichdb.whichdb(shelve_file):
+                return 0
+
+            db = shelve.open(shelve_file, 'r')
+            try:
+                items = []
+                for key in db.keys():
+                    value = db[key]
+                    items.append((key, value.get('record_id') or '', value.get('timestamp') or 0,
+                                  pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+            finally:
+                db.close()
+
+            rows, is_rollover = self._append(items)
+            with conn:
+                conn.executemany(
+                    'insert or replace into before_images '
+                    '(key, record_id, timestamp, segment, offset, length) values (?,?,?,?,?,?)', rows)
+
+            # dbm implementations may add suffix to shelve file name
+            shelve_dir, shelve_name = os.path.split(shelve_file)
+            for name in os.listdir(shelve_dir):
+                if name.startswith(shelve_name) and not name.endswith('.imported'):
+                    path = os.path.join(shelve_dir, name)
+                    os.rename(path, path + '.imported')
+
+        return len(rows)
+
+
+if __name__ == '__main__':
+    # benchmark before image store vs shelve at 100k before images:
+    #   python -m skybase.actions.dbstate.bistore [count]
+    import sys
+    import uuid
+    import random
+    from skybase.utils import make_temp_directory
+
+    COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    RECORDS = 1000
+    READS = 1000
+
+    # shelve degrades badly with size when opened per operation; compared at smaller count
+    SHELVE_COUNT = min(COUNT, 10000)
+
+    record = {'metadata': {'app_name': 'service', 'app_version': '1.0.0', 'build_id': 'b'},
+              'blueprint': {'definition': {'chef_type': 'server'}, 'stacks': {'main': {'roles': ['app']}}},
+              'log': ['entry'] * 50}
+
+    def make_items():
+        now = int(time.time())
+        for i in range(COUNT):
+            record_id = '/planet/service-{0}/tag'.format(i % RECORDS)
+            yield '{0}.{1}.{2}'.format(record_id.strip('/').replace('/', '.'), now, uuid.uuid4()), record_id, now
+
+    with make_temp_directory() as temp_dir:
+        store = BeforeImageStore(os.path.join(temp_dir, 'bi'))
+        keys = []
+        start = time.time()
+        for key, record_id, ts in make_items():
+            store.put(key, record_id, ts, {'id': key, 'record': record, 'timestamp': ts, 'record_id': record_id})
+            keys.append(key)
+        write = time.time() - start
+
+        start = time.time()
+        for key in random.sample(keys, READS):
+            store.get(key)
+        read = time.time() - start
+
+        start = time.time()
+        listed = store.list_keys('/planet/service-1/tag')
+        list_time = time.time() - start
+
+        print 'store:  {0} writes {1:.1f}s ({2:.3f}ms/write)  {3} reads {4:.3f}ms/read  list {5} {6:.3f}ms'.format(
+            COUNT, write, 1000 * write / COUNT, READS, 1000 * read / READS, len(listed), 1000 * list_time)
+
+        # shelve opened and closed per operation as in original before image code
+        shelve_file = os.path.join(temp_dir, 'before_image.shelve')
+        keys = keys[:SHELVE_COUNT]
+        start = time.time()
+        for key in keys:
+            db = shelve.open(shelve_file)
+            db[key] = {'id': key, 'record': record, 'timestamp': 0, 'record_id': ''}
+            db.close()
+        write = time.time() - start
+
+        start = time.time()
+        for key in random.sample(keys, READS):
+            db = shelve.open(shelve_file)
+            db.get(key)
+            db.close()
+        read = time.time() - start
+
+        start = time.time()
+        db = shelve.open(shelve_file)
+        listed = [key for key in db.keys() if key.startswith('planet.service-1.tag.')]
+        db.close()
+        list_time = time.time() - start
+
+        print 'shelve: {0} writes {1:.1f}s ({2:.3f}ms/write)  {3} reads {4:.3f}ms/read  list {5} {6:.3f}ms'.format(
+            SHELVE_COUNT, write, 1000 * write / SHELVE_COUNT, READS, 1000 * read / READS, len(listed), 1000 * list_time)
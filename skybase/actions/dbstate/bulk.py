@@ -0,0 +1,339 @@
+import os
+import sys
+import time
+import errno
+import zlib
+import hashlib
+import tarfile
+import cStringIO
+import shutil
+import cPickle as pickle
+
+from skybase.utils import mkdir_path, basic_timestamp
+from skybase.utils import yamlio
+import skybase.exceptions
+from . import sqlite
+from . import servicelog
+from . import stackindex
+
+# planet state db snapshot as single gzip compressed tar stream.  sections:
+#   db/<path>             service files and logs under db (stack records excluded)
+#   archive/<path>        archived service logs under archive (stack records excluded)
+#   stacks/<n>            stack record resources, record id in member header
+#   archive-stacks/<n>    archived stack record resources, record id and archive time in header
+#   before-images/<n>     pickled before image, key, record id and timestamp in header
+#   MANIFEST              member counts and digest over all member checksums; last member
+# every member carries sha256 of its contents in pax header.  stack records written and
+# read through backend so snapshot moves between directory and sqlite backends.  derived
+# data (reverse stack index, sqlite tables, service log indexes, before image index) not
+# exported and rebuilt as snapshot is loaded.
+FORMAT_VERSION = 1
+
+DB = 'db'
+ARCHIVE = 'archive'
+STACKS = 'stacks'
+ARCHIVE_STACKS = 'archive-stacks'
+BEFORE_IMAGES = 'before-images'
+SECTIONS = [DB, ARCHIVE, STACKS, ARCHIVE_STACKS, BEFORE_IMAGES]
+MANIFEST = 'MANIFEST'
+
+HEADER_PREFIX = 'SKYBASE.'
+CHECKSUM_HEADER = HEADER_PREFIX + 'sha256'
+
+# before images loaded per store write
+BEFORE_IMAGE_BATCH = 1000
+
+
+class SnapshotWriter(object):
+    '''
+    append checksummed members to snapshot stream
+    '''
+
+    def __init__(self, fileobj):
+        self.tar = tarfile.open(fileobj=fileobj, mode='w|gz', format=tarfile.PAX_FORMAT)
+        self.counts = dict((section, 0) for section in SECTIONS)
+        self.digest = hashlib.sha256()
+
+    def add(self, section, data, name=None, **headers):
+        checksum = hashlib.sha256(data).hexdigest()
+        self.digest.update(checksum)
+
+        info = tarfile.TarInfo('/'.join([section, name or str(self.counts[section])]))
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.pax_headers = dict((HEADER_PREFIX + key, '{0}'.format(value)) for key, value in headers.items())
+        info.pax_headers[CHECKSUM_HEADER] = checksum
+
+        self.tar.addfile(info, cStringIO.StringIO(data))
+        self.counts[section] += 1
+
+    def close(self, **manifest):
+        manifest.update({
+            'format': FORMAT_VERSION,
+            'created': basic_timestamp(),
+            'counts': self.counts,
+            'digest': self.digest.hexdigest(),
+        })
+        data = yamlio.dump(manifest)
+        info = tarfile.TarInfo(MANIFEST)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, cStringIO.StringIO(data))
+        self.tar.close()
+        return manifest
+
+
+def is_stack_resources(relpath, resources):
+    # stack record file: <planet>/<service>/<tag>/<stack>/<resources>
+    parts = relpath.split(os.sep)
+    return len(parts) == 5 and parts[-1] == resources
+
+
+def walk_files(root, resources):
+    # relative paths of files below root; hidden lock, index, temp files and commit backups are derived
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(dirname for dirname in dirnames if not dirname.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            relpath = os.path.relpath(os.path.join(dirpath, filename), root)
+            yield relpath, is_stack_resources(relpath, resources)
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def iter_stack_records(db):
+    # (record id, resources) of all live stack records from backend
+    if db.backend == db.SQLITE:
+        for recid, resources in sqlite.iter_records(db, []):
+            yield recid, resources
+    else:
+        for relpath, is_stack in walk_files(db.db, db.resources):
+            if is_stack:
+                yield '/' + os.path.dirname(relpath), yamlio.load_file_data(read_file(os.path.join(db.db, relpath)))
+
+
+def iter_archive_stack_records(db):
+    # (record id, resources, archive time) of all archived stack records
+    if db.backend == db.SQLITE:
+        cursor = sqlite.connect(db.sqlite_file).execute(
+            'select planet, service, tag, stack, resources, archived from archive order by id')
+        for row in cursor:
+            yield sqlite.make_record_id(row[:4]), yamlio.load(row[4]), row[5]
+    else:
+        for relpath, is_stack in walk_files(db.archive, db.resources):
+            if is_stack:
+                yield '/' + os.path.dirname(relpath), yamlio.load_file_data(read_file(os.path.join(db.archive, relpath))), None
+
+
+def export_db(db, bi_store, filename):
+    '''
+    stream entire planet state db, archive and before images into snapshot file
+    '''
+    mkdir_path(os.path.dirname(os.path.abspath(filename)))
+    temp_file = filename + '.partial'
+
+    with open(temp_file, 'wb') as f:
+        writer = SnapshotWriter(f)
+
+        for section, root in [(DB, db.db), (ARCHIVE, db.archive)]:
+            if not os.path.isdir(root):
+                continue
+            for relpath, is_stack in walk_files(root, db.resources):
+                if not is_stack:
+                    writer.add(section, read_file(os.path.join(root, relpath)), name=relpath)
+
+        for recid, resources in iter_stack_records(db):
+            writer.add(STACKS, yamlio.dump(resources), record_id=recid)
+
+        for recid, resources, archived in iter_archive_stack_records(db):
+            writer.add(ARCHIVE_STACKS, yamlio.dump(resources), record_id=recid, archived=archived or '')
+
+        if bi_store:
+            for key, record_id, timestamp, value in bi_store.iter_items():
+                writer.add(BEFORE_IMAGES, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                           key=key, record_id=record_id, timestamp=timestamp)
+
+        manifest = writer.close(backend=db.backend)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # snapshot file appears only when complete
+    os.rename(temp_file, filename)
+
+    return {
+        'file': filename,
+        'counts': manifest['counts'],
+        'digest': manifest['digest'],
+    }
+
+
+def is_empty(root):
+    try:
+        return not os.listdir(root)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return True
+
+
+def write_file(root, relpath, data):
+    # member paths must stay below root
+    path = os.path.normpath(os.path.join(root, relpath))
+    if not path.startswith(os.path.normpath(root) + os.sep):
+        raise skybase.exceptions.StateDBError('snapshot member outside {0}: {1}'.format(root, relpath))
+    mkdir_path(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def clear_directory(root):
+    # remove everything below root, keeping root
+    try:
+        names = os.listdir(root)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return
+    for name in names:
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def import_db(db, bi_store, filename, apply=False):
+    '''
+    verify snapshot and, if apply, load it into empty planet state db, archive and
+    before image store, rebuilding reverse stack index, sqlite tables and service log
+    and before image indexes in same pass.  files are written as members are verified;
+    verify without apply before loading snapshot of unknown integrity.  import that
+    fails part way is rolled back and files written to db and archive removed, so
+    import can be retried; before images already loaded are kept and reported.
+    '''
+    if apply and not (is_empty(db.db) and is_empty(db.archive)):
+        raise skybase.exceptions.StateDBError('snapshot import requires empty db and archive: {0}, {1}'.format(db.db, db.archive))
+    if apply and db.backend == db.SQLITE and sqlite.count_records(db, []):
+        raise skybase.exceptions.StateDBError('snapshot import requires empty sqlite db: {0}'.format(db.sqlite_file))
+
+    counts = dict((section, 0) for section in SECTIONS)
+    digest = hashlib.sha256()
+    manifest = None
+    before_images = []
+    conn = sqlite.connect(db.sqlite_file) if apply and db.backend == db.SQLITE else None
+
+    # (record id, keys) of stack records indexed by directory backend; before images in store
+    indexed = []
+    loaded = {'before_images': 0}
+
+    def flush_before_images():
+        if before_images and bi_store:
+            bi_store.put_many(before_images)
+            loaded['before_images'] += len(before_images)
+        del before_images[:]
+
+    def discard_partial_import():
+        if conn:
+            conn.rollback()
+        for recid, keys in indexed:
+            for key in keys:
+                stackindex.remove_entry(db, key, recid)
+        # db and archive were empty when import started
+        clear_directory(db.db)
+        clear_directory(db.archive)
+        db.index.invalidate()
+
+    try:
+        try:
+            with open(filename, 'rb') as f:
+                tar = tarfile.open(fileobj=f, mode='r|gz')
+                for info in tar:
+                    data = tar.extractfile(info).read()
+
+                    if info.name == MANIFEST:
+                        manifest = yamlio.load(data)
+                        continue
+                    if manifest is not None:
+                        raise skybase.exceptions.StateDBError('snapshot member after manifest: {0}'.format(info.name))
+
+                    section, name = info.name.split('/', 1)
+                    headers = dict((key[len(HEADER_PREFIX):], value) for key, value in info.pax_headers.items()
+                                   if key.startswith(HEADER_PREFIX))
+                    checksum = hashlib.sha256(data).hexdigest()
+                    if section not in counts or checksum != headers.get('sha256'):
+                        raise skybase.exceptions.StateDBError('corrupt snapshot member: {0}'.format(info.name))
+                    digest.update(checksum)
+                    counts[section] += 1
+
+                    if not apply:
+                        continue
+
+                    if section in [DB, ARCHIVE]:
+                        path = write_file(db.db if section == DB else db.archive, name, data)
+                        if os.path.basename(path) == servicelog.FILENAME:
+                            with servicelog.locked_log(path):
+                                servicelog.sync_index(path)
+
+                    elif section == STACKS:
+                        recid = str(headers['record_id'])
+                        resources = yamlio.load(data)
+                        if conn:
+                            sqlite._insert_stack(conn, recid, resources)
+                        else:
+                            indexed.append((recid, stackindex.get_stack_keys(resources)))
+                            db.write_stack_record(recid, resources)
+
+                    elif section == ARCHIVE_STACKS:
+                        recid = str(headers['record_id'])
+                        if conn:
+                            sqlite._insert_archive(conn, recid, yamlio.load(data), str(headers.get('archived') or '') or None)
+                        else:
+                            write_file(db.archive, os.path.join(recid.strip('/'), db.resources), data)
+
+                    elif section == BEFORE_IMAGES:
+                        before_images.append((str(headers['key']), str(headers['record_id']), int(headers['timestamp']),
+                                              pickle.loads(data)))
+                        if len(before_images) >= BEFORE_IMAGE_BATCH:
+                            flush_before_images()
+
+                tar.close()
+        except (tarfile.TarError, IOError, EOFError, zlib.error) as e:
+            raise skybase.exceptions.StateDBError('unreadable snapshot {0}: {1}'.format(filename, e))
+
+        if manifest is None or manifest.get('counts') != counts or manifest.get('digest') != digest.hexdigest():
+            raise skybase.exceptions.StateDBError('snapshot incomplete or manifest mismatch: {0}'.format(filename))
+
+        if apply:
+            flush_before_images()
+            if conn:
+                conn.commit()
+            db.index.invalidate()
+
+    except Exception as e:
+        if not apply:
+            raise
+        exc_info = sys.exc_info()
+        try:
+            discard_partial_import()
+        except Exception as cleanup_error:
+            raise skybase.exceptions.StateDBError(
+                'snapshot import failed ({0}); partial import not removed ({1}), clear {2} and {3} before retry'.format(
+                    e, cleanup_error, db.db, db.archive))
+        if loaded['before_images']:
+            raise skybase.exceptions.StateDBError(
+                'snapshot import failed ({0}); {1} before images loaded into store before failure kept'.format(
+                    e, loaded['before_images']))
+        raise exc_info[0], exc_info[1], exc_info[2]
+
+    return {
+        'file': filename,
+        'counts': counts,
+        'digest': manifest['digest'],
+        'created': manifest.get('created'),
+        'apply': apply,
+    }
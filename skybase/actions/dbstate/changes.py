@@ -0,0 +1,101 @@
+import json
+import time
+
+from skybase.utils import basic_timestamp
+from . import sqlite
+
+# append-only feed of planet state db mutations.  every deploy, stack delete and record
+# update appends one change row to sqlite feed shared by all processes; autoincrement
+# sequence numbers are monotonic across writers so consumers read changes after last
+# sequence seen.  feed trimmed to most recent max_entries; consumer falling behind oldest
+# retained change told to resynchronize.
+DEPLOY = 'DEPLOY'
+DELETE = 'DELETE'
+UPDATE = 'UPDATE'
+
+# trim feed once every this many appended changes
+TRIM_INTERVAL = 1000
+
+
+def create_feed(conn):
+    schema = '''
+        BEGIN TRANSACTION;
+
+        CREATE TABLE IF NOT EXISTS changes(
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          timestamp varchar(30) NOT NULL,
+          action varchar(30) NOT NULL,
+          record_id varchar(250) NOT NULL,
+          detail text);
+
+        COMMIT;
+    '''
+
+    c = conn.cursor()
+    c.executescript(schema)
+
+
+def connect(db):
+    return sqlite.connect(db.changes_file, create=create_feed)
+
+
+def append(db, action, record_id, detail=None):
+    '''
+    append change to feed; return sequence number of change
+    '''
+    conn = connect(db)
+    with conn:
+        cursor = conn.execute(
+            'insert into changes (timestamp, action, record_id, detail) values (?,?,?,?)',
+            (basic_timestamp(), action, record_id, json.dumps(detail or {})))
+        seq = cursor.lastrowid
+
+        if db.changes_max_entries and seq % TRIM_INTERVAL == 0:
+            conn.execute('delete from changes where seq <= ?', (seq - db.changes_max_entries,))
+
+    return seq
+
+
+def get_last_seq(db):
+    row = connect(db).execute('select max(seq) from changes').fetchone()
+    return row[0] or 0
+
+
+def read(db, since=0, limit=None):
+    '''
+    return changes with sequence number after since, oldest first, at most limit.
+    result includes last sequence number in feed and whether changes after since
+    were trimmed from feed.
+    '''
+    conn = connect(db)
+    cursor = conn.execute(
+        'select seq, timestamp, action, record_id, detail from changes where seq > ? order by seq limit ?',
+        (since, limit or -1))
+    changes = [{
+        'seq': seq,
+        'timestamp': timestamp,
+        'action': action,
+        'record_id': record_id,
+        'detail': json.loads(detail) if detail else {},
+    } for seq, timestamp, action, record_id, detail in cursor]
+
+    first_seq = conn.execute('select min(seq) from changes').fetchone()[0]
+
+    return {
+        'since': since,
+        'changes': changes,
+        'last_seq': changes[-1]['seq'] if changes else max(since, get_last_seq(db)),
+        'truncated': bool(since and first_seq and first_seq > since + 1),
+    }
+
+
+def wait(db, since=0, limit=None, timeout=0, interval=0.5):
+    '''
+    blocking read waiting up to timeout seconds for changes after since
+    '''
+    deadline = time.time() + timeout
+    while True:
+        result = read(db, since, limit)
+        if result['changes'] or time.time() >= deadline:
+            return result
+        time.sleep(interval)
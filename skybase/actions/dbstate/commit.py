@@ -0,0 +1,627 @@
+import os
+import glob
+import time
+import uuid
+import errno
+import fcntl
+import shutil
+import threading
+import contextlib
+
+from skybase.utils import mkdir_path
+from skybase.utils import simple_error_format
+from skybase.utils import yamlio
+import skybase.exceptions
+from . import sqlite
+from . import stackindex
+from . import servicelog
+
+# transactional group commit of service state records across worker processes.  complete
+# record (service files, stack records and service log entries) staged in private directory
+# under staging root, flushed to disk and moved into shared queue; writer then waits for
+# commit lock.  lock holder commits every queued record in one flush, so records queued by
+# writers in any worker process while a flush runs are committed together by next lock
+# holder, sharing directory fsyncs and sqlite transaction.  writer whose record has left
+# queue once it holds lock was committed by earlier holder; failures reported in results.
+#
+# new service tag moved into db by single directory rename.  for existing service tag,
+# complete merged record (unchanged files hard linked, service log copied then appended)
+# staged and swapped in: live directory renamed to hidden backup beside it, staged directory
+# renamed into its place, backup removed.  readers see old or new record, none between the
+# two renames.  backup left by interrupted swap restored if record missing, else removed.
+#
+# stack records (stack index entries or sqlite rows, one transaction per flush) written once
+# records installed.  manifest kept in installed record until then; stack records of commit
+# interrupted in between written from manifest at recovery, never rows without record.
+
+# staging directories older than this (seconds) left by interrupted writers and removed
+STAGING_MAX_AGE = 3600
+
+# shared queue and failed commit results under staging root
+QUEUE_DIRNAME = 'queue'
+RESULTS_DIRNAME = 'results'
+COMMIT_LOCK_FILENAME = '.commit.lock'
+
+# record description written last into staged record; removed once stack records written
+MANIFEST_FILENAME = '.commit.yaml'
+BACKUP_SUFFIX = '.backup'
+
+
+class StagedServiceRecord(object):
+    '''
+    complete service state record pending commit
+    '''
+
+    def __init__(self, service_id, files, stacks, log_entries, version_file=None):
+        self.service_id = service_id
+        # service file name: data written as yaml
+        self.files = files
+        # service file holding record version, continued from existing record on redeploy
+        self.version_file = version_file
+        # stack name: resources
+        self.stacks = stacks
+        # service log entries, each a list of fields
+        self.log_entries = log_entries
+
+        self.staging_dir = None
+        self.done = False
+        self.error = None
+
+    @classmethod
+    def init_from_manifest(cls, path):
+        # staged or installed record from manifest in record directory
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            manifest = yamlio.load(f)
+        record = cls(manifest['service_id'], manifest['files'], manifest['stacks'],
+                     manifest['log_entries'], manifest.get('version_file'))
+        record.staging_dir = path
+        return record
+
+    def output_as_dict(self):
+        return {
+            'service_id': self.service_id,
+            'files': self.files,
+            'version_file': self.version_file,
+            'stacks': self.stacks,
+            'log_entries': self.log_entries,
+        }
+
+    def get_stack_record_id(self, stack_name):
+        return os.path.join(self.service_id, stack_name)
+
+
+def get_service_path(db, service_id):
+    return os.path.join(db.db, service_id.strip('/'))
+
+
+def get_backup_path(service_path):
+    parent, tag = os.path.split(service_path)
+    return os.path.join(parent, '.' + tag + BACKUP_SUFFIX)
+
+
+def get_queue_dir(db):
+    return os.path.join(db.staging, QUEUE_DIRNAME)
+
+
+def get_results_dir(db):
+    return os.path.join(db.staging, RESULTS_DIRNAME)
+
+
+def get_result_filename(db, name):
+    return os.path.join(get_results_dir(db), name)
+
+
+def fsync_path(path):
+    # flush file or directory entries to disk
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_file(path, data):
+    with open(path, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+@contextlib.contextmanager
+def commit_lock(db):
+    # exclusive lock held by writer committing queue; serializes installs across processes
+    mkdir_path(db.staging)
+    with open(os.path.join(db.staging, COMMIT_LOCK_FILENAME), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def stage_record(db, record):
+    '''
+    write complete record into new staging directory and flush to disk
+    '''
+    mkdir_path(db.staging)
+    record.staging_dir = os.path.join(db.staging, uuid.uuid4().hex)
+    os.mkdir(record.staging_dir)
+
+    for filename, data in record.files.items():
+        write_file(os.path.join(record.staging_dir, filename), yamlio.dump(data))
+
+    # stack records kept in directory layout only for directory backend
+    if db.backend == db.DIRECTORY:
+        for stack_name, resources in record.stacks.items():
+            stack_dir = os.path.join(record.staging_dir, stack_name)
+            os.mkdir(stack_dir)
+            write_file(os.path.join(stack_dir, db.resources), yamlio.dump(resources))
+            fsync_path(stack_dir)
+
+    servicelog.append(os.path.join(record.staging_dir, servicelog.FILENAME), record.log_entries, sync=True)
+    write_file(os.path.join(record.staging_dir, MANIFEST_FILENAME), yamlio.dump(record.output_as_dict()))
+    fsync_path(record.staging_dir)
+
+
+def queue_record(db, record):
+    # move staged record into shared queue; entry names sort in queue order
+    queue_dir = get_queue_dir(db)
+    mkdir_path(queue_dir)
+    path = os.path.join(queue_dir, '{0:.6f}-{1}'.format(time.time(), uuid.uuid4().hex))
+    os.rename(record.staging_dir, path)
+    record.staging_dir = path
+
+
+def _replace(src, dst):
+    # rename src over dst; False if dst is non-empty directory
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno not in [errno.EEXIST, errno.ENOTEMPTY]:
+            raise
+        return False
+    return True
+
+
+def restage_version(db, record):
+    # rewrite staged versioned file with version following existing record; caller holds record lock
+    from skybase.actions.dbstate import RECORD_VERSION_KEY
+    try:
+        version = db.read_service_version(record.service_id, record.version_file)
+    except skybase.exceptions.StateDBRecordNotFoundError:
+        return
+
+    data = dict(record.files[record.version_file] or {})
+    data[RECORD_VERSION_KEY] = version + 1
+    write_file(os.path.join(record.staging_dir, record.version_file), yamlio.dump(data))
+
+
+def link_tree(src, dst):
+    # hard link files below src into new directory dst
+    os.mkdir(dst)
+    for name in os.listdir(src):
+        path = os.path.join(src, name)
+        if os.path.isdir(path):
+            link_tree(path, os.path.join(dst, name))
+        else:
+            os.link(path, os.path.join(dst, name))
+    fsync_path(dst)
+
+
+def restore_backup(service_path):
+    # resolve backup left by interrupted swap: restored if record missing, else removed
+    backup = get_backup_path(service_path)
+    if not os.path.isdir(backup):
+        return False
+    if os.path.isdir(service_path):
+        shutil.rmtree(backup)
+    else:
+        os.rename(backup, service_path)
+    return True
+
+
+def swap_record(db, record, service_path):
+    '''
+    replace live record by staged record merged with it; return number of service log
+    entries.  caller holds commit and record locks.
+    '''
+    if record.version_file:
+        restage_version(db, record)
+
+    staged_log = os.path.join(record.staging_dir, servicelog.FILENAME)
+    live_log = os.path.join(service_path, servicelog.FILENAME)
+    backup = get_backup_path(service_path)
+
+    # log appenders wait for new log once swapped in
+    with servicelog.locked_log(live_log):
+        # live log and index followed by staged entries
+        for path in [staged_log, servicelog.get_index_filename(staged_log)]:
+            os.remove(path)
+        shutil.copyfile(live_log, staged_log)
+        if os.path.exists(servicelog.get_index_filename(live_log)):
+            shutil.copyfile(servicelog.get_index_filename(live_log), servicelog.get_index_filename(staged_log))
+        count = servicelog.append(staged_log, record.log_entries, sync=True)
+
+        # unchanged service files and stacks; hidden lock, index and temp files not carried over
+        for name in os.listdir(service_path):
+            staged_path = os.path.join(record.staging_dir, name)
+            if name.startswith('.') or os.path.lexists(staged_path):
+                continue
+            path = os.path.join(service_path, name)
+            if os.path.isdir(path):
+                link_tree(path, staged_path)
+            else:
+                os.link(path, staged_path)
+        fsync_path(record.staging_dir)
+
+        os.rename(service_path, backup)
+        try:
+            os.rename(record.staging_dir, service_path)
+        except OSError:
+            os.rename(backup, service_path)
+            raise
+
+    fsync_path(os.path.dirname(service_path))
+    shutil.rmtree(backup)
+    return count
+
+
+def install_record(db, record):
+    '''
+    move staged record into db, replacing any existing record for service tag; return
+    directories whose entries must be flushed.  caller holds commit lock.
+    '''
+    service_path = get_service_path(db, record.service_id)
+    mkdir_path(os.path.dirname(service_path))
+
+    with db.lock_service_record(record.service_id):
+        restore_backup(service_path)
+        if _replace(record.staging_dir, service_path):
+            count = len(record.log_entries)
+        else:
+            # stack records of earlier interrupted commit written before its manifest replaced
+            if os.path.exists(os.path.join(service_path, MANIFEST_FILENAME)):
+                write_stack_records(db, [StagedServiceRecord.init_from_manifest(service_path)])
+            count = swap_record(db, record, service_path)
+
+        db.rotate_service_log(record.service_id, count)
+
+    db.index.invalidate(service_path)
+    db.index.invalidate(os.path.dirname(service_path))
+    return set([os.path.dirname(service_path)])
+
+
+def write_stack_records(db, records):
+    '''
+    write stack records of installed service records, then remove their manifests
+    '''
+    if db.backend == db.SQLITE:
+        conn = sqlite.connect(db.sqlite_file)
+        with conn:
+            for record in records:
+                for stack_name, resources in record.stacks.items():
+                    sqlite._insert_stack(conn, record.get_stack_record_id(stack_name), resources)
+    else:
+        for record in records:
+            for stack_name, resources in record.stacks.items():
+                stackindex.index_stack_record(db, record.get_stack_record_id(stack_name), resources)
+
+    for record in records:
+        service_path = get_service_path(db, record.service_id)
+        try:
+            os.remove(os.path.join(service_path, MANIFEST_FILENAME))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        db.index.invalidate(service_path)
+
+
+def remove_staging(record):
+    if record.staging_dir:
+        shutil.rmtree(record.staging_dir, ignore_errors=True)
+
+
+def flush(db, batch):
+    '''
+    commit batch of queued service records; errors recorded on failed records.  caller
+    holds commit lock.
+    '''
+    installed = []
+    synced = set()
+    for record in batch:
+        try:
+            synced.update(install_record(db, record))
+            installed.append(record)
+        except Exception as e:
+            record.error = e
+
+    for path in synced:
+        fsync_path(path)
+
+    if installed:
+        try:
+            write_stack_records(db, installed)
+        except Exception as e:
+            # records installed; stack records written from manifests at recovery
+            for record in installed:
+                record.error = e
+
+
+def commit_queue(db):
+    '''
+    commit all queued records in one flush and report failures; return number of records.
+    caller holds commit lock.
+    '''
+    batch = []
+    failed = []
+    for name in sorted(os.listdir(get_queue_dir(db))):
+        path = os.path.join(get_queue_dir(db), name)
+        try:
+            batch.append(StagedServiceRecord.init_from_manifest(path))
+        except Exception as e:
+            record = StagedServiceRecord(None, None, None, None)
+            record.staging_dir = path
+            record.error = e
+            failed.append(record)
+
+    if batch:
+        try:
+            flush(db, batch)
+        except Exception as e:
+            for record in batch:
+                record.error = record.error or e
+
+    # result written before queue entry removed; entry gone without result means committed
+    for record in batch + failed:
+        if record.error:
+            mkdir_path(get_results_dir(db))
+            write_file(get_result_filename(db, os.path.basename(record.staging_dir)),
+                       simple_error_format(record.error))
+        remove_staging(record)
+
+    return len(batch)
+
+
+def pop_result(db, name):
+    # error reported for queued record; None if committed
+    result_file = get_result_filename(db, name)
+    try:
+        with open(result_file) as f:
+            error = f.read()
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return None
+    os.remove(result_file)
+    return error
+
+
+def recover_record(db, service_path):
+    # finish commit interrupted after record swap or install; caller holds commit lock
+    with db.lock_service_record(os.path.relpath(service_path, db.db)):
+        restore_backup(service_path)
+        if os.path.exists(os.path.join(service_path, MANIFEST_FILENAME)):
+            write_stack_records(db, [StagedServiceRecord.init_from_manifest(service_path)])
+
+
+def remove_old(path, now, max_age):
+    # remove file or directory not modified for max_age seconds; True if removed
+    try:
+        if now - os.path.getmtime(path) < max_age:
+            return False
+    except OSError:
+        return False
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+    return True
+
+
+def cleanup_staging(db, max_age=STAGING_MAX_AGE):
+    '''
+    finish commits interrupted by writer crash, commit records left queued and remove
+    staging directories and results left by interrupted writers; return number of staging
+    directories removed
+    '''
+    removed = 0
+    with commit_lock(db):
+        # swaps and stack record writes run only under commit lock; any found were interrupted
+        for backup in glob.glob(os.path.join(db.db, '*', '*', '.*' + BACKUP_SUFFIX)):
+            parent, name = os.path.split(backup)
+            recover_record(db, os.path.join(parent, name[1:-len(BACKUP_SUFFIX)]))
+        for manifest in glob.glob(os.path.join(db.db, '*', '*', '*', MANIFEST_FILENAME)):
+            recover_record(db, os.path.dirname(manifest))
+
+        if os.path.isdir(get_queue_dir(db)) and os.listdir(get_queue_dir(db)):
+            commit_queue(db)
+
+        now = time.time()
+        results_dir = get_results_dir(db)
+        for name in os.listdir(db.staging):
+            if name not in [QUEUE_DIRNAME, RESULTS_DIRNAME, COMMIT_LOCK_FILENAME]:
+                removed += remove_old(os.path.join(db.staging, name), now, max_age)
+        if os.path.isdir(results_dir):
+            for name in os.listdir(results_dir):
+                remove_old(os.path.join(results_dir, name), now, max_age)
+
+    return removed
+
+
+class GroupCommitter(object):
+    '''
+    groups service records committed concurrently by writers in any process into shared
+    flushes; stats count flushes run by writers within this process
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            'flushes': 0,
+            'records': 0,
+        }
+
+    def commit(self, db, record):
+        try:
+            stage_record(db, record)
+            queue_record(db, record)
+        except Exception as e:
+            remove_staging(record)
+            record.error = e
+            record.done = True
+            raise
+
+        name = os.path.basename(record.staging_dir)
+        with commit_lock(db):
+            is_queued = os.path.isdir(record.staging_dir)
+            if is_queued:
+                # no flush since record queued; commit it with records queued by other writers
+                count = commit_queue(db)
+                with self._lock:
+                    self.stats['flushes'] += 1
+                    self.stats['records'] += count
+
+            error = pop_result(db, name)
+            if error is None and not is_queued:
+                # committed by earlier lock holder, which may have been killed before finishing
+                recover_record(db, get_service_path(db, record.service_id))
+
+        record.done = True
+        if error is not None:
+            record.error = skybase.exceptions.StateDBError('{0}: {1}'.format(record.service_id, error))
+            raise record.error
+
+
+class GroupCommitterRegistry(object):
+    '''
+    process-wide registry of group committers, one per planet state db
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._committers = dict()
+
+    def get(self, db):
+        key = (os.path.normpath(db.db), db.backend, db.sqlite_file)
+        with self._lock:
+            committer = self._committers.get(key)
+            if committer is None:
+                committer = self._committers[key] = GroupCommitter()
+            return committer
+
+
+# shared by all writers within process
+group_committer_registry = GroupCommitterRegistry()
+
+
+def commit_service_record(db, record):
+    group_committer_registry.get(db).commit(db, record)
+
+
+if __name__ == '__main__':
+    # group commit throughput and crash consistency against temporary planet state db, with
+    # writers in separate processes as in prefork worker pool:
+    #   python -m skybase.actions.dbstate.commit [records] [processes]
+    import sys
+    import signal
+    import tempfile
+    from skybase.actions.dbstate import PlanetStateDb
+    from skybase.actions.dbstate import bulk
+
+    RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    PROCESSES = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    STACKS = 8
+    CRASH_RUNS = 20
+    # crash runs redeploy same service tags so kills land in record swaps
+    CRASH_SERVICES = 50
+
+    class BenchmarkConfig(object):
+        def __init__(self, root, backend):
+            self.data = {'service_state': {
+                'db': os.path.join(root, 'DB'),
+                'archive': os.path.join(root, 'ARCHIVE'),
+                'resources': 'resources.yaml',
+                'backend': backend,
+                'sqlite_file': os.path.join(root, 'planet_state.sq3'),
+            }}
+
+    def make_record(n):
+        stacks = dict(('stack{0}'.format(s), {'cloud': {'provider': 'aws', 'id': 'id-{0}-{1}'.format(n, s),
+                                                        'name': 'name-{0}-{1}'.format(n, s)}})
+                      for s in range(STACKS))
+        log_entries = [['2016-01-01 00:00:00.000000', 'DEPLOY', 'service', '1.0', 'b', 'tag', name, 'artiball']
+                       for name in stacks]
+        return StagedServiceRecord('/planet/service{0}/tag'.format(n),
+                                   {'metadata.yaml': {'app_version': '1.0'}, 'blueprint.yaml': {'stacks': {}}},
+                                   stacks, log_entries)
+
+    def make_db(backend):
+        temp_dir = tempfile.mkdtemp()
+        temp_dirs.append(temp_dir)
+        return PlanetStateDb(runner_cfg=BenchmarkConfig(temp_dir, backend))
+
+    temp_dirs = []
+
+    def run_writers(db, records, processes):
+        # each writer process reports flushes it ran and records they committed
+        read_fd, write_fd = os.pipe()
+        pids = []
+        start = time.time()
+        for p in range(processes):
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                committer = GroupCommitter()
+                for n in range(p, records, processes):
+                    committer.commit(db, make_record(n))
+                os.write(write_fd, '{flushes} {records}\n'.format(**committer.stats))
+                os._exit(0)
+            pids.append(pid)
+        os.close(write_fd)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        elapsed = time.time() - start
+
+        with os.fdopen(read_fd) as f:
+            stats = [map(int, line.split()) for line in f]
+        return elapsed, sum(s[0] for s in stats), sum(s[1] for s in stats)
+
+    def is_complete(db, service_path):
+        # complete record has service files, log entries per deploy and every stack record
+        log_entries, total = servicelog.read(os.path.join(service_path, servicelog.FILENAME))
+        if not (os.path.isfile(os.path.join(service_path, 'metadata.yaml')) and
+                os.path.isfile(os.path.join(service_path, 'blueprint.yaml')) and
+                total and total % STACKS == 0):
+            return False
+        if db.backend == db.DIRECTORY:
+            return all(os.path.isfile(os.path.join(service_path, 'stack{0}'.format(s), db.resources))
+                       for s in range(STACKS))
+        return len(db.list_stacks(service_path[len(db.db):])) == STACKS
+
+    for backend in PlanetStateDb.BACKENDS:
+        for processes in [1, PROCESSES]:
+            db = make_db(backend)
+            elapsed, flushes, records = run_writers(db, RECORDS, processes)
+            print '{0:9} {1:2} writer processes: {2} records {3:.2f}s ({4:.1f} records/s, {5:.1f} records/flush)'.format(
+                backend, processes, RECORDS, elapsed, RECORDS / elapsed, float(records) / flushes)
+
+        # kill writer process at random points; after recovery by restarted worker every
+        # record in db must be complete and every stack record belong to a record
+        db = make_db(backend)
+        for run in range(CRASH_RUNS):
+            pid = os.fork()
+            if pid == 0:
+                for n in range(1000):
+                    commit_service_record(db, make_record((run * 7 + n) % CRASH_SERVICES))
+                os._exit(0)
+            time.sleep(0.05 + (run % 5) * 0.03)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            cleanup_staging(db)
+
+        services = [os.path.join(db.db, 'planet', name) for name in os.listdir(os.path.join(db.db, 'planet'))]
+        incomplete = sum(1 for service_dir in services if not is_complete(db, os.path.join(service_dir, 'tag')))
+        orphans = sum(1 for recid, resources in bulk.iter_stack_records(db)
+                      if not os.path.isdir(os.path.dirname(get_service_path(db, recid))))
+        print '{0:9} crash: {1} kills, {2} records committed, {3} incomplete, {4} orphan stack records'.format(
+            backend, CRASH_RUNS, len(services), incomplete, orphans)
+
+    for temp_dir in temp_dirs:
+        shutil.rmtree(temp_dir, ignore_errors=True)
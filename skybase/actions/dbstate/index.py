@@ -0,0 +1,288 @@
+import os
+import glob
+import time
+import errno
+import fnmatch
+import threading
+
+from skybase.utils import yamlio
+from skybase.utils.yamlcache import MTIME_TRUST_AGE
+
+# in-memory index of planet state db directory tree.  directory listings and parsed
+# yaml record files are held per process and revalidated by stat no more often than refresh
+# interval (seconds).  only directories whose mtime changed are re-listed and only files
+# whose (size, mtime) changed are re-read.  writes made through PlanetStateDb in current
+# process invalidate affected paths immediately.
+DEFAULT_REFRESH_INTERVAL = 1
+
+
+class StateIndexDirectory(object):
+    __slots__ = ['exists', 'mtime', 'checked', 'entries']
+
+    def __init__(self):
+        self.exists = False
+        self.mtime = None
+        self.checked = 0
+        self.entries = dict()
+
+
+class StateIndexFile(object):
+    __slots__ = ['signature', 'checked', 'loader', 'data']
+
+    def __init__(self):
+        self.signature = None
+        self.checked = 0
+        self.loader = None
+        self.data = None
+
+
+class PlanetStateIndex(object):
+    '''
+    in-memory view of planet state db tree supporting glob, listdir, isdir and
+    record file reads.  parsed file contents are shared between callers and must
+    be treated as read-only.
+    '''
+
+    def __init__(self, db, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.db = os.path.normpath(db)
+        self.refresh_interval = refresh_interval
+        self.root = StateIndexDirectory()
+        self.stats = {
+            'listdir': 0,
+            'reads': 0,
+        }
+        self._lock = threading.Lock()
+
+    def _split_path(self, path):
+        # path components relative to db root; None if outside db
+        relpath = os.path.relpath(os.path.normpath(path), self.db)
+        if relpath == os.curdir:
+            return []
+        if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+            return None
+        return relpath.split(os.sep)
+
+    def _is_stale(self, node, now):
+        return now - node.checked >= self.refresh_interval
+
+    def _revalidate_directory(self, path, node, now):
+        if not self._is_stale(node, now):
+            return
+        node.checked = now
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            node.exists = False
+            node.mtime = None
+            node.entries = dict()
+            return
+
+        node.exists = True
+
+        if st.st_mtime == node.mtime:
+            return
+
+        # re-list changed directory, keeping nodes for entries of unchanged type
+        entries = dict()
+        for name in os.listdir(path):
+            is_dir = os.path.isdir(os.path.join(path, name))
+            entry = node.entries.get(name)
+            if is_dir and not isinstance(entry, StateIndexDirectory):
+                entry = StateIndexDirectory()
+            elif not is_dir and not isinstance(entry, StateIndexFile):
+                entry = StateIndexFile()
+            entries[name] = entry
+
+        node.entries = entries
+        self.stats['listdir'] += 1
+
+        # mtime granularity too coarse to trust for recently modified directory
+        node.mtime = st.st_mtime if now - st.st_mtime > MTIME_TRUST_AGE else None
+
+    def _lookup(self, path, now):
+        # return node at path, revalidating directories along the way
+        parts = self._split_path(path)
+        if parts is None:
+            return None
+
+        node_path, node = self.db, self.root
+        self._revalidate_directory(node_path, node, now)
+        for part in parts:
+            if not isinstance(node, StateIndexDirectory):
+                return None
+            node = node.entries.get(part)
+            if node is None:
+                return None
+            node_path = os.path.join(node_path, part)
+            if isinstance(node, StateIndexDirectory):
+                self._revalidate_directory(node_path, node, now)
+        return node
+
+    def isdir(self, path):
+        with self._lock:
+            node = self._lookup(path, time.time())
+            return isinstance(node, StateIndexDirectory) and node.exists
+
+    def listdir(self, path):
+        with self._lock:
+            node = self._lookup(path, time.time())
+            if not (isinstance(node, StateIndexDirectory) and node.exists):
+                raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+            return node.entries.keys()
+
+    def glob(self, pattern):
+        '''
+        return paths matching pattern; same matching rules as glob.glob
+        '''
+        parts = self._split_path(pattern)
+        if parts is None:
+            return glob.glob(pattern)
+
+        with self._lock:
+            now = time.time()
+            matches = [(self.db, self.root)]
+
+            for part in parts:
+                part_matches = []
+                for path, node in matches:
+                    if not isinstance(node, StateIndexDirectory):
+                        continue
+                    self._revalidate_directory(path, node, now)
+
+                    if glob.has_magic(part):
+                        names = fnmatch.filter(node.entries.keys(), part)
+                        # leading dot must be matched explicitly
+                        if not part.startswith('.'):
+                            names = [name for name in names if not name.startswith('.')]
+                    else:
+                        names = [part] if part in node.entries else []
+
+                    for name in sorted(names):
+                        part_matches.append((os.path.join(path, name), node.entries[name]))
+                matches = part_matches
+
+            return [path for path, node in matches]
+
+    def read(self, path, loader):
+        '''
+        return contents of file at path as parsed by loader; re-read only when changed.
+        file read and parsed without holding index lock.
+        '''
+        with self._lock:
+            now = time.time()
+            node = self._lookup(path, now)
+            if not isinstance(node, StateIndexFile):
+                raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+            if node.loader is loader and not self._is_stale(node, now):
+                return node.data
+            cached = (node.signature, node.data) if node.loader is loader else (None, None)
+
+        with open(path, 'r') as f:
+            st = os.fstat(f.fileno())
+            signature = (st.st_size, st.st_mtime)
+            reread = cached[0] != signature
+            data = loader(f.read()) if reread else cached[1]
+
+        # install only if file unchanged since read; otherwise left stale for next reader
+        try:
+            st = os.stat(path)
+        except OSError:
+            return data
+
+        with self._lock:
+            if reread:
+                self.stats['reads'] += 1
+            if (st.st_size, st.st_mtime) == signature:
+                node.checked = now
+                node.loader = loader
+                node.data = data
+                # mtime granularity too coarse to trust for recently modified file
+                node.signature = signature if now - st.st_mtime > MTIME_TRUST_AGE else None
+        return data
+
+    def read_yaml(self, path):
+        return self.read(path, yamlio.load_file_data)
+
+    def invalidate(self, path=None):
+        '''
+        force revalidation of path, its parent directories and everything below it
+        on next access.  entire index if path not provided.
+        '''
+        parts = [] if path is None else self._split_path(path)
+        if parts is None:
+            return
+
+        with self._lock:
+            node = self.root
+            node.checked = 0
+            for part in parts:
+                if not isinstance(node, StateIndexDirectory):
+                    return
+                node = node.entries.get(part)
+                if node is None:
+                    return
+                node.checked = 0
+
+            nodes = [node]
+            while nodes:
+                node = nodes.pop()
+                node.checked = 0
+                if isinstance(node, StateIndexDirectory):
+                    nodes.extend(node.entries.values())
+
+    def build(self):
+        '''
+        walk entire db tree and load all yaml record files into index
+        '''
+        yaml_files = []
+        with self._lock:
+            now = time.time()
+            nodes = [(self.db, self.root)]
+            while nodes:
+                path, node = nodes.pop()
+                self._revalidate_directory(path, node, now)
+                for name, entry in node.entries.items():
+                    entry_path = os.path.join(path, name)
+                    if isinstance(entry, StateIndexDirectory):
+                        nodes.append((entry_path, entry))
+                    elif name.endswith('.yaml'):
+                        yaml_files.append(entry_path)
+
+        for yaml_file in yaml_files:
+            # unreadable records reported when queried, not at build
+            try:
+                self.read_yaml(yaml_file)
+            except (IOError, yamlio.YAMLError):
+                pass
+
+        return len(yaml_files)
+
+
+class PlanetStateIndexRegistry(object):
+    '''
+    process-wide registry of planet state indexes, one per planet state db root
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = dict()
+
+    def get(self, db, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        key = os.path.normpath(db)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = PlanetStateIndex(key, refresh_interval)
+            index.refresh_interval = refresh_interval
+            return index
+
+    def invalidate(self):
+        # drop all indexes; next lookup rebuilds from disk
+        with self._lock:
+            self._indexes.clear()
+
+
+# shared by all consumers within process
+state_index_registry = PlanetStateIndexRegistry()
@@ -0,0 +1,263 @@
+import os
+import errno
+import fcntl
+import struct
+import tempfile
+import contextlib
+
+from skybase.utils import mkdir_path
+
+# append-only service log.  entries are tab separated lines in service log file
+# (timestamp, action, service, ...) with fixed width offset index in hidden sidecar file.
+# index entry holds entry offset and length, timestamp and action so tail, paging and
+# time range / action filtered reads seek directly to matching entries.  index is derived
+# data: entries appended without index (older releases, interrupted append) are indexed
+# on next access.
+FILENAME = 'service.log'
+INDEX_SUFFIX = '.idx'
+INDEX_ENTRY = struct.Struct('<QI26s16s')
+
+
+def get_index_filename(log_file):
+    dirname, basename = os.path.split(log_file)
+    return os.path.join(dirname, '.' + basename + INDEX_SUFFIX)
+
+
+def make_entry(fields):
+    return '\t'.join('{0}'.format(field) for field in fields) + '\n'
+
+
+def pack_index_entry(offset, line):
+    fields = line.split('\t', 2)
+    timestamp = fields[0]
+    action = fields[1] if len(fields) > 1 else ''
+    return INDEX_ENTRY.pack(offset, len(line), timestamp, action)
+
+
+def unpack_index_entry(data):
+    offset, length, timestamp, action = INDEX_ENTRY.unpack(data)
+    return offset, length, timestamp.rstrip('\0'), action.rstrip('\0')
+
+
+@contextlib.contextmanager
+def locked_log(log_file, exclusive=True):
+    '''
+    open log file holding flock; reopen if log rotated while waiting for lock
+    '''
+    while True:
+        f = open(log_file, 'a' if exclusive else 'r')
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            is_current = os.fstat(f.fileno()).st_ino == os.stat(log_file).st_ino
+        except OSError:
+            is_current = False
+        if is_current:
+            break
+        f.close()
+
+    # closing file releases lock
+    try:
+        yield f
+    finally:
+        f.close()
+
+
+def read_index_entry(idx, position):
+    idx.seek(position * INDEX_ENTRY.size)
+    return unpack_index_entry(idx.read(INDEX_ENTRY.size))
+
+
+def get_index_count(idx):
+    return os.fstat(idx.fileno()).st_size // INDEX_ENTRY.size
+
+
+def is_index_current(idx, log_size):
+    # index current if last entry ends at end of log
+    count = get_index_count(idx)
+    if count == 0:
+        return log_size == 0
+    offset, length, timestamp, action = read_index_entry(idx, count - 1)
+    return offset + length == log_size
+
+
+def sync_index(log_file):
+    '''
+    index log entries appended since last indexed entry.  caller holds exclusive lock.
+    '''
+    idx_file = get_index_filename(log_file)
+    log_size = os.path.getsize(log_file)
+
+    with open(idx_file, 'a+b') as idx:
+        idx_size = os.fstat(idx.fileno()).st_size
+        count = idx_size // INDEX_ENTRY.size
+
+        # drop partially written index entry
+        if idx_size != count * INDEX_ENTRY.size:
+            idx.truncate(count * INDEX_ENTRY.size)
+
+        end = 0
+        if count:
+            offset, length, timestamp, action = read_index_entry(idx, count - 1)
+            end = offset + length
+
+        # index beyond end of log belongs to replaced log; reindex from start
+        if end > log_size:
+            idx.truncate(0)
+            end = count = 0
+
+        if end < log_size:
+            with open(log_file, 'rb') as lf:
+                lf.seek(end)
+                entries = []
+                for line in lf:
+                    # partially written entry indexed once complete
+                    if not line.endswith('\n'):
+                        break
+                    entries.append(pack_index_entry(end, line))
+                    end += len(line)
+                    count += 1
+            idx.seek(0, os.SEEK_END)
+            idx.write(''.join(entries))
+
+    return count
+
+
+def append(log_file, entries, sync=False):
+    '''
+    append entries (each a list of fields) to log and index; return number of log entries.
+    log and index flushed to disk before return when sync set.
+    '''
+    with locked_log(log_file) as f:
+        count = sync_index(log_file)
+        offset = os.fstat(f.fileno()).st_size
+
+        lines = [make_entry(fields) for fields in entries]
+        f.write(''.join(lines))
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+
+        with open(get_index_filename(log_file), 'ab') as idx:
+            for line in lines:
+                idx.write(pack_index_entry(offset, line))
+                offset += len(line)
+            if sync:
+                idx.flush()
+                os.fsync(idx.fileno())
+
+    return count + len(lines)
+
+
+def bisect_index(idx, lo, hi, timestamp):
+    # position of first entry in [lo, hi) with entry timestamp >= timestamp
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if read_index_entry(idx, mid)[2] < timestamp:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def read(log_file, limit=None, offset=0, since=None, until=None, actions=None):
+    '''
+    return (entries, total) for log entries with timestamp in [since, until) and action
+    in actions when provided.  of total matching entries, returns at most limit entries
+    skipping offset most recent; entries in chronological order.
+    '''
+    try:
+        with locked_log(log_file, exclusive=False) as lf:
+            log_size = os.fstat(lf.fileno()).st_size
+            idx_file = get_index_filename(log_file)
+            try:
+                idx = open(idx_file, 'rb')
+                is_current = is_index_current(idx, log_size)
+                idx.close()
+            except IOError:
+                is_current = log_size == 0
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return [], 0
+
+    if not is_current:
+        with locked_log(log_file):
+            sync_index(log_file)
+
+    with locked_log(log_file, exclusive=False) as lf:
+        try:
+            idx = open(get_index_filename(log_file), 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return [], 0
+
+        with idx:
+            lo, hi = 0, get_index_count(idx)
+
+            # timestamps appended in order; bound range by binary search
+            if since:
+                lo = bisect_index(idx, lo, hi, since)
+            if until:
+                hi = bisect_index(idx, lo, hi, until)
+
+            if actions:
+                positions = [position for position in range(lo, hi)
+                             if read_index_entry(idx, position)[3] in actions]
+            else:
+                positions = range(lo, hi)
+
+            total = len(positions)
+            end = max(total - offset, 0)
+            start = max(end - limit, 0) if limit else 0
+            index_entries = [read_index_entry(idx, position) for position in positions[start:end]]
+
+        result = []
+        for entry_offset, length, timestamp, action in index_entries:
+            lf.seek(entry_offset)
+            result.append(lf.read(length).rstrip('\n'))
+
+    return result, total
+
+
+def rotate(log_file, archive_file, keep):
+    '''
+    move all but keep most recent entries from log to end of archive file;
+    return number of entries moved
+    '''
+    with locked_log(log_file):
+        count = sync_index(log_file)
+        if count <= keep:
+            return 0
+
+        idx_file = get_index_filename(log_file)
+        with open(idx_file, 'rb') as idx:
+            idx.seek((count - keep) * INDEX_ENTRY.size)
+            kept_index = [unpack_index_entry(idx.read(INDEX_ENTRY.size)) for _ in range(keep)]
+
+        # offset of first kept entry
+        split = kept_index[0][0] if kept_index else os.path.getsize(log_file)
+
+        with open(log_file, 'rb') as lf:
+            rotated = lf.read(split)
+            kept = lf.read()
+
+        mkdir_path(os.path.dirname(archive_file))
+        with open(archive_file, 'ab') as af:
+            af.write(rotated)
+
+        # replace index then log while holding lock; waiting readers and writers reopen new log
+        dirname = os.path.dirname(log_file)
+        fd, temp_idx = tempfile.mkstemp(dir=dirname, prefix='.' + FILENAME + '-')
+        with os.fdopen(fd, 'wb') as idx:
+            for entry_offset, length, timestamp, action in kept_index:
+                idx.write(INDEX_ENTRY.pack(entry_offset - split, length, timestamp, action))
+
+        fd, temp_log = tempfile.mkstemp(dir=dirname, prefix='.' + FILENAME + '-')
+        with os.fdopen(fd, 'wb') as lf:
+            lf.write(kept)
+
+        os.rename(temp_idx, idx_file)
+        os.rename(temp_log, log_file)
+
+    return count - keep
@@ -0,0 +1,282 @@
+import os
+import glob
+import sqlite3
+import threading
+
+from skybase.utils import mkdir_path, basic_timestamp
+from skybase.utils import yamlio
+
+# planet state record hierarchy; one row per deployed stack
+RECORD_COLUMNS = ['planet', 'service', 'tag', 'stack']
+
+# connections cached per process and thread; sqlite connections must not cross either
+_connections = threading.local()
+
+
+def create_db(conn):
+    schema = '''
+        BEGIN TRANSACTION;
+
+        CREATE TABLE IF NOT EXISTS stacks(
+          planet varchar(250) NOT NULL,
+          service varchar(250) NOT NULL,
+          tag varchar(250) NOT NULL,
+          stack varchar(250) NOT NULL,
+          provider varchar(250),
+          stack_id varchar(1024),
+          stack_name varchar(250),
+          resources text NOT NULL,
+          PRIMARY KEY (planet, service, tag, stack));
+
+        CREATE INDEX IF NOT EXISTS stacks_stack_id_idx on stacks (stack_id);
+        CREATE INDEX IF NOT EXISTS stacks_stack_name_idx on stacks (stack_name);
+
+        CREATE TABLE IF NOT EXISTS archive(
+          id INTEGER PRIMARY KEY ASC,
+          planet varchar(250) NOT NULL,
+          service varchar(250) NOT NULL,
+          tag varchar(250) NOT NULL,
+          stack varchar(250) NOT NULL,
+          provider varchar(250),
+          stack_id varchar(1024),
+          stack_name varchar(250),
+          resources text NOT NULL,
+          archived varchar(30));
+
+        CREATE INDEX IF NOT EXISTS archive_record_idx on archive (planet, service, tag, stack);
+        CREATE INDEX IF NOT EXISTS archive_stack_id_idx on archive (stack_id);
+
+        COMMIT;
+    '''
+
+    c = conn.cursor()
+    c.executescript(schema)
+
+
+def connect(sqlite_file, create=create_db):
+    # reuse connection opened by current process and thread; create schema on first connect
+    cache = getattr(_connections, 'cache', None)
+    if cache is None or _connections.pid != os.getpid():
+        cache = _connections.cache = dict()
+        _connections.pid = os.getpid()
+
+    conn = cache.get(sqlite_file)
+    if conn is None:
+        mkdir_path(os.path.dirname(sqlite_file))
+        conn = sqlite3.connect(sqlite_file, timeout=30)
+        conn.text_factory = str
+        conn.execute('PRAGMA journal_mode=WAL')
+        create(conn)
+        cache[sqlite_file] = conn
+    return conn
+
+
+def make_record_id(row):
+    return '/' + '/'.join(row)
+
+
+def split_record_id(recid):
+    return recid.strip('/').split('/')
+
+
+def _make_where(criteria):
+    # criteria positionally aligned with RECORD_COLUMNS; blank values match all
+    clauses = []
+    params = []
+    for column, value in zip(RECORD_COLUMNS, criteria):
+        if value:
+            clauses.append('{0} = ?'.format(column))
+            params.append(value)
+    where = ' where ' + ' and '.join(clauses) if clauses else ''
+    return where, params
+
+
+def _make_limit(limit, offset):
+    # page of rows; all rows after offset if no limit
+    if not (limit or offset):
+        return '', []
+    return ' limit ? offset ?', [limit if limit else -1, offset or 0]
+
+
+def iter_records(db, criteria, limit=None, offset=0):
+    '''
+    generate (record id, resources) for page of stacks matching criteria, read from
+    cursor as consumed
+    '''
+    where, params = _make_where(criteria)
+    page, page_params = _make_limit(limit, offset)
+    cursor = connect(db.sqlite_file).execute(
+        'select planet, service, tag, stack, resources from stacks{0} '
+        'order by planet, service, tag, stack{1}'.format(where, page), params + page_params)
+    for row in cursor:
+        yield make_record_id(row[:4]), yamlio.load(row[4])
+
+
+def find_records(db, criteria, limit=None, offset=0):
+    '''
+    return (record id, resources) for page of stacks matching criteria
+    '''
+    return list(iter_records(db, criteria, limit, offset))
+
+
+def count_records(db, criteria):
+    where, params = _make_where(criteria)
+    cursor = connect(db.sqlite_file).execute('select count(*) from stacks{0}'.format(where), params)
+    return cursor.fetchone()[0]
+
+
+def iter_record_ids(db, criteria, depth, limit=None, offset=0):
+    '''
+    generate page of distinct record ids at hierarchy depth for all stacks matching
+    criteria, read from cursor as consumed
+    '''
+    if depth == 0:
+        for result in [('', None)][offset or 0:(offset or 0) + limit if limit else None]:
+            yield result
+        return
+
+    columns = ', '.join(RECORD_COLUMNS[:depth])
+    where, params = _make_where(criteria)
+    page, page_params = _make_limit(limit, offset)
+    cursor = connect(db.sqlite_file).execute(
+        'select distinct {0} from stacks{1} order by {0}{2}'.format(columns, where, page), params + page_params)
+    for row in cursor:
+        yield make_record_id(row), None
+
+
+def find_record_ids(db, criteria, depth, limit=None, offset=0):
+    '''
+    return page of distinct record ids at hierarchy depth for all stacks matching criteria
+    '''
+    return list(iter_record_ids(db, criteria, depth, limit, offset))
+
+
+def count_record_ids(db, criteria, depth):
+    if depth == 0:
+        return 1
+
+    columns = ', '.join(RECORD_COLUMNS[:depth])
+    where, params = _make_where(criteria)
+    cursor = connect(db.sqlite_file).execute(
+        'select count(*) from (select distinct {0} from stacks{1})'.format(columns, where), params)
+    return cursor.fetchone()[0]
+
+
+def exists(db, criteria):
+    where, params = _make_where(criteria)
+    cursor = connect(db.sqlite_file).execute('select 1 from stacks{0} limit 1'.format(where), params)
+    return cursor.fetchone() is not None
+
+
+def find_record_id(db, key):
+    '''
+    return record id of stack with provider stack id or launch name key
+    '''
+    cursor = connect(db.sqlite_file).execute(
+        'select planet, service, tag, stack from stacks where stack_id = ? '
+        'union select planet, service, tag, stack from stacks where stack_name = ? limit 1',
+        (key, key))
+    row = cursor.fetchone()
+    return make_record_id(row) if row else None
+
+
+def list_stacks(db, service_id):
+    planet, service, tag = split_record_id(service_id)
+    cursor = connect(db.sqlite_file).execute(
+        'select stack from stacks where planet = ? and service = ? and tag = ? order by stack',
+        (planet, service, tag))
+    return [row[0] for row in cursor]
+
+
+def _insert_stack(conn, recid, resources):
+    cloud = resources.get('cloud', {})
+    conn.execute(
+        'insert or replace into stacks '
+        '(planet, service, tag, stack, provider, stack_id, stack_name, resources) '
+        'values (?,?,?,?,?,?,?,?)',
+        split_record_id(recid) + [cloud.get('provider'), cloud.get('id'), cloud.get('name'), yamlio.dump(resources)])
+
+
+def _insert_archive(conn, recid, resources, archived):
+    cloud = resources.get('cloud', {})
+    conn.execute(
+        'insert into archive '
+        '(planet, service, tag, stack, provider, stack_id, stack_name, resources, archived) '
+        'values (?,?,?,?,?,?,?,?,?)',
+        split_record_id(recid) + [cloud.get('provider'), cloud.get('id'), cloud.get('name'), yamlio.dump(resources), archived])
+
+
+def write_stack_record(db, recid, resources):
+    conn = connect(db.sqlite_file)
+    with conn:
+        _insert_stack(conn, recid, resources)
+    return recid
+
+
+def archive_stack_record(db, recid):
+    '''
+    move stack record to archive table within single transaction
+    '''
+    conn = connect(db.sqlite_file)
+    where, params = _make_where(split_record_id(recid))
+    with conn:
+        row = conn.execute('select resources from stacks{0}'.format(where), params).fetchone()
+        if row is None:
+            return False
+        _insert_archive(conn, recid, yamlio.load(row[0]), basic_timestamp())
+        conn.execute('delete from stacks{0}'.format(where), params)
+    return True
+
+
+def migrate_from_directory(db, apply=False):
+    '''
+    one-shot copy of planet state records and archive from directory layout
+    into sqlite database.  existing sqlite stack records with same id are replaced,
+    as are archive records copied from directory by previous migration, so migration
+    can be repeated.
+    '''
+    result = {
+        'sqlite_file': db.sqlite_file,
+        'stacks': [],
+        'archive': [],
+        'apply': apply,
+    }
+
+    # planet state db layout: <db>/<planet>/<service>/<tag>/<stack>/<resources>
+    layout = ['*'] * len(RECORD_COLUMNS) + [db.resources]
+    db_files = sorted(glob.glob(os.path.join(db.db, *layout)))
+    archive_files = sorted(glob.glob(os.path.join(db.archive, *layout)))
+
+    def get_record_id(root, resources_file):
+        return os.path.dirname(resources_file)[len(root.rstrip('/')):]
+
+    def read_resources(resources_file):
+        with open(resources_file) as f:
+            return yamlio.load_file_data(f.read())
+
+    conn = connect(db.sqlite_file) if apply else None
+
+    try:
+        for resources_file in db_files:
+            recid = get_record_id(db.db, resources_file)
+            if apply:
+                _insert_stack(conn, recid, read_resources(resources_file))
+            result['stacks'].append(recid)
+
+        for resources_file in archive_files:
+            recid = get_record_id(db.archive, resources_file)
+            if apply:
+                # migrated archive rows have no archive time; rows archived in sqlite kept
+                where, params = _make_where(split_record_id(recid))
+                conn.execute('delete from archive{0} and archived is null'.format(where), params)
+                _insert_archive(conn, recid, read_resources(resources_file), None)
+            result['archive'].append(recid)
+    except Exception:
+        if apply:
+            conn.rollback()
+        raise
+
+    if apply:
+        conn.commit()
+
+    return result
@@ -0,0 +1,98 @@
+import os
+import errno
+import hashlib
+import tempfile
+
+from skybase.utils import mkdir_path
+from skybase.utils import yamlio
+
+# reverse index from provider stack id and stack launch name to planet state record id
+# for directory backend.  each key has one entry file in stack index directory named
+# by key digest and holding record id.  records written before index existed are indexed
+# once by backfill at state index build; marker file records completed backfill.
+BACKFILL_MARKER = '.backfilled'
+
+
+def get_stack_keys(resources):
+    # provider stack id and launch name from resources cloud section
+    cloud = resources.get('cloud', {})
+    return [key for key in [cloud.get('id'), cloud.get('name')] if key]
+
+
+def get_entry_filename(db, key):
+    return os.path.join(db.stack_index, hashlib.sha1(key).hexdigest())
+
+
+def read_entry(db, key):
+    try:
+        with open(get_entry_filename(db, key)) as f:
+            return f.read().strip() or None
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return None
+
+
+def write_entry(db, key, recid):
+    # write to temp file and rename so concurrent readers never see partial entry
+    mkdir_path(db.stack_index)
+    fd, temp_file = tempfile.mkstemp(dir=db.stack_index, prefix='.entry-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(recid)
+        os.rename(temp_file, get_entry_filename(db, key))
+    except Exception:
+        os.remove(temp_file)
+        raise
+
+
+def remove_entry(db, key, recid):
+    # remove only if entry still refers to record; key may have been reused since
+    if read_entry(db, key) != recid:
+        return
+    try:
+        os.remove(get_entry_filename(db, key))
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def index_stack_record(db, recid, resources):
+    for key in get_stack_keys(resources):
+        write_entry(db, key, recid)
+
+
+def unindex_stack_record(db, recid, resources):
+    for key in get_stack_keys(resources):
+        remove_entry(db, key, recid)
+
+
+def find_record_id(db, key):
+    return read_entry(db, key)
+
+
+def backfill(db):
+    '''
+    write entries for all stack records in db not yet indexed; runs once per stack index
+    unless marker removed.  return number of entries written.
+    '''
+    marker = os.path.join(db.stack_index, BACKFILL_MARKER)
+    if os.path.exists(marker):
+        return 0
+
+    # planet state db layout: <db>/<planet>/<service>/<tag>/<stack>/<resources>
+    written = 0
+    for resources_file in db.index.glob(os.path.join(db.db, '*', '*', '*', '*', db.resources)):
+        recid = '/' + os.path.relpath(os.path.dirname(resources_file), db.index.db)
+        try:
+            resources = db.index.read_yaml(resources_file) or {}
+        except (IOError, yamlio.YAMLError):
+            continue
+        for key in get_stack_keys(resources):
+            if read_entry(db, key) != recid:
+                write_entry(db, key, recid)
+                written += 1
+
+    mkdir_path(db.stack_index)
+    open(marker, 'w').close()
+    return written
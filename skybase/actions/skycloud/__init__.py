@@ -1,6 +1,5 @@
 import os
 
-import yaml
 import json
 
 import heatclient.exc
@@ -11,6 +10,7 @@ from . import openstack
 from . import renderer
 from skybase.artiball import ARTIBALL_SCHEMA_ARGS
 from skybase.utils import make_temp_directory
+from skybase.utils import yamlio
 
 def launch_stacks(planet=None,
                   service=None,
@@ -289,7 +289,7 @@ def salt_grains_transfer(planet=None, service=None, runtime=None, system=None):
 
                     with open(os.path.join(tdir, salt_grain_filename), 'w') as grains_file:
                         # dump salt grains as YAML file and reset file marker to top
-                        grains_file.write(yaml.safe_dump(minion_grains, default_flow_style=False))
+                        yamlio.dump(minion_grains, grains_file)
                         grains_file.seek(0)
 
                         # generate service namespace path to salt folder
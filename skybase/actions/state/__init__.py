@@ -19,7 +19,7 @@ def create(mode, planet_name, service_name, tag, registration, provider, stacks,
 
 
 
-def read(mode, record_id, credentials=None, format=None):
+def read(mode, record_id, credentials=None, format=None, log_limit=None, log_offset=0):
     '''
     execute state db read action based on modality: local or restapi
     '''
@@ -27,26 +27,75 @@ def read(mode, record_id, credentials=None, format=None):
     result = dict()
 
     if mode == 'restapi':
-        result = restapi.read(record_id, credentials, format)
+        result = restapi.read(record_id, credentials, format, log_limit, log_offset)
 
     elif mode == 'local':
         # attempt to read from state db locally/directly
-        result = local.read(record_id, format=format)
+        result = local.read(record_id, format=format, log_limit=log_limit, log_offset=log_offset)
 
     return result
 
-def update(mode, record_id, service_record, credentials=None):
+def read_many(mode, record_ids=None, prefix=None, credentials=None, format=None, log_limit=None, log_offset=0):
     '''
-    execute state db read action based on modality: local or restapi
+    execute state db batch read action based on modality: local or restapi
+    '''
+
+    result = dict()
+
+    if mode == 'restapi':
+        result = restapi.read_many(credentials, record_ids, prefix, format, log_limit, log_offset)
+
+    elif mode == 'local':
+        # attempt to read from state db locally/directly
+        result = local.read_many(record_ids, prefix, format=format, log_limit=log_limit, log_offset=log_offset)
+
+    return result
+
+def read_changes(mode, since=0, limit=None, timeout=0, credentials=None):
+    '''
+    read state db change feed after sequence number since based on modality: local or restapi
+    '''
+
+    result = dict()
+
+    if mode == 'restapi':
+        result = restapi.read_changes(credentials, since, limit, timeout)
+
+    elif mode == 'local':
+        # attempt to read from state db locally/directly
+        result = local.read_changes(since, limit, timeout)
+
+    return result
+
+def update(mode, record_id, service_record, credentials=None, version=None):
+    '''
+    execute state db read action based on modality: local or restapi.
+    version is record version update was made against.
     '''
 
     result = dict()
 
     if mode == 'restapi':
-        result = restapi.update(record_id, service_record, credentials)
+        result = restapi.update(record_id, service_record, credentials, version)
 
     elif mode == 'local':
         # attempt to read from state db locally/directly
-        result = local.update(record_id, service_record)
+        result = local.update(record_id, service_record, version)
+
+    return result
+
+def find_stack(mode, provider_key, credentials=None):
+    '''
+    find stack record by provider stack id or launch name based on modality: local or restapi
+    '''
+
+    result = dict()
+
+    if mode == 'restapi':
+        result = restapi.find_stack(provider_key, credentials)
+
+    elif mode == 'local':
+        # attempt to lookup from state db locally/directly
+        result = local.find_stack(provider_key)
 
     return result
@@ -1,13 +1,16 @@
 import string
-import shelve
+import whichdb
 import time
 import uuid
 import os
-import yaml
 
 import skybase.config as sky_cfg
 from skybase.service.state import ServiceRegistryRecord
-from skybase.utils import mkdir_path
+from skybase.actions.dbstate import PlanetStateDb, PlanetStateDbQuery
+from skybase.actions.dbstate import changes
+from skybase.actions.dbstate.bistore import BeforeImageStore, DEFAULT_SEGMENT_SIZE
+from skybase.utils import yamlio, simple_error_format
+import skybase.exceptions
 
 def create(planet_name, service_name, tag, registration, provider, stacks):
     # TODO: enable real work replacing record_id with emission from class
@@ -16,51 +19,118 @@ def create(planet_name, service_name, tag, registration, provider, stacks):
     record_id = os.path.join('/', planet_name, service_name, tag)
     return record_id
 
-def read(record_id, format=None):
+def read(record_id, format=None, log_limit=None, log_offset=0):
     '''
-    attempt to instantiate state db record from id
+    attempt to instantiate state db record from id; service log paged by log_limit, log_offset
     '''
+    result, version = read_with_version(record_id, format, log_limit, log_offset)
+    return result
 
-    state_db_record = ServiceRegistryRecord.init_from_id(record_id)
+def read_with_version(record_id, format=None, log_limit=None, log_offset=0):
+    '''
+    read state db record and return (result, record version) for use as etag
+    '''
+    state_db_record = ServiceRegistryRecord.init_from_id(record_id, log_limit=log_limit, log_offset=log_offset)
 
     if format == 'yaml':
         result = state_db_record.serialize_as_yaml()
     else:
         result = state_db_record.output_as_dict()
+        result['version'] = state_db_record.version
+    return result, state_db_record.version
+
+def read_many(record_ids=None, prefix=None, format=None, log_limit=None, log_offset=0):
+    '''
+    read state db records by id and all records under /planet[/service] prefix.
+    returns records by id and errors by id for ids that cannot be read.
+    '''
+    record_ids = list(record_ids or [])
+    if prefix:
+        record_ids.extend(PlanetStateDb().list_service_ids(*prefix.strip('/').split('/')[:3]))
+
+    result = {
+        'records': dict(),
+        'errors': dict(),
+    }
+    for record_id in record_ids:
+        if record_id in result['records']:
+            continue
+        try:
+            # service record id: /planet/service/tag
+            if len(record_id.split('/')) != 4:
+                raise skybase.exceptions.StateDBError('invalid service record id: {0}'.format(record_id))
+            result['records'][record_id] = read(record_id, format, log_limit, log_offset)
+        except skybase.exceptions.StateDBError as e:
+            result['errors'][record_id] = simple_error_format(e)
     return result
 
-def update(record_id, record_object, **kwargs):
+def read_changes(since=0, limit=None, timeout=0):
+    '''
+    state db changes after sequence number since; wait up to timeout seconds for changes
+    '''
+    return changes.wait(PlanetStateDb(), since, limit, timeout)
+
+def find_stack(provider_key):
+    '''
+    find stack record by provider stack id or launch name
+    '''
+    query = PlanetStateDbQuery.init_from_provider_key(provider_key)
+    return query.format_result_set(query.execute())
+
+def update(record_id, record_object, version=None, **kwargs):
+    '''
+    update state db record from serialized record object.  version expected to match
+    current record version; defaults to version record object was read with.
+    '''
+    new_state_db_record = yamlio.load_object(record_object)
+    if version is None:
+        version = new_state_db_record.version
+
+    # fail fast on conflicting update before writing before image; read current record
+    # from disk as index may lag writes made by other processes
+    db = PlanetStateDb()
+    db.index.invalidate(os.path.join(db.db, record_id.strip('/')))
     current_state_db_record = ServiceRegistryRecord.init_from_id(record_id)
+    if version is not None and version != current_state_db_record.version:
+        raise skybase.exceptions.StateDBRecordConflictError(
+            '{0}: record version {1} does not match current version {2}'.format(
+                record_id, version, current_state_db_record.version))
+
     record_bi_key = create_bi_record(record_id, current_state_db_record)
 
-    new_state_db_record = yaml.load(record_object)
-    new_state_db_record.update()
+    # version checked again under record lock
+    update_result = new_state_db_record.update(version)
 
     result = {
         'record_id': record_id,
         'record_bi_key': record_bi_key,
+        'version': new_state_db_record.version,
+        'update': update_result,
     }
 
     return result
 
-#TODO: rename to get_bi for clarity
-def get_bi_db(config_dir=None):
+def get_bi_store(config_dir=None):
     # require runner config
     if not config_dir: config_dir = sky_cfg.CONFIG_DIR
     runner_cfg = sky_cfg.SkyConfig.init_from_file('runner', config_dir=config_dir)
+    service_state = runner_cfg.data['service_state']
 
-    # find service state before image object store
-    service_state_bi_dir = runner_cfg.data['service_state']['bi_dir']
-    service_state_bi_file = runner_cfg.data['service_state']['bi_file']
+    # find service state before image store
+    bi_store = BeforeImageStore(
+        service_state['bi_dir'],
+        segment_size=service_state.get('bi_segment_size', DEFAULT_SEGMENT_SIZE),
+        retention_days=service_state.get('bi_retention_days'),
+        retention_count=service_state.get('bi_retention_count'),
+    )
 
-    # DECISION-TODO: push path creation into role so that path existence is guaranteed
-    # idempotently make BI directory path if not exists
-    mkdir_path(service_state_bi_dir)
+    # one-shot import of before images from shelve file used by earlier releases
+    if service_state.get('bi_file'):
+        shelve_file = os.path.join(service_state['bi_dir'], service_state['bi_file'])
+        if whichdb.whichdb(shelve_file):
+            bi_store.import_shelve(shelve_file)
 
-    # prepare bi database file fullpath
-    service_state_bi = os.path.join(service_state_bi_dir, service_state_bi_file)
-
-    return service_state_bi
+    return bi_store
 
 def create_bi_record(record_id, record_object):
     # DECISION: should before image key be emitted from record_object method?
@@ -68,21 +138,19 @@ def create_bi_record(record_id, record_object):
     record_bi_key = '{0}.{1}.{2}'.format(string.replace(record_id.strip('/'), '/', '.'), ts, uuid.uuid4())
 
     # stash before image of service registry object
-    db = shelve.open(get_bi_db())
     # TODO: add skybase app version to record for backwards compatibility in reconstituting records
-    db[record_bi_key] = {
+    get_bi_store().put(record_bi_key, record_id, ts, {
         'id': record_bi_key,
         'record': record_object,
         'timestamp': ts,
         'record_id': record_id,
-    }
-    db.close()
+    })
 
     return record_bi_key
 
 def read_bi_record(record_bi_key):
-    db = shelve.open(get_bi_db())
-    record_object = db.get(record_bi_key)
-    db.close()
-    return record_object
+    return get_bi_store().get(record_bi_key)
 
+def list_bi_records(record_id):
+    # before image keys and timestamps for record id in time order
+    return [{'id': key, 'timestamp': ts} for key, ts in get_bi_store().list_keys(record_id)]
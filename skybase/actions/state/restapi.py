@@ -14,11 +14,13 @@ def create(planet_name, service_name, tag, registration, provider, stacks, crede
     result = response.json().get('data', {})
     return result
 
-def read(id, credentials, format=None):
+def read(id, credentials, format=None, log_limit=None, log_offset=None):
     response = skybase.api.state.read(
         record_id=id,
         credentials=credentials,
         format=format,
+        log_limit=log_limit,
+        log_offset=log_offset,
     )
 
     # TODO: examine response status (200, non-200) and header (json, plain-text) to determine handling
@@ -26,11 +28,53 @@ def read(id, credentials, format=None):
     result = response.json().get('data', {})
     return result
 
-def update(record_id, service_record, credentials):
+def read_many(credentials, record_ids=None, prefix=None, format=None, log_limit=None, log_offset=None):
+    response = skybase.api.state.read_many(
+        credentials=credentials,
+        record_ids=record_ids,
+        prefix=prefix,
+        format=format,
+        log_limit=log_limit,
+        log_offset=log_offset,
+    )
+
+    result = response.json().get('data', {})
+    return result
+
+def read_changes(credentials, since=0, limit=None, timeout=None):
+    response = skybase.api.state.read_changes(
+        credentials=credentials,
+        since=since,
+        limit=limit,
+        timeout=timeout,
+    )
+
+    result = response.json().get('data', {})
+    return result
+
+def update(record_id, service_record, credentials, version=None):
     response = skybase.api.state.update(
         record_id=record_id,
         service_record=service_record,
         credentials=credentials,
+        version=version,
+    )
+
+    # reraise record version conflict and missing record
+    update_errors = {
+        404: skybase.exceptions.StateDBRecordNotFoundError,
+        409: skybase.exceptions.StateDBRecordConflictError,
+    }
+    if response.status_code in update_errors:
+        raise update_errors[response.status_code](response.json().get('message'))
+
+    result = response.json().get('data', {})
+    return result
+
+def find_stack(provider_key, credentials):
+    response = skybase.api.state.find_stack(
+        provider_key=provider_key,
+        credentials=credentials,
     )
 
     result = response.json().get('data', {})
@@ -1,9 +1,16 @@
+import os
 import json
+import time
 import hmac
+import errno
 import hashlib
 import base64
+import urlparse
+import cookielib
+import threading
 
 import requests
+import requests.adapters
 
 from skybase import config as sky_cfg
 import skybase.utils
@@ -58,16 +65,196 @@ def create_auth_http_headers(credentials, data=''):
     }
     return headers
 
+# http connections kept alive and reused per process and host by requests.Session with
+# connection pool of pool_size.  connections idle longer than idle_timeout seconds since
+# last response completed dropped before next request, ahead of servers closing them.  failed requests retried only for
+# methods safe to repeat; timeout in seconds applied to requests not giving own timeout.
+# settings from http section of runner.yaml unless configured by caller (client.yaml).
+DEFAULT_HTTP_SETTINGS = {
+    'pool_size': 10,
+    'retries': 2,
+    'timeout': None,
+    'idle_timeout': 5,
+}
+RETRY_METHODS = ['GET', 'HEAD', 'OPTIONS']
+
+
+class HTTPSessionRegistry(object):
+    '''
+    process-wide registry of requests.Session per scheme and host, shared by threads.
+    response cookies not kept so requests stay independent as with requests.request().
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = dict()
+        self._pid = os.getpid()
+        self._settings = None
+
+    def configure(self, **settings):
+        # replace settings; existing sessions closed so new pool size applies
+        with self._lock:
+            self._settings = dict(DEFAULT_HTTP_SETTINGS)
+            self._settings.update((k, v) for k, v in settings.items() if k in DEFAULT_HTTP_SETTINGS)
+            self._close_all()
+
+    @property
+    def settings(self):
+        if self._settings is None:
+            try:
+                runner_cfg = sky_cfg.SkyConfig.init_from_file('runner', config_dir=sky_cfg.CONFIG_DIR)
+                settings = runner_cfg.get_data_value('http') or {}
+            except skybase.exceptions.SkyBaseConfigurationError:
+                settings = {}
+            with self._lock:
+                if self._settings is None:
+                    self._settings = dict(DEFAULT_HTTP_SETTINGS)
+                    self._settings.update((k, v) for k, v in settings.items() if k in DEFAULT_HTTP_SETTINGS)
+        return self._settings
+
+    def _new_session(self):
+        session = requests.Session()
+        session.cookies.set_policy(cookielib.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=int(self.settings['pool_size']))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _close_all(self):
+        for session, last_used in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def get(self, url):
+        settings = self.settings
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        now = time.time()
+
+        with self._lock:
+            # connections inherited from parent process belong to it
+            if os.getpid() != self._pid:
+                self._sessions.clear()
+                self._pid = os.getpid()
+
+            entry = self._sessions.get(key)
+            if entry is None:
+                session = self._new_session()
+                self._sessions[key] = (session, now)
+            else:
+                session, last_used = entry
+                if settings['idle_timeout'] is not None and now - last_used > settings['idle_timeout']:
+                    # pooled connections closed; session opens new ones
+                    session.close()
+                    self._sessions[key] = (session, now)
+            return session
+
+    def release(self, url, session):
+        # response completed; connection returned to pool idle from now
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry and entry[0] is session:
+                self._sessions[key] = (session, time.time())
+
+    def invalidate(self):
+        with self._lock:
+            self._close_all()
+
+
+# shared by rest, state and salt api clients within process
+http_session_registry = HTTPSessionRegistry()
+
+
 def submit_http_request(method, url, **kwargs):
-    # request to skybase http services
-    try:
-        response = requests.request(
-            method=method,
-            url=url,
-            **kwargs
-        )
-    except requests.exceptions.ConnectionError as e:
-        raise skybase.exceptions.SkyBaseRestAPIError(skybase.utils.simple_error_format(e))
-
-    return response
+    # request to skybase http services over pooled connection
+    settings = http_session_registry.settings
+    kwargs.setdefault('timeout', settings['timeout'])
+    attempts = 1 + (int(settings['retries']) if method.upper() in RETRY_METHODS else 0)
+
+    for attempt in range(attempts):
+        session = http_session_registry.get(url)
+        try:
+            response = session.request(
+                method=method,
+                url=url,
+                **kwargs
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt + 1 >= attempts:
+                raise skybase.exceptions.SkyBaseRestAPIError(skybase.utils.simple_error_format(e))
+            continue
+
+        # response body read unless streamed
+        http_session_registry.release(url, session)
+        return response
+
+
+def create_session_http_headers(token, session_key, data=''):
+    # sign data request body with session key in place of user secret key
+    headers = {
+        sky_cfg.API_HTTP_HEADER_SESSION_TOKEN: token,
+        sky_cfg.API_HTTP_HEADER_SIGNATURE: create_signature(session_key, data),
+    }
+    return headers
+
+def request_session(server, credentials):
+    '''
+    exchange request signed with user credentials for (token, session key, expiry time)
+    '''
+    url = create_api_url(server=server, route=sky_cfg.API_ROUTES.get('session'))
+    response = submit_http_request('POST', url, headers=create_auth_http_headers(credentials))
+    if response.status_code != 200:
+        raise skybase.exceptions.SkyBaseAuthenticationError(
+            'session request failed: {0} {1}'.format(response.status_code, response.content))
+    data = response.json()['data']
+    return data['token'], data['session_key'], data['expires']
+
+
+class SessionTokenCache(object):
+    '''
+    client session token for user and api server, kept in file readable only by owner
+    so separate client commands reuse token until shortly before it expires
+    '''
+
+    # seconds before expiry token replaced
+    RENEW_MARGIN = 60
+
+    def __init__(self, cache_dir, user_id, server):
+        self.cache_file = os.path.join(os.path.expanduser(cache_dir), '.session-{0}'.format(user_id))
+        self.user_id = user_id
+        self.server = server
+
+    def get(self):
+        # (token, session key) or None if missing, for other user or server, or expiring
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if (data.get('user_id') != self.user_id or data.get('server') != self.server
+                or data.get('expires', 0) - self.RENEW_MARGIN <= time.time()):
+            return None
+        return data['token'], data['session_key']
+
+    def put(self, token, session_key, expires):
+        temp_file = '{0}.{1}'.format(self.cache_file, os.getpid())
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'user_id': self.user_id,
+                'server': self.server,
+                'token': token,
+                'session_key': session_key,
+                'expires': expires,
+            }, f)
+        os.rename(temp_file, self.cache_file)
+
+    def clear(self):
+        try:
+            os.unlink(self.cache_file)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
 
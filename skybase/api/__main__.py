@@ -0,0 +1,67 @@
+import sys
+import json
+import time
+import threading
+import BaseHTTPServer
+import SocketServer
+
+import requests
+
+from skybase.api import http_session_registry, submit_http_request
+
+# requests per second to local keep-alive http server, connection per request as with
+# requests.request() and pooled:
+#   python -m skybase.api [requests] [threads]
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # response written in one send as by restapi server
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({'status': 'success', 'data': {}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+server = Server(('127.0.0.1', 0), Handler)
+server_thread = threading.Thread(target=server.serve_forever)
+server_thread.daemon = True
+server_thread.start()
+url = 'http://127.0.0.1:{0}/api/0.1/state/p/s/t'.format(server.server_address[1])
+
+def unpooled(url):
+    return requests.request(method='GET', url=url)
+
+def pooled(url):
+    return submit_http_request('GET', url)
+
+def run(get, threads):
+    def client(offset):
+        for n in range(offset, REQUESTS, threads):
+            assert get(url).status_code == 200
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return REQUESTS / (time.time() - start)
+
+http_session_registry.configure()
+for threads in [1, THREADS]:
+    for name, get in [('unpooled', unpooled), ('pooled', pooled)]:
+        print '{0:8} {1:2} threads: {2:.0f} requests/s'.format(name, threads, run(get, threads))
+server.shutdown()
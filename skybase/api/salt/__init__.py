@@ -2,7 +2,7 @@ import json
 
 from skybase import config as sky_cfg
 from skybase.api import submit_http_request
-from skybase.planet import Planet
+from skybase.planet import planet_registry
 
 # TODO: push base functionality into SaltAPIBase(); Subclass for Skybase and add specifics;
 class SkySaltAPI(object):
@@ -23,7 +23,7 @@ class SkySaltAPI(object):
         if url:
             self.url = url
         elif planet_name:
-            self.url = Planet(planet_name).services['salt']['api']['url']
+            self.url = planet_registry.get(planet_name).services['salt']['api']['url']
         else:
             self.url = self.runner_cfg.data['salt']['api']['url']
 
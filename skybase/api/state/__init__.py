@@ -33,7 +33,7 @@ def create(planet_name, service_name, tag, registration, provider, stacks, crede
 
     return response
 
-def read(record_id, credentials, format=None):
+def read(record_id, credentials, format=None, log_limit=None, log_offset=None):
     # create URL to state record id
     url = create_api_url(route='state{0}'.format(record_id))
 
@@ -43,8 +43,9 @@ def read(record_id, credentials, format=None):
     # TODO: create utility to prepare and accumlate 0-N query string pairs
     # provide params as query string
     params = dict()
-    if format:
-        qs_pairs = {'format': format}
+    qs_pairs = {'format': format, 'log_limit': log_limit, 'log_offset': log_offset}
+    qs_pairs = dict((k, v) for k, v in qs_pairs.items() if v is not None)
+    if qs_pairs:
         params = urllib.urlencode(qs_pairs)
 
     # prepare request and submit
@@ -57,7 +58,68 @@ def read(record_id, credentials, format=None):
 
     return response
 
-def update(record_id, service_record, credentials):
+def read_many(credentials, record_ids=None, prefix=None, format=None, log_limit=None, log_offset=None):
+    # create URL to batch read of state records
+    url = create_api_url(route='state-batch')
+
+    headers = create_auth_http_headers(credentials)
+
+    # record ids as repeated 'id' query string pairs
+    qs_pairs = [('id', record_id) for record_id in record_ids or []]
+    qs_pairs.extend((k, v) for k, v in [('prefix', prefix), ('format', format),
+                                        ('log_limit', log_limit), ('log_offset', log_offset)] if v is not None)
+    params = urllib.urlencode(qs_pairs)
+
+    # prepare request and submit
+    response = submit_http_request(
+        method='GET',
+        url=url,
+        headers=headers,
+        params=params,
+    )
+
+    return response
+
+def read_changes(credentials, since=0, limit=None, timeout=None):
+    # create URL to state db change feed
+    url = create_api_url(route='state/changes')
+
+    headers = create_auth_http_headers(credentials)
+
+    # changes after sequence number since; server waits up to timeout seconds for changes
+    qs_pairs = {'since': since, 'limit': limit, 'timeout': timeout}
+    params = urllib.urlencode(dict((k, v) for k, v in qs_pairs.items() if v is not None))
+
+    # prepare request and submit
+    response = submit_http_request(
+        method='GET',
+        url=url,
+        headers=headers,
+        params=params,
+    )
+
+    return response
+
+def find_stack(provider_key, credentials):
+    # create URL to stack reverse index lookup
+    url = create_api_url(route='state-stack')
+
+    headers = create_auth_http_headers(credentials)
+
+    # provider stack id or launch name as query string; may contain '/'
+    params = urllib.urlencode({'key': provider_key})
+
+    # prepare request and submit
+    response = submit_http_request(
+        method='GET',
+        url=url,
+        headers=headers,
+        params=params,
+    )
+
+    return response
+
+def update(record_id, service_record, credentials, version=None):
     # create URL to state record id
     url = create_api_url(route='state{0}'.format(record_id))
 
@@ -65,6 +127,9 @@ def update(record_id, service_record, credentials):
 
     headers = create_auth_http_headers(credentials, data)
 
+    # update applies only to record version it was made against; any version if unknown
+    headers['If-Match'] = '"{0}"'.format(version) if version is not None else '*'
+
     # prepare request and submit
     response = submit_http_request(
         method='PUT',
@@ -1,7 +1,7 @@
 import os
 
 from skybase import config as sky_cfg
-from skybase.utils.schema import read_yaml_from_file
+from skybase.utils.schema import read_cached_yaml_from_file
 from skybase.service import Deploy, App, AppConfig
 from skybase.service.install import ChefInstall
 from skybase.schemas.artiball import ARTIBALL_SCHEMA_ARGS
@@ -55,7 +55,7 @@ class Artiball(object):
             )
             # return contents of manifest file if exists
             if os.path.isfile(manifest_file):
-                manifest_data = read_yaml_from_file(yaml_file=manifest_file)
+                manifest_data = read_cached_yaml_from_file(yaml_file=manifest_file)
                 if manifest_data:
                     manifest = manifest_data.get('metadata')
                     manifest['chef_cookbook_source'] = manifest_data.get('chef_cookbook_source')
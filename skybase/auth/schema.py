@@ -1,5 +1,6 @@
 import os
 import sqlite3
+import threading
 
 from skybase import config as sky_cfg
 
@@ -7,6 +8,20 @@ from skybase import config as sky_cfg
 ROLES = ['developer', 'operator', 'admin']
 ROLES_DEFAULT = 'developer'
 
+# connections cached per process and thread and reused by every auth db call; sqlite
+# connections must not cross either.  statements prepared once per connection and reused
+# from sqlite3 statement cache.  WAL journal lets readers proceed during user updates.
+# connections held until close() by owning thread or close_all() at shutdown; short-lived
+# threads close() before exit.  writes on shared connection must commit or roll back.
+CACHED_STATEMENTS = 100
+_connections = threading.local()
+
+# connection: opening pid for all connections cached within process, closed by close_all().
+# thread caches older than current generation hold closed connections and are dropped
+_open_connections = dict()
+_open_connections_lock = threading.Lock()
+_generation = [0]
+
 # TODO: move schema creation statements to external file (where?)
 def create_db(conn):
     schema = '''
@@ -52,22 +67,95 @@ def create_db(conn):
         c = conn.cursor()
         c.executescript(schema)
 
-def connect():
+def create_generation(conn):
+    # single row counter bumped by every user write; auth caches in all processes drop
+    # entries when it changes.  created on open so existing auth dbs gain it; checked first
+    # so opening connection does not take write lock
+    if conn.execute("select 1 from sqlite_master where type = 'table' and name = 'generation'").fetchone():
+        return
+
+    schema = '''
+        BEGIN TRANSACTION;
+
+        CREATE TABLE IF NOT EXISTS generation(
+          id INTEGER PRIMARY KEY CHECK (id = 1),
+          value INTEGER NOT NULL);
+
+        INSERT OR IGNORE INTO generation VALUES(1, 0);
+
+        COMMIT;
+    '''
+
+    c = conn.cursor()
+    c.executescript(schema)
+
+def get_db_file():
     # load database name from config
     runner_cfg = sky_cfg.SkyConfig.init_from_file('runner', config_dir=sky_cfg.CONFIG_DIR)
 
-    db_file = os.path.join(runner_cfg.data['dbauth']['dir'],
-                           runner_cfg.data['dbauth']['filename'])
+    return os.path.join(runner_cfg.data['dbauth']['dir'],
+                        runner_cfg.data['dbauth']['filename'])
+
 
+def open_db(db_file):
     # determine if required db exists
     should_create = False
     if not os.path.isfile(db_file):
         should_create = True
 
-    # establish connection and create if doesn't exist
-    conn = sqlite3.connect(db_file)
+    # establish connection and create if doesn't exist.  connection used only by
+    # opening thread; same thread check relaxed so close_all() can close it at shutdown
+    conn = sqlite3.connect(db_file, timeout=30, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
     if should_create:
         create_db(conn)
+    create_generation(conn)
+    return conn
+
+
+def connect():
+    # reuse connection opened by current process and thread; runner config lookup
+    # served from process config registry
+    db_file = get_db_file()
+
+    cache = getattr(_connections, 'cache', None)
+    if cache is None or _connections.pid != os.getpid() or _connections.generation != _generation[0]:
+        cache = _connections.cache = dict()
+        _connections.pid = os.getpid()
+        _connections.generation = _generation[0]
+
+    conn = cache.get(db_file)
+    if conn is None:
+        conn = cache[db_file] = open_db(db_file)
+        with _open_connections_lock:
+            _open_connections[conn] = os.getpid()
     return conn
 
 
+def close():
+    '''
+    close connections cached by current thread
+    '''
+    cache = getattr(_connections, 'cache', None)
+    if not cache or _connections.pid != os.getpid() or _connections.generation != _generation[0]:
+        return
+    for conn in cache.values():
+        with _open_connections_lock:
+            _open_connections.pop(conn, None)
+        conn.close()
+    cache.clear()
+
+
+def close_all():
+    '''
+    close all connections opened within current process; threads using them must be idle.
+    connections inherited across fork left to parent.
+    '''
+    pid = os.getpid()
+    with _open_connections_lock:
+        conns = [conn for conn, conn_pid in _open_connections.items() if conn_pid == pid]
+        for conn in conns:
+            del _open_connections[conn]
+        _generation[0] += 1
+    for conn in conns:
+        conn.close()
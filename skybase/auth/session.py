@@ -0,0 +1,105 @@
+import os
+import time
+import json
+import hmac
+import errno
+import base64
+import hashlib
+
+from skybase.auth import schema
+import skybase.exceptions
+
+# short-lived session tokens exchanged for request signed with user secret key.  token is
+# self-contained: base64 json payload (user id, roles, expiry) and restapi server hmac over
+# payload, verified without auth db.  session key derived from server key and token is
+# returned with token; client signs request bodies with session key in place of secret
+# key, so token alone does not authenticate requests.  all restapi processes sharing
+# server key file accept each other's tokens.
+DEFAULT_TTL = 900
+MAX_TTL = 3600
+
+SERVER_KEY_FILENAME = 'session.key'
+SERVER_KEY_BYTES = 32
+
+
+def get_server_key_file(rest_cfg):
+    # restapi session key_file or file next to auth db
+    key_file = (rest_cfg.get_data_value('session') or {}).get('key_file')
+    if key_file is None:
+        key_file = os.path.join(os.path.dirname(schema.get_db_file()), SERVER_KEY_FILENAME)
+    return key_file
+
+
+def get_ttl(rest_cfg):
+    ttl = int((rest_cfg.get_data_value('session') or {}).get('ttl', DEFAULT_TTL))
+    return max(1, min(ttl, MAX_TTL))
+
+
+def load_server_key(key_file):
+    '''
+    read server key, creating random key readable only by owner if missing; first of
+    concurrently starting processes to link its key file wins
+    '''
+    try:
+        with open(key_file) as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+    temp_file = '{0}.{1}'.format(key_file, os.getpid())
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(base64.b16encode(os.urandom(SERVER_KEY_BYTES)).lower())
+        try:
+            os.link(temp_file, key_file)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+    finally:
+        os.unlink(temp_file)
+
+    with open(key_file) as f:
+        return f.read().strip()
+
+
+def sign(server_key, purpose, message):
+    h = hmac.new(server_key, msg='{0}:{1}'.format(purpose, message), digestmod=hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(h)
+
+
+def derive_session_key(server_key, token):
+    return sign(server_key, 'session', token)
+
+
+def create_token(server_key, user_id, roles, ttl=DEFAULT_TTL):
+    '''
+    return (token, session key, expiry time) for user and roles
+    '''
+    expires = int(time.time()) + ttl
+    payload = base64.urlsafe_b64encode(json.dumps(
+        {'user_id': user_id, 'roles': list(roles), 'expires': expires}, sort_keys=True))
+    token = '.'.join([payload, sign(server_key, 'token', payload)])
+    return token, derive_session_key(server_key, token), expires
+
+
+def verify_token(server_key, token):
+    '''
+    return payload of token signed by server and not yet expired
+    '''
+    try:
+        payload, signature = str(token).split('.')
+    except ValueError:
+        raise skybase.exceptions.SkyBaseAuthenticationError('malformed session token')
+
+    if not hmac.compare_digest(sign(server_key, 'token', payload), signature):
+        raise skybase.exceptions.SkyBaseAuthenticationError('session token signature mismatch')
+
+    data = json.loads(base64.urlsafe_b64decode(payload))
+    if data['expires'] <= time.time():
+        raise skybase.exceptions.SkyBaseAuthenticationError('session token expired')
+    return data
+
@@ -2,9 +2,6 @@ import json
 import time
 import logging
 
-import requests
-import requests.exceptions
-
 from skybase.parser import parse_skycmd_argv
 from skybase import runner as sky_runner
 from skybase import config as sky_cfg
@@ -23,6 +20,11 @@ class SkyCmd(object):
     TIMEOUT_DEFAULT = 60
     TIMEOUT_MAX = 300
     RETRY = 2
+    # seconds server asked to hold result request, allowance for response beyond it, and
+    # first retry interval when server answers without waiting
+    LONG_POLL_WAIT = 30
+    LONG_POLL_SLACK = 10
+    BACKOFF_MIN = 0.25
 
     def __init__(self):
 
@@ -39,6 +41,9 @@ class SkyCmd(object):
         # acquire client config using dir provided as CLI option or default
         self.cli_cfg = sky_cfg.SkyConfig.init_from_file('client', config_dir=self.args.config_dir)
 
+        # restapi requests and result polls share pooled keep-alive connections
+        skybase.api.http_session_registry.configure(**(self.cli_cfg.get_data_value('http') or {}))
+
     def process_args(self):
 
         all_args = parse_skycmd_argv()
@@ -142,38 +147,63 @@ class SkyCmd(object):
             'args': vars(self.args),
             'metadata': self.prepare_job_metadata()
         }
-
-        # sign data request body with user credentials
-        request_signature = skybase.api.create_signature(self.sky_credentials.data['key'], json.dumps(data))
-
-        # prepare request header
-        headers = {
-            sky_cfg.API_HTTP_HEADER_ACCESS_KEY: self.sky_credentials.data['user_id'],
-            sky_cfg.API_HTTP_HEADER_SIGNATURE: request_signature,
-        }
+        body = json.dumps(data)
 
         # get default restapi task url
+        server = self.cli_cfg.get_data_value('restapi_server_url', data_default=sky_cfg.API_SERVER)
         restapi_url = skybase.api.create_api_url(
-            server=self.cli_cfg.get_data_value('restapi_server_url', data_default=sky_cfg.API_SERVER),
+            server=server,
             route=sky_cfg.API_ROUTES.get('task'),
         )
 
         # gather query parameter string
         params = self.get_request_params()
 
+        # sign data request body with cached session key or user credentials
+        session_cache = skybase.api.SessionTokenCache(self.args.creds_dir, self.sky_credentials.data['user_id'], server)
+        session = self.get_session(session_cache, server)
+        if session:
+            headers = skybase.api.create_session_http_headers(session[0], session[1], body)
+        else:
+            headers = skybase.api.create_auth_http_headers(self.sky_credentials.data, body)
+
+        response = self.post_http_request(restapi_url, params, headers, body)
+
+        if session and response.status_code == 403:
+            # session token rejected (server key replaced, clock skew); task not queued, resend signed by user key
+            session_cache.clear()
+            headers = skybase.api.create_auth_http_headers(self.sky_credentials.data, body)
+            response = self.post_http_request(restapi_url, params, headers, body)
+
+        return response
+
+    def post_http_request(self, url, params, headers, body):
         # post request to restapi
-        try:
-            response = requests.post(
-                restapi_url,
-                params=params,
-                headers=headers,
-                data=json.dumps(data),
-            )
-        except requests.exceptions.ConnectionError as e:
-            raise SkyBaseRestAPIError(simple_error_format(e))
+        response = skybase.api.submit_http_request(
+            'POST',
+            url,
+            params=params,
+            headers=headers,
+            data=body,
+        )
 
         return response
 
+    def get_session(self, session_cache, server):
+        # cached (token, session key) or new session; None if server issues no session tokens
+        session = session_cache.get()
+        if session is None:
+            try:
+                token, session_key, expires = skybase.api.request_session(server, self.sky_credentials.data)
+            except SkyBaseError:
+                return None
+            session = token, session_key
+            try:
+                session_cache.put(token, session_key, expires)
+            except (IOError, OSError):
+                pass
+        return session
+
     def prepare_job_metadata(self):
         metadata = {
             'current_task_name': self.current_task_name,
@@ -204,9 +234,9 @@ class SkyCmd(object):
             params = "&".join([group, command])
         return params
 
-    def probe(self, url):
+    def probe(self, url, **kwargs):
         # attempt to retrieve url
-        response = requests.get(url)
+        response = skybase.api.submit_http_request('GET', url, **kwargs)
         result = json.loads(response.content)
         return result
 
@@ -218,29 +248,41 @@ class SkyCmd(object):
         if timeout is None:
             timeout = min(self.cli_cfg.data.get('result_fetch_timeout', SkyCmd.TIMEOUT_DEFAULT), SkyCmd.TIMEOUT_MAX)
 
-        # wait for celery task status SUCCESS over timeout interval
+        # wait for celery task status SUCCESS over timeout interval.  server holds each
+        # request until task status changes; requests answered early without change (server
+        # without long-poll) or failing repeated after backoff doubling up to retry_interval
         start_time = time.time()
+        status = 'PENDING'
+        backoff = SkyCmd.BACKOFF_MIN
 
         while time.time() - start_time < timeout:
-            execute_result = self.probe(url)
-
+            wait = max(1, min(SkyCmd.LONG_POLL_WAIT, int(timeout - (time.time() - start_time))))
+            request_time = time.time()
             try:
-                status = execute_result['metadata']['task_status']
-            except KeyError as e:
-                raise SkyBaseResponseError('{0} when accessing response status'.format(simple_error_format(e)))
+                execute_result = self.probe(url, params={'wait': wait, 'status': status},
+                                            timeout=wait + SkyCmd.LONG_POLL_SLACK)
+            except SkyBaseRestAPIError:
+                execute_result = None
 
-            if status == 'PENDING':
-                # TODO: progress bar would be nice, but needs to not interfere with json prettyprint
-                time.sleep(retry_interval)
-
-            elif status == 'SUCCESS':
-                # return execute task results data if exists
+            if execute_result is not None:
                 try:
-                    return execute_result
+                    status = execute_result['metadata']['task_status']
                 except KeyError as e:
-                    raise SkyBaseResponseError('{0} when accessing response results'.format(simple_error_format(e)))
-            else:
-                raise SkyBaseError('unknown task status: {0}'.format(status))
+                    raise SkyBaseResponseError('{0} when accessing response status'.format(simple_error_format(e)))
+
+                if status == 'SUCCESS':
+                    # return execute task results data if exists
+                    return execute_result
+                elif status != 'PENDING':
+                    raise SkyBaseError('unknown task status: {0}'.format(status))
+                elif time.time() - request_time >= wait:
+                    # long-poll expired without change; wait again at once
+                    backoff = SkyCmd.BACKOFF_MIN
+                    continue
+
+            # TODO: progress bar would be nice, but needs to not interfere with json prettyprint
+            time.sleep(min(backoff, max(0, timeout - (time.time() - start_time))))
+            backoff = min(backoff * 2, retry_interval)
 
         raise SkyBaseTimeOutError('attempt to fetch results failed after {0}s'.format(timeout))
 
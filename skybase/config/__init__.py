@@ -1,12 +1,12 @@
 import os
 import sys
+import threading
 
 import skybase.schemas
-from skybase.utils.schema import read_yaml_from_file
+from skybase.utils.schema import read_cached_yaml_from_file
 from skybase.utils import simple_error_format
 from skybase.exceptions import SkyBaseConfigurationError
-from yaml.scanner import ScannerError
-from yaml.parser import ParserError
+from skybase.utils.yamlio import ScannerError, ParserError
 
 # Application CONSTANTS
 
@@ -26,9 +26,11 @@ API_ROOT = 'api'
 API_VERSION = '0.1'
 API_ROUTES = {
     'task': 'task',
+    'session': 'session',
 }
 API_HTTP_HEADER_SIGNATURE = 'Skybase-Request-Signature'
 API_HTTP_HEADER_ACCESS_KEY = 'Skybase-Access-Key'
+API_HTTP_HEADER_SESSION_TOKEN = 'Skybase-Session-Token'
 API_STATUS_SUCCESS = 'success'
 API_STATUS_FAIL = 'fail'
 
@@ -78,6 +80,60 @@ config_schemas = {
 }
 
 
+class SkyConfigRegistry(object):
+    '''
+    process-wide registry of parsed configuration files.  each file is parsed once and
+    revalidated against its stat (mtime, size) on every lookup, re-parsing only when
+    changed on disk.  parsed data is shared between callers and must be treated as read-only.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, config_file):
+        # stat failure reported as IOError to match read_yaml_from_file()
+        try:
+            st = os.stat(config_file)
+        except OSError as e:
+            raise IOError(e.errno, e.strerror, config_file)
+        signature = (st.st_mtime, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(config_file)
+            if entry and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+
+            # parse while holding lock so concurrent callers never parse same file twice
+            self.misses += 1
+            data = read_cached_yaml_from_file(config_file)
+            self._entries[config_file] = (signature, data)
+            return data
+
+    def invalidate(self, config_file=None):
+        # drop one or all entries; next lookup re-parses from disk
+        with self._lock:
+            if config_file is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(config_file, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+            }
+
+
+# shared by all SkyConfig instances within process
+config_registry = SkyConfigRegistry()
+
+
 class SkyConfig(object):
     # reminder for different types of configs: client_dat, restapi_data, worker_data, topology_data
 
@@ -103,9 +159,9 @@ class SkyConfig(object):
         config_file_name = '/'.join([config_dir, schema_name + '.yaml'])
         config_file = os.path.expanduser(config_file_name)
 
-        # read in target configuration filea and attempt to init class
+        # read in target configuration file from process registry and attempt to init class
         try:
-            runner_config_data = read_yaml_from_file(config_file)
+            runner_config_data = config_registry.get(config_file)
         except (IOError, ScannerError, ParserError) as e:
             # wrap all expected errors as SkyBaseError type
             raise SkyBaseConfigurationError(simple_error_format(e))
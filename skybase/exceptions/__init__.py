@@ -53,4 +53,7 @@ class StateDBError(SkyBaseError):
     pass
 
 class StateDBRecordNotFoundError(StateDBError):
-    pass
\ No newline at end of file
+    pass
+
+class StateDBRecordConflictError(StateDBError):
+    pass
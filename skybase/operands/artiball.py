@@ -1,9 +1,9 @@
 import logging
 import os
-import yaml
 import sys
 
 from skybase.utils.logger import Logger
+from skybase.utils import yamlio
 from skybase import schemas
 from pprint import pprint as pp
 
@@ -56,7 +56,7 @@ class Artiball(object):
     def update_content(self):
         config_file = os.path.join(self.base_dir, 'skybase.yaml')
         with open(config_file, 'r') as temp_file:
-            config = yaml.load(temp_file)
+            config = yamlio.load(temp_file)
             self.app_source = config['packing']['application']['source_location']
             installations = config['packing']['installations']
             for installation in installations:
@@ -72,8 +72,8 @@ class Artiball(object):
         deployment_file = os.path.join(self.base_dir, 'deployment', 'main_deployment.yaml')
         with open(deployment_file, 'r') as temp_file:
             try:
-                deployment = yaml.load(temp_file)
-            except yaml.scanner.ScannerError:
+                deployment = yamlio.load(temp_file)
+            except yamlio.ScannerError:
                 self.logger.write("Invalid yaml syntax  " + deployment_file + '\n', multi_line=True)
                 sys.exit(1)
             stacks = deployment['stacks']
@@ -94,8 +94,8 @@ class Artiball(object):
             if 'main_deployment' in file:
                 with open(file, 'r') as temp_file:
                     try:
-                        deployment_data = yaml.load(temp_file)
-                    except yaml.scanner.ScannerError:
+                        deployment_data = yamlio.load(temp_file)
+                    except yamlio.ScannerError:
                         self.logger.write("Invalid yaml syntax  " + file + '\n', multi_line=True)
                         sys.exit(1)
                     schemas.set_indicators()
@@ -106,8 +106,8 @@ class Artiball(object):
                     if deployment_data['definition']['chef_type'] == 'server':
                         with open(os.path.join(self.base_dir, 'skybase.yaml'), 'r') as config_file:
                             try:
-                                skybase_data = yaml.load(config_file)
-                            except yaml.scanner.ScannerError:
+                                skybase_data = yamlio.load(config_file)
+                            except yamlio.ScannerError:
                                 self.logger.write("Invalid yaml syntax  " + file + '\n', multi_line=True)
                                 sys.exit(1)
                             schemas.set_indicators()
@@ -126,5 +126,5 @@ class Artiball(object):
         if os.path.exists(manifest_file):
             os.remove(manifest_file)
         with open(manifest_file, 'wb') as temp_file:
-            yaml.dump(self.manifest, temp_file, allow_unicode=True, default_flow_style=False)
+            yamlio.dump(self.manifest, temp_file, allow_unicode=True)
         temp_file.close()
\ No newline at end of file
@@ -1,10 +1,7 @@
 
-import yaml
-import yaml.parser
-import yaml.scanner
-
 from skybase import utils as ut
 from skybase import exceptions as sky_exception
+from skybase.utils import yamlio
 
 # for dict_merge
 import types
@@ -96,7 +93,7 @@ class Planet(object):
         try:
             planet_data = ut.read_yaml_from_file(file_name)
 
-        except (yaml.parser.ParserError, yaml.scanner.ScannerError) as e:
+        except (yamlio.ParserError, yamlio.ScannerError) as e:
             print 'Invalid Planet YAML.', e
             raise sky_exception.SkyBaseConfigurationError
 
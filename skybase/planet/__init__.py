@@ -1,9 +1,14 @@
 import os
 import json
+import threading
 
 
 from skybase import config as sky_cfg
-from skybase.utils.schema import read_yaml_from_file
+from skybase.utils.schema import read_cached_yaml_from_file
+
+
+def get_planet_yaml_filename(planet_data_dir, planet_name):
+    return '/'.join([planet_data_dir, planet_name, planet_name + '.yaml'])
 
 
 class Planet(object):
@@ -34,6 +39,7 @@ class Planet(object):
         self.accountprofile = None
         self.provider = None
         self.region = None
+        self._planet_as_dict = None
 
         # TODO: provide @classmethod init_from_file() which takes planet.yaml filename
         if self.planet_name:
@@ -53,19 +59,29 @@ class Planet(object):
             self.region = self.definition['region']
             self.resource_ids['subnets_by_type'] = self.get_subnets_by_type()
 
+            # derived view used by renderer and planet.describe
+            self._planet_as_dict = {
+                'definition': self.definition,
+                'services': self.services,
+                'resource_ids': self.resource_ids
+            }
+
+    def __setattr__(self, name, value):
+        # instances shared through PlanetRegistry are frozen after load
+        if self.__dict__.get('_frozen'):
+            raise AttributeError('shared Planet {0} is read-only'.format(self.planet_name))
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        self._frozen = True
+
     # TODO: raise error if planet yaml file not found
     # prepare absolute filename pointing to planet yaml file
     def get_yaml_filename(self):
-        return '/'.join(
-            [
-                self.planet_data_dir,
-                self.planet_name,
-                self.planet_name + '.yaml'
-            ]
-        )
+        return get_planet_yaml_filename(self.planet_data_dir, self.planet_name)
 
     def _load_yaml_data(self):
-        return read_yaml_from_file(yaml_file=self.get_yaml_filename())
+        return read_cached_yaml_from_file(yaml_file=self.get_yaml_filename())
 
     # TODO: YAML validation for all required entries
     def validate_yaml_data(self):
@@ -132,11 +148,13 @@ class Planet(object):
 
     @property
     def planet_as_dict(self):
-        return {
-            'definition': self.definition,
-            'services': self.services,
-            'resource_ids': self.resource_ids
-        }
+        if self._planet_as_dict is None:
+            return {
+                'definition': self.definition,
+                'services': self.services,
+                'resource_ids': self.resource_ids
+            }
+        return self._planet_as_dict
 
     @property
     def chef_env_attr(self):
@@ -166,3 +184,55 @@ class Planet(object):
 
     def __repr__(self):
         return str('Planet %s:' % self.planet) + str(self.__dict__)
+
+
+
+class PlanetRegistry(object):
+    '''
+    process-wide registry of Planet instances.  each planet is loaded once and reloaded
+    only when its yaml file changes on disk (mtime, size).  instances are shared between
+    callers and frozen against attribute assignment.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._planets = dict()
+
+    def get(self, planet_name, planet_data_dir=None):
+        # resolve planet data directory from runner configuration unless provided
+        data_dir = planet_data_dir
+        if data_dir is None:
+            runner_cfg = sky_cfg.SkyConfig.init_from_file('runner', config_dir=sky_cfg.CONFIG_DIR)
+            data_dir = runner_cfg.data['planet_data_dir']
+
+        # stat failure reported as IOError to match Planet() reading missing file
+        planet_file = get_planet_yaml_filename(data_dir, planet_name)
+        try:
+            st = os.stat(planet_file)
+        except OSError as e:
+            raise IOError(e.errno, e.strerror, planet_file)
+        signature = (st.st_mtime, st.st_size)
+
+        key = (data_dir, planet_name)
+        with self._lock:
+            entry = self._planets.get(key)
+            if entry and entry[0] == signature:
+                return entry[1]
+
+            planet = Planet(planet_name, planet_data_dir=planet_data_dir)
+            planet.freeze()
+            self._planets[key] = (signature, planet)
+            return planet
+
+    def invalidate(self, planet_name=None):
+        # drop one or all planets; next lookup reloads from disk
+        with self._lock:
+            if planet_name is None:
+                self._planets.clear()
+            else:
+                for key in [k for k in self._planets if k[1] == planet_name]:
+                    del self._planets[key]
+
+
+# shared by all consumers within process
+planet_registry = PlanetRegistry()
@@ -1,16 +1,23 @@
 import os
 import sys
+import time
+import signal
+import multiprocessing
 import inspect
 import argparse
 import logging
 import json
 from functools import wraps
 
+import concurrent.futures
 import tornado.httpserver
+import tornado.netutil
 import tornado.ioloop
 import tornado.web
 import tornado.gen
 import tornado.escape
+import tornado.concurrent
+import tornado.httputil
 from tornado.log import enable_pretty_logging
 
 import skybase.worker.celery.tasks
@@ -20,14 +27,28 @@ import skybase.utils
 import skybase.skymap
 import skybase.api
 import skybase.actions.auth.db
+import skybase.actions.auth.cache
+import skybase.auth.schema
+import skybase.auth.session
+import skybase.actions.dbstate
 from skybase import config as sky_cfg
 import skybase.actions.state.local
+from skybase.planet import planet_registry
+from skybase.restapi.prefork import PreforkServer
+from skybase.restapi.taskwatch import TaskStatusWatcher
 
 
 tornado_access_log = logging.getLogger("tornado.access")
 
 end_point_paths = {}
 
+# blocking state db, auth db and celery backend calls run on bounded pool of executor
+# threads so IOLoop keeps serving other requests; size from restapi executor_pool_size
+DEFAULT_EXECUTOR_POOL_SIZE = 8
+
+# seconds worker waits for requests in progress to complete when stopping
+DRAIN_TIMEOUT = 30
+
 # TODO: move into separate module after debug, dev, &c.
 class SkyResponse(object):
     def __init__(self, code=None, status=None, data=None, links=None,
@@ -61,6 +82,28 @@ def make_error_response(code, error):
     return response.response
 
 
+def make_etag(version):
+    return '"{0}"'.format(version)
+
+
+def parse_etag(etag):
+    # record version from strong or weak etag
+    etag = etag.strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    try:
+        return int(etag.strip('"'))
+    except ValueError:
+        raise ValueError('invalid record version etag: {0}'.format(etag))
+
+
+def run_blocking(handler, fn, *args, **kwargs):
+    '''
+    run blocking call on application executor; future yielded by coroutine handlers
+    '''
+    return handler.application.settings['skybase']['executor'].submit(fn, *args, **kwargs)
+
+
 def authenticated(method):
     '''
     request handler method decorator to authenticate request
@@ -68,15 +111,17 @@ def authenticated(method):
     :return:
     '''
     @wraps(method)
+    @tornado.gen.coroutine
     def wrapper(self, *args, **kwargs):
         tornado_access_log.debug('authenticating request: {0} {1} request'.format(self.__class__.__name__, self.request.method))
 
         # capture header values used by authentication
         access_key = self.request.headers.get(sky_cfg.API_HTTP_HEADER_ACCESS_KEY)
+        session_token = self.request.headers.get(sky_cfg.API_HTTP_HEADER_SESSION_TOKEN)
         request_signature = self.request.headers.get(sky_cfg.API_HTTP_HEADER_SIGNATURE)
 
-        # required auth_id and signature
-        if not (request_signature and access_key):
+        # required auth_id or session token, and signature
+        if not (request_signature and (access_key or session_token)):
             # create error response
             errmsg = '{0}={1}; {2}={3}'.format(
                         sky_cfg.API_HTTP_HEADER_ACCESS_KEY, access_key,
@@ -88,18 +133,33 @@ def authenticated(method):
             self.finish()
             return
 
-        # lookup secret key paired with authentication key from db
-        try:
-            tornado_access_log.debug('attempt lookup secret key for {0}'.format(access_key))
-            secret_key = skybase.actions.auth.db.lookup_key(access_key)
-        except skybase.exceptions.SkyBaseError as e:
-            # create error response
-            tornado_access_log.debug('failed lookup secret key for {0}'.format(access_key))
-            self.set_status(403)
-            errmsg = make_error_response(self.get_status(), e)
-            self.write(errmsg)
-            self.finish()
-            return
+        if session_token:
+            # verify session token and derive key signing request without auth db
+            server_key = self.application.settings['skybase']['session_key']
+            try:
+                session = skybase.auth.session.verify_token(server_key, session_token)
+            except skybase.exceptions.SkyBaseError as e:
+                self.set_status(403)
+                self.write(make_error_response(self.get_status(), e))
+                self.finish()
+                return
+            secret_key = skybase.auth.session.derive_session_key(server_key, session_token)
+            self.current_user = {'user_id': session['user_id'], 'roles': session['roles'], 'session': True}
+        else:
+            # lookup secret key paired with authentication key from db
+            try:
+                tornado_access_log.debug('attempt lookup secret key for {0}'.format(access_key))
+                secret_key = yield run_blocking(self, skybase.actions.auth.db.lookup_key, access_key)
+            except skybase.exceptions.SkyBaseError as e:
+                # create error response
+                tornado_access_log.debug('failed lookup secret key for {0}'.format(access_key))
+                self.set_status(403)
+                errmsg = make_error_response(self.get_status(), e)
+                self.write(errmsg)
+                self.finish()
+                return
+            # roles looked up when needed
+            self.current_user = {'user_id': access_key, 'roles': None, 'session': False}
 
         # compare request signature against freshly signed body
         tornado_access_log.debug('request.body: {0}'.format(self.request.body))
@@ -109,7 +169,10 @@ def authenticated(method):
             request_signature)
 
         if is_authenticated:
-            return method(self, *args, **kwargs)
+            # coroutine handler methods complete before request finished
+            result = method(self, *args, **kwargs)
+            if tornado.concurrent.is_future(result):
+                yield result
         else:
             self.set_status(403)
             errmsg = make_error_response(
@@ -123,6 +186,85 @@ def authenticated(method):
     return wrapper
 
 
+class ActiveRequestConnection(object):
+    '''
+    request connection seen by handlers; reports response finished, or connection closed
+    while response pending, to request delegate
+    '''
+
+    def __init__(self, connection, on_done):
+        self.connection = connection
+        self.on_done = on_done
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def finish(self):
+        try:
+            return self.connection.finish()
+        finally:
+            self.on_done()
+
+    def set_close_callback(self, callback):
+        if callback is None:
+            return self.connection.set_close_callback(None)
+
+        def on_close():
+            self.on_done()
+            callback()
+        return self.connection.set_close_callback(on_close)
+
+
+class ActiveRequestDelegate(tornado.httputil.HTTPMessageDelegate):
+    '''
+    request delegate counting request as in progress from arrival of its headers until
+    response finished or connection closed, whichever first; connections waiting for
+    next request not counted
+    '''
+
+    def __init__(self, application, connection, start_request):
+        self.application = application
+        self.active = False
+        self.delegate = start_request(ActiveRequestConnection(connection, self.done))
+
+    def done(self):
+        # counted request released exactly once
+        if self.active:
+            self.active = False
+            self.application.active_requests -= 1
+
+    def headers_received(self, start_line, headers):
+        self.active = True
+        self.application.active_requests += 1
+        return self.delegate.headers_received(start_line, headers)
+
+    def data_received(self, chunk):
+        return self.delegate.data_received(chunk)
+
+    def finish(self):
+        return self.delegate.finish()
+
+    def on_connection_close(self):
+        # request not read in full
+        try:
+            return self.delegate.on_connection_close()
+        finally:
+            self.done()
+
+
+class SkyApplication(tornado.web.Application):
+    '''
+    application counting requests in progress so stopping worker can drain them
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(SkyApplication, self).__init__(*args, **kwargs)
+        self.active_requests = 0
+
+    def start_request(self, connection):
+        return ActiveRequestDelegate(self, connection, super(SkyApplication, self).start_request)
+
+
 class SkyRestAPI(object):
     def __init__(self):
 
@@ -131,29 +273,48 @@ class SkyRestAPI(object):
         self.parse_options()
 
         # create list of end points and handlers
-        end_point_list = []
+        self.end_point_list = []
 
         clsmembers = inspect.getmembers(sys.modules[__name__], inspect.isclass)
 
         for name, obj in clsmembers:
             if obj.__bases__[0].__name__ == 'RequestHandler':
-                end_point_list.append(tuple([end_point_paths[name], obj]))
+                self.end_point_list.append(tuple([end_point_paths[name], obj]))
 
         # TODO: need tornado-based solution for changing log level
         tornado_access_log.setLevel(self.log_level.upper())
 
+        # application, executor and caches created per serving process by init_process()
+        self.application = None
+        self.executor = None
+        self.http_server = None
+
+    def make_application(self):
         rest_cfg = sky_cfg.SkyConfig.init_from_file('restapi', config_dir=sky_cfg.CONFIG_DIR)
+
+        # command line pool size overrides restapi config
+        pool_size = self.pool_size
+        if pool_size is None:
+            pool_size = rest_cfg.get_data_value('executor_pool_size', DEFAULT_EXECUTOR_POOL_SIZE)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=int(pool_size))
+
         # Initialize the Application object
         # Add restapi config to application settings under skybase namespace
         # --config value read into global skybase config module
-        self.application = tornado.web.Application(
-            handlers=end_point_list,
+        # autoreload restarts single process only; pre-fork master restarts workers on SIGHUP
+        return SkyApplication(
+            handlers=self.end_point_list,
             template_path=os.path.join(
                 os.path.dirname(os.path.abspath(__file__)), "templates"),
             static_path=rest_cfg.data['static']['dir'],
             debug=True,
+            autoreload=self.processes == 1,
             skybase={
-                'rest_cfg': rest_cfg
+                'rest_cfg': rest_cfg,
+                'executor': self.executor,
+                'session_key': skybase.auth.session.load_server_key(skybase.auth.session.get_server_key_file(rest_cfg)),
+                'session_ttl': skybase.auth.session.get_ttl(rest_cfg),
+                'task_watcher': TaskStatusWatcher(self.executor, SkybaseTaskHandler._get_task_statuses),
             },
         )
 
@@ -175,6 +336,25 @@ class SkyRestAPI(object):
             help='location of skybase configuration files'
         )
 
+        parser.add_argument(
+            '--pool-size',
+            dest='pool_size',
+            type=int,
+            action='store',
+            default=None,
+            help='number of threads running blocking request work (default restapi executor_pool_size or {0})'.format(
+                DEFAULT_EXECUTOR_POOL_SIZE)
+        )
+
+        parser.add_argument(
+            '--processes',
+            dest='processes',
+            type=int,
+            action='store',
+            default=1,
+            help='number of pre-forked server processes; 0 for one per cpu (default 1, no fork)'
+        )
+
         parser.add_argument(
             '-l',
             '--log-level',
@@ -190,14 +370,74 @@ class SkyRestAPI(object):
         # set restapi attributes from options
         self.port = args.port
         self.log_level = args.log_level
+        self.pool_size = args.pool_size
+        self.processes = args.processes or multiprocessing.cpu_count()
+
+
+    def init_process(self):
+        # process-wide state created in serving process: configs re-read, planets and
+        # planet state db index reloaded, executor threads and application started
+        sky_cfg.config_registry.invalidate()
+        planet_registry.invalidate()
+        skybase.actions.dbstate.state_index_registry.invalidate()
+        skybase.actions.auth.cache.auth_cache.invalidate()
+        skybase.skymap.route_matcher_registry.invalidate()
+
+        # build in-memory planet state db index before serving requests
+        skybase.actions.dbstate.build_state_index()
 
+        self.application = self.make_application()
+
+    def drain(self):
+        # stop accepting connections; stop IOLoop once requests in progress complete
+        io_loop = tornado.ioloop.IOLoop.current()
+        self.http_server.stop()
+        deadline = time.time() + DRAIN_TIMEOUT
+
+        # waiting task requests answered with current status; clients wait again elsewhere
+        self.application.settings['skybase']['task_watcher'].release()
+
+        def check():
+            if self.application.active_requests <= 0 or time.time() >= deadline:
+                io_loop.stop()
+            else:
+                io_loop.add_timeout(time.time() + 0.1, check)
+        check()
+
+    def serve(self, sockets):
+        io_loop = tornado.ioloop.IOLoop.current()
+
+        def on_stop(signum, frame):
+            io_loop.add_callback_from_signal(self.drain)
+        signal.signal(signal.SIGTERM, on_stop)
+        signal.signal(signal.SIGINT, on_stop)
+
+        self.http_server = tornado.httpserver.HTTPServer(self.application)
+        self.http_server.add_sockets(sockets)
+        io_loop.start()
+
+        # close auth db connections once executor threads idle; left to process exit if
+        # requests still running at drain timeout
+        drained = self.application.active_requests <= 0
+        self.executor.shutdown(wait=drained)
+        if drained:
+            skybase.auth.schema.close_all()
+
+    def run_worker(self, sockets):
+        self.init_process()
+        self.serve(sockets)
 
     def run(self):
         # start skybase restapi service
-        self.http_server = tornado.httpserver.HTTPServer(self.application)
-        self.http_server.listen(self.port)
         enable_pretty_logging()
-        tornado.ioloop.IOLoop.instance().start()
+        sockets = tornado.netutil.bind_sockets(self.port)
+
+        if self.processes == 1:
+            self.run_worker(sockets)
+            return
+
+        # workers fork before any IOLoop, thread or connection exists in master
+        PreforkServer(self.processes, lambda worker_id: self.run_worker(sockets)).run()
 
 
 end_point_paths['IndexHandler'] = r"/index/?"
@@ -252,6 +492,7 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
     # TODO: independent ACL description for API separate from skybase commands
 
     @authenticated
+    @tornado.gen.coroutine
     def get(self, api_version, planet, service, tag):
         # init RestAPI response container
         response = SkyResponse()
@@ -265,15 +506,30 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
         tornado_access_log.debug('request.query_arguments: {0}'.format(self.request.query_arguments))
         params = dict()
 
-        # expecting 'format' key and no others
+        # expecting 'format' key and optional service log paging keys
         try:
             params['format'] = self.request.query_arguments.get('format')[0]
         except (TypeError, IndexError):
             params['format'] = None
 
+        for key in ['log_limit', 'log_offset']:
+            try:
+                params[key] = int(self.request.query_arguments.get(key)[0])
+            except (TypeError, IndexError):
+                pass
+            except ValueError as e:
+                self.set_status(400)
+                self.write(make_error_response(self.get_status(), e))
+                return
+
         # execute update state db record task
         kwargs=params
-        celery_result = skybase.actions.state.local.read(record_id, **kwargs)
+        celery_result, version = yield run_blocking(
+            self, skybase.actions.state.local.read_with_version, record_id, **kwargs)
+
+        # record version as etag; required as If-Match on update
+        if version is not None:
+            self.set_header('ETag', make_etag(version))
 
         # prepare json response
         response.data = celery_result
@@ -293,6 +549,7 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
         self.finish()
 
     @authenticated
+    @tornado.gen.coroutine
     def put(self, api_version, planet, service, tag):
         # init RestAPI response container
         response = SkyResponse()
@@ -302,9 +559,40 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
 
         record_object = self.request.body
 
-        # execute update state db record task
+        # updates must name record version they were made against
+        if_match = self.request.headers.get('If-Match')
+        if not if_match:
+            # tornado has no reason phrase for 428
+            self.set_status(428, 'Precondition Required')
+            self.write(make_error_response(
+                self.get_status(),
+                skybase.exceptions.StateDBError('If-Match header with record version required')))
+            return
+
         kwargs={}
-        celery_result = skybase.actions.state.local.update(record_id, record_object, **kwargs)
+        if if_match.strip() != '*':
+            try:
+                kwargs['version'] = parse_etag(if_match)
+            except ValueError as e:
+                self.set_status(400)
+                self.write(make_error_response(self.get_status(), e))
+                return
+
+        # execute update state db record task; conflicting update fails without write
+        try:
+            celery_result = yield run_blocking(
+                self, skybase.actions.state.local.update, record_id, record_object, **kwargs)
+        except skybase.exceptions.StateDBRecordConflictError as e:
+            self.set_status(409)
+            self.write(make_error_response(self.get_status(), e))
+            return
+        except skybase.exceptions.StateDBRecordNotFoundError as e:
+            self.set_status(404)
+            self.write(make_error_response(self.get_status(), e))
+            return
+
+        if celery_result.get('version') is not None:
+            self.set_header('ETag', make_etag(celery_result['version']))
 
         # prepare json response
         response.data = celery_result
@@ -324,6 +612,7 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
         self.finish()
 
     @authenticated
+    @tornado.gen.coroutine
     def post(self, api_version, planet, service, tag):
         # init RestAPI response container
         response = SkyResponse()
@@ -334,7 +623,7 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
 
         # execute update state db record task
         kwargs=record_args
-        celery_result = skybase.actions.state.local.create(**kwargs)
+        celery_result = yield run_blocking(self, skybase.actions.state.local.create, **kwargs)
 
         # prepare json response
         response.data = celery_result
@@ -353,35 +642,275 @@ class SkybaseStateDBHandler(tornado.web.RequestHandler):
         self.write(response.response)
         self.finish()
 
+end_point_paths['SkybaseStateStackHandler'] = r"/api/([0-9,a-z,A-Z,.\-_]*)/state-stack/?"
+class SkybaseStateStackHandler(tornado.web.RequestHandler):
+
+    @authenticated
+    @tornado.gen.coroutine
+    def get(self, api_version):
+        # init RestAPI response container
+        response = SkyResponse()
+
+        # provider stack id or launch name expected as 'key' query argument
+        try:
+            provider_key = self.request.query_arguments.get('key')[0]
+        except (TypeError, IndexError):
+            self.set_status(400)
+            self.write(make_error_response(
+                self.get_status(),
+                skybase.exceptions.StateDBError('stack lookup requires key argument')))
+            return
+
+        tornado_access_log.debug('{0} state db stack key:{1}'.format(self.request.method, provider_key))
+
+        # find stack record using reverse index
+        result = yield run_blocking(self, skybase.actions.state.local.find_stack, provider_key)
+        if not result:
+            self.set_status(404)
+            self.write(make_error_response(
+                self.get_status(),
+                skybase.exceptions.StateDBRecordNotFoundError(provider_key)))
+            return
+
+        # prepare json response
+        response.data = result
+        response.code = self.get_status()
+        response.status = 'success'
+        response.links = {}
+        response.metadata = {
+            'restapi': {
+                'api_version': api_version,
+                'uri': self.request.uri,
+                'params': self.request.query_arguments,
+                'headers': self.request.headers,
+            },
+        }
+
+        self.write(response.response)
+        self.finish()
+
+end_point_paths['SkybaseStateChangesHandler'] = r"/api/([0-9,a-z,A-Z,.\-_]*)/state/changes/?"
+class SkybaseStateChangesHandler(tornado.web.RequestHandler):
+
+    # seconds between change feed polls while waiting and longest wait allowed
+    POLL_INTERVAL = 0.5
+    MAX_TIMEOUT = 60
+
+    @authenticated
+    @tornado.gen.coroutine
+    def get(self, api_version):
+        # init RestAPI response container
+        response = SkyResponse()
+
+        # changes after sequence number 'since', waiting up to 'timeout' seconds if none
+        params = {'since': 0, 'limit': None, 'timeout': 0}
+        for key in params:
+            try:
+                params[key] = int(self.request.query_arguments.get(key)[0])
+            except (TypeError, IndexError):
+                pass
+            except ValueError as e:
+                self.set_status(400)
+                self.write(make_error_response(self.get_status(), e))
+                return
+
+        # long-poll without blocking server while no changes available
+        deadline = time.time() + min(params['timeout'], self.MAX_TIMEOUT)
+        while True:
+            result = yield run_blocking(self, skybase.actions.state.local.read_changes, params['since'], params['limit'])
+            if result['changes'] or time.time() >= deadline or self.request.connection.stream.closed():
+                break
+            yield tornado.gen.Task(tornado.ioloop.IOLoop.current().add_timeout, time.time() + self.POLL_INTERVAL)
+
+        # prepare json response
+        response.data = result
+        response.code = self.get_status()
+        response.status = 'success'
+        response.links = {}
+        response.metadata = {
+            'restapi': {
+                'api_version': api_version,
+                'uri': self.request.uri,
+                'params': self.request.query_arguments,
+                'headers': self.request.headers,
+            },
+        }
+
+        self.write(response.response)
+        self.finish()
+
+end_point_paths['SkybaseStateBatchHandler'] = r"/api/([0-9,a-z,A-Z,.\-_]*)/state-batch/?"
+class SkybaseStateBatchHandler(tornado.web.RequestHandler):
+
+    @authenticated
+    @tornado.gen.coroutine
+    def get(self, api_version):
+        # init RestAPI response container
+        response = SkyResponse()
+
+        # repeatable 'id' record ids and/or /planet[/service] 'prefix'
+        params = dict()
+        params['record_ids'] = self.request.query_arguments.get('id', [])
+        try:
+            params['prefix'] = self.request.query_arguments.get('prefix')[0]
+        except (TypeError, IndexError):
+            params['prefix'] = None
+
+        if not (params['record_ids'] or params['prefix']):
+            self.set_status(400)
+            self.write(make_error_response(
+                self.get_status(),
+                skybase.exceptions.StateDBError('batch read requires id or prefix argument')))
+            return
+
+        try:
+            params['format'] = self.request.query_arguments.get('format')[0]
+        except (TypeError, IndexError):
+            params['format'] = None
+
+        for key in ['log_limit', 'log_offset']:
+            try:
+                params[key] = int(self.request.query_arguments.get(key)[0])
+            except (TypeError, IndexError):
+                pass
+            except ValueError as e:
+                self.set_status(400)
+                self.write(make_error_response(self.get_status(), e))
+                return
+
+        tornado_access_log.debug('{0} state db batch ids:{1} prefix:{2}'.format(
+            self.request.method, params['record_ids'], params['prefix']))
+
+        # read all records within single request
+        result = yield run_blocking(self, skybase.actions.state.local.read_many, **params)
+
+        # prepare json response
+        response.data = result
+        response.code = self.get_status()
+        response.status = 'success'
+        response.links = {}
+        response.metadata = {
+            'restapi': {
+                'api_version': api_version,
+                'uri': self.request.uri,
+                'params': self.request.query_arguments,
+                'headers': self.request.headers,
+            },
+        }
+
+        self.write(response.response)
+        self.finish()
+
+end_point_paths['SkybaseSessionHandler'] = r"/api/([0-9,a-z,A-Z,.\-_]*)/session/?"
+class SkybaseSessionHandler(tornado.web.RequestHandler):
+
+    @authenticated
+    @tornado.gen.coroutine
+    def post(self, api_version):
+        # session tokens issued only for requests signed with user secret key, not renewed by token
+        if self.current_user['session']:
+            self.set_status(403)
+            self.write(make_error_response(
+                self.get_status(),
+                skybase.exceptions.SkyBaseAuthenticationError('session token requires user key signature')))
+            return
+
+        user_id = self.current_user['user_id']
+        roles = yield run_blocking(self, skybase.actions.auth.db.find_user_roles, user_id)
+        token, session_key, expires = skybase.auth.session.create_token(
+            self.application.settings['skybase']['session_key'], user_id, roles,
+            ttl=self.application.settings['skybase']['session_ttl'])
+
+        tornado_access_log.info('session token for {0} expires {1}'.format(user_id, expires))
+
+        response = SkyResponse()
+        response.data = {
+            'user_id': user_id,
+            'roles': roles,
+            'token': token,
+            'session_key': session_key,
+            'expires': expires,
+        }
+        response.code = self.get_status()
+        response.status = 'success'
+        response.links = {}
+        response.metadata = {
+            'restapi': {
+                'api_version': api_version,
+                'uri': self.request.uri,
+            },
+        }
+
+        self.write(response.response)
+        self.finish()
+
 end_point_paths['SkybaseTaskHandler'] = r"/api/([0-9,a-z,A-Z,.\-_]*)/task/?([0-9,a-z,A-Z,\-]*/?)"
 class SkybaseTaskHandler(tornado.web.RequestHandler):
 
+    # longest wait allowed for task status change
+    MAX_WAIT = 60
+
     # TODO: create message signing utility for use with curl
     # TODO: create skybase group.command for retrieving results using task id
     #@authenticated
+    @tornado.gen.coroutine
     def get(self, api_version, task_id):
+        # task status seen by client and seconds to wait for status to change from it
+        params = {'wait': 0, 'status': 'PENDING'}
+        for key in params:
+            try:
+                params[key] = self.request.query_arguments.get(key)[0]
+            except (TypeError, IndexError):
+                pass
+        try:
+            wait = int(params['wait'])
+        except ValueError as e:
+            self.set_status(400)
+            self.write(make_error_response(self.get_status(), e))
+            return
+        seen_status = params['status']
+
         # query backend for task results
-        skytask_result = skybase.worker.celery.tasks.app.AsyncResult(task_id)
+        task_id, task_status, task_result = yield run_blocking(self, self._get_task_result, task_id)
+
+        # long-poll: hold request until task status changes or wait expires
+        if wait > 0 and task_status == seen_status:
+            watcher = self.application.settings['skybase']['task_watcher']
+            changed_status = yield watcher.wait(task_id, seen_status, min(wait, self.MAX_WAIT))
+            if changed_status is not None:
+                task_id, task_status, task_result = yield run_blocking(self, self._get_task_result, task_id)
 
         response = SkyResponse()
         response.code = self.get_status()
         response.status = 'success'
 
-        response.data = skytask_result.result
+        response.data = task_result
 
         response.metadata = {
             'uri': self.request.uri,
             'api_version': api_version,
             'params': self.request.query_arguments,
-            'task_id': skytask_result.task_id,
-            'task_status': skytask_result.status,
+            'task_id': task_id,
+            'task_status': task_status,
             'timestamp': skybase.utils.basic_timestamp(),
         }
 
         self.write(response.response)
         self.finish()
 
+    @staticmethod
+    def _get_task_result(task_id):
+        # result and status each read from celery result backend
+        skytask_result = skybase.worker.celery.tasks.app.AsyncResult(task_id)
+        return skytask_result.task_id, skytask_result.status, skytask_result.result
+
+    @staticmethod
+    def _get_task_statuses(task_ids):
+        # statuses of tasks watched by waiting requests
+        return dict((task_id, skybase.worker.celery.tasks.app.AsyncResult(task_id).status) for task_id in task_ids)
+
     @authenticated
+    @tornado.gen.coroutine
     def post(self, api_version, task_id):
         '''
         curl -X POST localhost:8888/api/0.1/task/?planet=dev-aws-us-west-1\&group=service\&command=create \
@@ -389,15 +918,16 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
         -H "SkybSignature: alksdjlfkaj" -H "SkybId: john.doe"
         '''
 
-        access_key = self.request.headers.get(sky_cfg.API_HTTP_HEADER_ACCESS_KEY)
         task_params = self._get_task_params()
 
-        # authorize user against group.command and planet (optional)
+        # authorize user against group.command and planet (optional); session roles from token
         try:
-            self._authorize(access_key, **task_params)
+            yield run_blocking(self, self._authorize, self.current_user['user_id'],
+                               roles=self.current_user['roles'], **task_params)
         except skybase.exceptions.SkyBaseUserAuthorizationError as e:
             self.set_status(403)
-            return self.write(make_error_response(self.get_status(), e))
+            self.write(make_error_response(self.get_status(), e))
+            return
 
         # attempt to route task to queue using group, command and planet
         try:
@@ -405,7 +935,8 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
             tornado_access_log.info('task params {0} routed to queue {1}'.format(task_params, task_queue))
         except skybase.exceptions.SkyBaseTaskRoutingError as e:
             self.set_status(400)
-            return self.write(make_error_response(self.get_status(), e))
+            self.write(make_error_response(self.get_status(), e))
+            return
 
         # prepare skytask runner arguments
         task_name = '.'.join([task_params['group'], task_params['command']])
@@ -413,11 +944,7 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
 
         tornado_access_log.debug('attempt to queue async task ([task, args], queue): ([{0}, {1}], {2})'.format(task_name, task_args, task_queue))
         # execute task in async mode, routing it to derived message queue
-        celery_result = skybase.worker.celery.tasks.execute.apply_async(
-            args=[task_name, task_args],
-            queue=task_queue,
-            kwargs={},
-        )
+        task_id, task_status = yield run_blocking(self, self._queue_task, task_name, task_args, task_queue)
 
         # initialize json response
         response = SkyResponse()
@@ -432,7 +959,7 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
                         server=self.application.settings['skybase']['rest_cfg'].data['restapi_server_url'],
                         route='task',
                     ),
-                    celery_result.task_id
+                    task_id
                 )
             }
         }
@@ -447,8 +974,8 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
             'task': {
                 'task_name': task_name,
                 'queue': task_queue,
-                'task_id': str(celery_result.task_id),
-                'task_status': str(celery_result.status),
+                'task_id': str(task_id),
+                'task_status': str(task_status),
             }
         }
 
@@ -456,13 +983,24 @@ class SkybaseTaskHandler(tornado.web.RequestHandler):
         self.finish()
 
 
-    def _authorize(self, access_key, group, command, planet=None):
+    @staticmethod
+    def _queue_task(task_name, task_args, task_queue):
+        # publish task to broker; initial status read from celery result backend
+        celery_result = skybase.worker.celery.tasks.execute.apply_async(
+            args=[task_name, task_args],
+            queue=task_queue,
+            kwargs={},
+        )
+        return celery_result.task_id, celery_result.status
+
+    def _authorize(self, access_key, group, command, planet=None, roles=None):
 
         is_authorized = skybase.skymap.can_modify_planet(
             access_key=access_key,
             group=group,
             command=command,
-            planet=planet)
+            planet=planet,
+            roles=roles)
 
         msg = 'authentication id {0} for {1}.{2}.{3}: {4}'.format(
             access_key,
@@ -0,0 +1,68 @@
+import time
+import argparse
+import threading
+
+from skybase import config as sky_cfg
+from skybase.api import create_api_url, create_auth_http_headers, submit_http_request
+
+# concurrent request latency against running restapi server.  each client thread issues
+# signed GET requests over routes in turn; slow routes (large state reads, long-polls)
+# mixed with fast ones show whether slow requests stall others.
+#
+#   python -m skybase.restapi.loadtest --config <dir> -r state/<planet>/<service>/<tag> \
+#       [-r <route> ...] [-c clients] [-n requests] [--server url]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(server, routes, credentials, clients, requests):
+    latencies = dict((route, []) for route in routes)
+    errors = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for n in range(offset, requests, clients):
+            route = routes[n % len(routes)]
+            url = create_api_url(server=server, route=route)
+            start = time.time()
+            response = submit_http_request('GET', url, headers=create_auth_http_headers(credentials))
+            elapsed = time.time() - start
+            with lock:
+                latencies[route].append(elapsed)
+                if response.status_code != 200:
+                    errors.append((route, response.status_code))
+
+    workers = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.time() - start, latencies, errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--route', dest='routes', action='append', required=True,
+                        help='api route below /api/<version>/; repeat to mix routes')
+    parser.add_argument('-c', '--clients', dest='clients', type=int, default=16)
+    parser.add_argument('-n', '--requests', dest='requests', type=int, default=400)
+    parser.add_argument('--server', dest='server', default=sky_cfg.API_SERVER)
+    parser.add_argument('--config', dest='config_dir', default=sky_cfg.DEFAULT_CONFIG_DIR,
+                        help='directory holding credentials.yaml')
+    args = parser.parse_args()
+
+    credentials = sky_cfg.SkyConfig.init_from_file('credentials', config_dir=args.config_dir).data
+    elapsed, latencies, errors = run_load(args.server, args.routes, credentials, args.clients, args.requests)
+
+    print '{0} clients, {1} requests in {2:.2f}s ({3:.1f} requests/s), {4} errors'.format(
+        args.clients, args.requests, elapsed, args.requests / elapsed, len(errors))
+    for route in args.routes:
+        values = latencies[route]
+        if values:
+            print '{0}: {1} requests, p50 {2:.1f}ms, p95 {3:.1f}ms, max {4:.1f}ms'.format(
+                route, len(values), percentile(values, 0.5) * 1000, percentile(values, 0.95) * 1000,
+                max(values) * 1000)
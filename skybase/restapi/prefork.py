@@ -0,0 +1,133 @@
+import os
+import errno
+import signal
+import logging
+
+# pre-fork restapi master.  listening sockets bound once in master and inherited by forked
+# worker processes, each running its own IOLoop and accepting from shared sockets.  master
+# serves no requests; it restarts workers that die and on SIGHUP replaces workers one at a
+# time, starting each replacement before old worker drains in-progress requests and exits.
+# SIGTERM or SIGINT drains all workers and stops master.
+
+# abnormal worker exits restarted before master gives up
+MAX_RESTARTS = 100
+
+prefork_log = logging.getLogger('tornado.general')
+
+
+class PreforkServer(object):
+    '''
+    fork and supervise worker processes calling worker(worker_id); worker returns
+    after draining requests in progress on SIGTERM or SIGINT
+    '''
+
+    def __init__(self, processes, worker):
+        self.processes = processes
+        self.worker = worker
+
+        # pid: worker id of running workers
+        self.workers = dict()
+        # workers told to drain and exit, not restarted
+        self.retiring = set()
+        # old workers waiting to be replaced by rolling restart
+        self.replace_queue = []
+
+        self.restarts = 0
+        self.restart_pending = False
+        self.stopping = False
+
+    def _spawn(self, worker_id):
+        pid = os.fork()
+        if pid == 0:
+            # worker handles own signals; master handlers must not run in worker
+            for signum in [signal.SIGHUP, signal.SIGTERM, signal.SIGINT]:
+                signal.signal(signum, signal.SIG_DFL)
+            status = 0
+            try:
+                self.worker(worker_id)
+            except Exception:
+                prefork_log.exception('restapi worker {0} (pid {1}) failed'.format(worker_id, os.getpid()))
+                status = 1
+            os._exit(status)
+
+        self.workers[pid] = worker_id
+        prefork_log.info('started restapi worker {0} (pid {1})'.format(worker_id, pid))
+        return pid
+
+    def _retire(self, pid):
+        # tell worker to stop accepting, drain and exit
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _replace_next(self):
+        # start replacement for next old worker still running, then retire old worker
+        while self.replace_queue and not self.stopping:
+            pid = self.replace_queue.pop(0)
+            if pid in self.workers:
+                self._spawn(self.workers[pid])
+                self._retire(pid)
+                return
+
+    def _on_restart(self, signum, frame):
+        self.restart_pending = True
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+        self.replace_queue = []
+        for pid in self.workers:
+            if pid not in self.retiring:
+                self._retire(pid)
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_restart)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+
+        while self.workers:
+            if self.restart_pending and not self.stopping:
+                # rolling restart of workers running now; restart already in progress restarted over
+                self.restart_pending = False
+                prefork_log.info('restarting {0} restapi workers'.format(len(self.workers)))
+                self.replace_queue = [pid for pid in self.workers if pid not in self.retiring]
+                self._replace_next()
+
+            try:
+                pid, status = os.wait()
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+
+            worker_id = self.workers.pop(pid, None)
+            if worker_id is None:
+                continue
+
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                prefork_log.info('restapi worker {0} (pid {1}) stopped'.format(worker_id, pid))
+                self._replace_next()
+                continue
+
+            if self.stopping:
+                continue
+
+            if os.WIFSIGNALED(status):
+                prefork_log.warning('restapi worker {0} (pid {1}) killed by signal {2}, restarting'.format(
+                    worker_id, pid, os.WTERMSIG(status)))
+            else:
+                prefork_log.warning('restapi worker {0} (pid {1}) exited with status {2}, restarting'.format(
+                    worker_id, pid, os.WEXITSTATUS(status)))
+
+            self.restarts += 1
+            if self.restarts > MAX_RESTARTS:
+                self._on_stop(None, None)
+                prefork_log.error('too many restapi worker restarts, stopping')
+                continue
+            self._spawn(worker_id)
@@ -0,0 +1,79 @@
+import time
+import logging
+
+import tornado.gen
+import tornado.ioloop
+import tornado.concurrent
+
+# celery result backend has no change notification; waiting task requests share one
+# watcher per restapi process reading status of each watched task once per interval,
+# however many clients wait on it.  watcher runs on IOLoop; status reads run on executor.
+
+# seconds between status reads while requests waiting
+POLL_INTERVAL = 0.5
+
+watch_log = logging.getLogger('tornado.general')
+
+
+class TaskStatusWatcher(object):
+    '''
+    futures resolved with task status once it differs from status seen by caller, or with
+    None when wait times out or watcher released.  used only from IOLoop thread.
+    '''
+
+    def __init__(self, executor, read_statuses, interval=POLL_INTERVAL):
+        self.executor = executor
+        # task ids: {task_id: status}
+        self.read_statuses = read_statuses
+        self.interval = interval
+
+        # task_id: [(status seen, future)]
+        self.waiters = dict()
+        self.running = False
+
+    def wait(self, task_id, status, timeout):
+        future = tornado.concurrent.Future()
+        self.waiters.setdefault(task_id, []).append((status, future))
+
+        io_loop = tornado.ioloop.IOLoop.current()
+        io_loop.add_timeout(time.time() + timeout, lambda: self._resolve(task_id, future, None))
+        if not self.running:
+            self.running = True
+            io_loop.add_callback(self._run)
+        return future
+
+    def _resolve(self, task_id, future, status):
+        if not future.done():
+            future.set_result(status)
+        waiters = [w for w in self.waiters.get(task_id, []) if not w[1].done()]
+        if waiters:
+            self.waiters[task_id] = waiters
+        else:
+            self.waiters.pop(task_id, None)
+
+    def release(self):
+        # answer all waiting requests now, as when draining worker
+        for task_id, waiters in self.waiters.items():
+            for status, future in waiters:
+                self._resolve(task_id, future, None)
+
+    @tornado.gen.coroutine
+    def _run(self):
+        io_loop = tornado.ioloop.IOLoop.current()
+        try:
+            while self.waiters:
+                try:
+                    statuses = yield self.executor.submit(self.read_statuses, list(self.waiters))
+                except Exception:
+                    watch_log.exception('task status read failed')
+                    statuses = {}
+
+                for task_id, status in statuses.items():
+                    for seen, future in list(self.waiters.get(task_id, [])):
+                        if status != seen:
+                            self._resolve(task_id, future, status)
+
+                if self.waiters:
+                    yield tornado.gen.Task(io_loop.add_timeout, time.time() + self.interval)
+        finally:
+            self.running = False
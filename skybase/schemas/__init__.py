@@ -1,11 +1,19 @@
 import os
 import ntpath
-import yaml
 
 from distutils import dir_util
 from distutils import file_util
 
 from skybase.utils import schema as schema_util
+from skybase.utils import yamlio
+
+
+class NoAliasDumper(yamlio.SafeDumper):
+    # emit schema templates without anchors/aliases and in schema key order
+    def ignore_aliases(self, data):
+        return True
+
+NoAliasDumper.add_representer(schema_util.UnsortableOrderedDict, NoAliasDumper.represent_dict)
 
 
 def set_indicators():
@@ -88,21 +96,19 @@ def create_yaml_from_schema(path, file_schema, operand, dry_run=False, force=Fal
     content = file_schema[content_index:]
     content_dict = create_dict_from_schema(content, os.path.basename(path).split('.')[0], operand)
 
-    noalias_dumper = yaml.dumper.SafeDumper
-    noalias_dumper.ignore_aliases = lambda self, data: True
-    noalias_dumper.add_representer(schema_util.UnsortableOrderedDict, yaml.representer.SafeRepresenter.represent_dict)
+    noalias_dumper = NoAliasDumper
 
     if dry_run:
         result_string += "File " + path + " would be created:\n"
         result_string += header + "\n"
-        result_string += yaml.dump(content_dict, allow_unicode=True, default_flow_style=False, Dumper=noalias_dumper)
+        result_string += yamlio.dump(content_dict, allow_unicode=True, Dumper=noalias_dumper)
     elif (not force) and os.path.exists(path):
         result_string += "File " + path + " exists, use --force to override.\n"
     else:
         result_string += "Creating file " + path + "\n"
         file_util.write_file(path, header + '\n')
         with open(path, 'w') as temp_file:
-            yaml.dump(content_dict, temp_file, allow_unicode=True, default_flow_style=False, Dumper=noalias_dumper)
+            yamlio.dump(content_dict, temp_file, allow_unicode=True, Dumper=noalias_dumper)
         temp_file.close()
     return result_string
 
@@ -183,8 +189,8 @@ def validate_yaml_with_schema(yaml_file, operand):
     with open(yaml_file, 'r') as temp_file:
         file_dict = {}
         try:
-            file_dict = yaml.load(temp_file)
-        except yaml.scanner.ScannerError:
+            file_dict = yamlio.load(temp_file)
+        except yamlio.ScannerError:
             result["valid"] = False
             result["result_string"] += "Invalid yaml syntax  " + yaml_file + '\n'
         if file_dict:
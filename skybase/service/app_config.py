@@ -1,6 +1,6 @@
 import os
 
-from skybase.utils.schema import read_yaml_from_file, convert_stack_roles_to_dict
+from skybase.utils.schema import read_cached_yaml_from_file, convert_stack_roles_to_dict
 
 class AppConfig(object):
     def __init__(self, service_name=None, service_dir=None, **kwargs):
@@ -13,7 +13,7 @@ class AppConfig(object):
     def app_config(self):
         filename = os.path.join(self.get_appconfig_path(), self.config_file)
         if os.path.isfile(filename):
-            app_config = read_yaml_from_file(filename)
+            app_config = read_cached_yaml_from_file(filename)
             # TODO: decision ==> stacks converted at instantiation or on-demand
             stacks = convert_stack_roles_to_dict(app_config.get('stacks'))
             app_config['stacks'] = stacks
@@ -1,6 +1,6 @@
 import os
 
-from skybase.utils.schema import read_yaml_from_file
+from skybase.utils.schema import read_cached_yaml_from_file
 from skybase.utils.schema import convert_stack_roles_to_dict
 
 
@@ -32,7 +32,7 @@ class Deploy(object):
         definition = stacks = None
 
         # read service from deployment yaml file
-        main_deployment = read_yaml_from_file(filename)
+        main_deployment = read_cached_yaml_from_file(filename)
 
         # TODO: decision ==> stacks converted at instantiation or on-demand
         # extract service attributes
@@ -1,33 +1,113 @@
-import yaml
 import os
+import errno
+import tempfile
 
-from skybase.actions.dbstate import PlanetStateDb
+from skybase.actions.dbstate import PlanetStateDb, RECORD_VERSION_KEY
 import skybase.exceptions
 from skybase.utils import basic_timestamp, simple_error_format
 from skybase.utils.schema import read_yaml_from_file
+from skybase.utils import yamlio
 from skybase.actions.dbstate import PlanetStateDbQuery
+from skybase.actions.dbstate import servicelog
+from skybase.actions.dbstate import changes
 from skybase.actions.skycloud import call_cloud_api
-from skybase.planet import Planet
+from skybase.planet import planet_registry
 
 class ServiceRegistryRecord(object):
-    def __init__(self, id, planet, service, tag, metadata, blueprint, log, stacks):
+    # service record components read from state db on first access and memoized
+    COMPONENTS = ['metadata', 'blueprint', 'log', 'stacks']
+
+    def __init__(self, id, planet, service, tag, metadata=None, blueprint=None, log=None, stacks=None):
         self.id = id
         self.planet = planet
         self.service = service
         self.tag = tag
-        self.metadata = metadata
-        self.blueprint = blueprint
-        self.log = log
-        self.stacks = stacks
+        self._components = dict()
+        self._log_options = dict()
+        for name, component in zip(self.COMPONENTS, [metadata, blueprint, log, stacks]):
+            if component is not None:
+                self._components[name] = component
 
     @classmethod
-    def init_from_id(cls, id):
+    def init_from_id(cls, id, log_limit=None, log_offset=0):
+        '''
+        log_limit and log_offset select page of service log entries, counting back
+        from most recent; log_limit None for configured default, 0 for all entries
+        '''
         planet, service, tag = id.split('/')[1:]
-        metadata = ServiceRegistryMetadata.init_from_id(id)
-        blueprint = ServiceRegistryBlueprint.init_from_id(id)
-        log = ServiceRegistryLog.init_from_id(id)
-        stacks = ServiceRegistryStacks.init_from_id(id)
-        return cls(id, planet, service, tag, metadata, blueprint, log, stacks)
+
+        # verify service record exists; components loaded as accessed
+        db = PlanetStateDb()
+        if not db.index.isdir(os.path.join(db.db, id.strip('/'))):
+            raise skybase.exceptions.StateDBRecordNotFoundError(id)
+
+        record = cls(id, planet, service, tag)
+        record._log_options = {'limit': log_limit, 'offset': log_offset}
+        return record
+
+    def _get_component(self, name):
+        if name not in self._components:
+            component_switch = {
+                'metadata': ServiceRegistryMetadata.init_from_id,
+                'blueprint': ServiceRegistryBlueprint.init_from_id,
+                'log': lambda id: ServiceRegistryLog.init_from_id(id, **self._log_options),
+                'stacks': ServiceRegistryStacks.init_from_id,
+            }
+            self._components[name] = component_switch[name](self.id)
+        return self._components[name]
+
+    @property
+    def metadata(self):
+        return self._get_component('metadata')
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._components['metadata'] = metadata
+
+    @property
+    def blueprint(self):
+        return self._get_component('blueprint')
+
+    @blueprint.setter
+    def blueprint(self, blueprint):
+        self._components['blueprint'] = blueprint
+
+    @property
+    def log(self):
+        return self._get_component('log')
+
+    @log.setter
+    def log(self, log):
+        self._components['log'] = log
+
+    @property
+    def stacks(self):
+        return self._get_component('stacks')
+
+    @stacks.setter
+    def stacks(self, stacks):
+        self._components['stacks'] = stacks
+
+    def __getstate__(self):
+        # serialized record materializes all components; format unchanged from eager record
+        state = {
+            'id': self.id,
+            'planet': self.planet,
+            'service': self.service,
+            'tag': self.tag,
+        }
+        for name in self.COMPONENTS:
+            state[name] = self._get_component(name)
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(
+            state['id'], state['planet'], state['service'], state['tag'],
+            metadata=state.get('metadata'),
+            blueprint=state.get('blueprint'),
+            log=state.get('log'),
+            stacks=state.get('stacks'),
+        )
 
     @property
     def salt_tgt(self):
@@ -49,14 +129,38 @@ class ServiceRegistryRecord(object):
         return result
 
     def serialize_as_yaml(self):
-        return yaml.dump(self)
+        return yamlio.dump_object(self)
+
+    @property
+    def version(self):
+        # record version read with record; None for records serialized by earlier releases
+        return getattr(self.metadata, 'record_version', None)
+
+    def update(self, version=None):
+        '''
+        write record changes and increment record version.  version, when provided,
+        must match current record version or StateDBRecordConflictError is raised.
+        '''
+        db = PlanetStateDb()
+        try:
+            with db.lock_service_record(self.id):
+                current_version = db.read_service_version(self.id, ServiceRegistryMetadata.FILENAME)
+                if version is not None and version != current_version:
+                    raise skybase.exceptions.StateDBRecordConflictError(
+                        '{0}: record version {1} does not match current version {2}'.format(
+                            self.id, version, current_version))
+                self.metadata.record_version = current_version + 1
+                self.metadata.update()
+                db.append_change(changes.UPDATE, self.id, {'version': self.metadata.record_version})
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            raise skybase.exceptions.StateDBRecordNotFoundError(self.id)
 
-    def update(self):
         try:
-            self.metadata.update()
             self.blueprint.update()
             # TODO: COOKBOOK_ONLY first and only update type supported.  will eventually derive from --plan option and artiball config
-            log_entry = '{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6}\n'.format(
+            log_entry = [
                 basic_timestamp(),
                 'UPDATE_RERUN',
                 self.service,
@@ -64,7 +168,7 @@ class ServiceRegistryRecord(object):
                 self.metadata.build,
                 self.tag,
                 self.metadata.artiball,
-            )
+            ]
             self.log.update(log_entry)
             return True
         except Exception as e:
@@ -74,12 +178,13 @@ class ServiceRegistryRecord(object):
 class ServiceRegistryMetadata(object):
     FILENAME = 'metadata.yaml'
 
-    def __init__(self, id, name, version, build, artiball):
+    def __init__(self, id, name, version, build, artiball, record_version=0):
         self.id = id
         self.name = name
         self.version = version
         self.build = build
         self.artiball = artiball
+        self.record_version = record_version
 
     @property
     def record(self):
@@ -92,11 +197,15 @@ class ServiceRegistryMetadata(object):
         # connect to database
         db = PlanetStateDb()
 
-        # prepare path to file and call init_from_file
+        # prepare path to file and read contents from state db index
         metadata_file = os.path.join(db.db, id.strip('/'),
                                      ServiceRegistryMetadata.FILENAME)
+        try:
+            metadata = db.index.read_yaml(metadata_file)
+        except IOError:
+            raise skybase.exceptions.StateDBRecordNotFoundError(id)
 
-        return cls.init_from_file(id, metadata_file)
+        return cls.init_from_dict(id, metadata)
 
     @classmethod
     def init_from_file(cls, id, metadata_file):
@@ -105,14 +214,19 @@ class ServiceRegistryMetadata(object):
             metadata = read_yaml_from_file(metadata_file)
         except IOError:
             raise skybase.exceptions.StateDBRecordNotFoundError(id)
-        else:
-            # map file contents to values and call init
-            name = metadata.get('app_name')
-            version = metadata.get('app_version')
-            build = metadata.get('build_id')
-            artiball = metadata.get('source_artiball')
 
-        return cls(id, name, version, build, artiball)
+        return cls.init_from_dict(id, metadata)
+
+    @classmethod
+    def init_from_dict(cls, id, metadata):
+        # map file contents to values and call init
+        name = metadata.get('app_name')
+        version = metadata.get('app_version')
+        build = metadata.get('build_id')
+        artiball = metadata.get('source_artiball')
+        record_version = metadata.get(RECORD_VERSION_KEY, 0)
+
+        return cls(id, name, version, build, artiball, record_version)
 
     def output_as_dict(self):
         result = {
@@ -121,12 +235,21 @@ class ServiceRegistryMetadata(object):
             'app_version': self.version,
             'build_id': self.build,
             'source_artiball': self.artiball,
+            RECORD_VERSION_KEY: getattr(self, 'record_version', 0),
         }
         return result
 
     def update(self):
-        with open(self.record, 'w') as f:
-            f.write(yaml.safe_dump(self.output_as_dict(), default_flow_style=False))
+        # replace by rename so concurrent readers never see partial file
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(self.record), prefix='.' + ServiceRegistryMetadata.FILENAME + '-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                yamlio.dump(self.output_as_dict(), f)
+            os.rename(temp_file, self.record)
+        except Exception:
+            os.remove(temp_file)
+            raise
+        PlanetStateDb().index.invalidate(self.record)
 
 
 class ServiceRegistryBlueprint(object):
@@ -148,10 +271,14 @@ class ServiceRegistryBlueprint(object):
         # connect to database
         db = PlanetStateDb()
 
-        # prepare path to file and call init_from_file
+        # prepare path to file and read contents from state db index
         blueprint_file = os.path.join(db.db, id.strip('/'), ServiceRegistryBlueprint.FILENAME)
+        try:
+            blueprint = db.index.read_yaml(blueprint_file)
+        except IOError:
+            raise skybase.exceptions.StateDBRecordNotFoundError(id)
 
-        return cls.init_from_file(id, blueprint_file)
+        return cls.init_from_dict(id, blueprint)
 
     @classmethod
     def init_from_file(cls, id, blueprint_file):
@@ -160,9 +287,13 @@ class ServiceRegistryBlueprint(object):
             blueprint = read_yaml_from_file(blueprint_file)
         except IOError:
             raise skybase.exceptions.StateDBRecordNotFoundError(id)
-        else:
-            definition = blueprint.get('definition')
-            stacks = blueprint.get('stacks')
+
+        return cls.init_from_dict(id, blueprint)
+
+    @classmethod
+    def init_from_dict(cls, id, blueprint):
+        definition = blueprint.get('definition')
+        stacks = blueprint.get('stacks')
 
         return cls(id, definition, stacks)
 
@@ -183,11 +314,15 @@ class ServiceRegistryBlueprint(object):
 
 
 class ServiceRegistryLog(object):
-    FILENAME = 'service.log'
+    FILENAME = servicelog.FILENAME
 
-    def __init__(self, id, log):
+    def __init__(self, id, log, offset=0, limit=None, total=None):
         self.id = id
         self.log = log
+        # page of service log held; total number of entries in service log
+        self.offset = offset
+        self.limit = limit
+        self.total = len(log) if total is None else total
 
     @property
     def record(self):
@@ -196,36 +331,43 @@ class ServiceRegistryLog(object):
         return record
 
     @classmethod
-    def init_from_id(cls, id):
+    def init_from_id(cls, id, limit=None, offset=0, since=None, until=None, actions=None):
+        '''
+        read page of limit entries, skipping offset most recent, from service log.
+        limit None for configured default, 0 for all entries.  since, until and actions
+        restrict entries to timestamp range and list of actions.
+        '''
         # connect to database
         db = PlanetStateDb()
+        if limit is None:
+            limit = db.log_tail
+        offset = offset or 0
 
-        # prepare path to file and call init_from_file
+        # prepare path to file and read selected entries using log index
         log_file = os.path.join(db.db, id.strip('/'), ServiceRegistryLog.FILENAME)
+        log, total = servicelog.read(log_file, limit=limit, offset=offset, since=since, until=until, actions=actions)
 
-        return cls.init_from_file(id, log_file)
+        return cls(id, log, offset, limit, total)
 
     @classmethod
     def init_from_file(cls, id, log_file):
         # attempt to log file contents and init class with results
-        try:
-            with open(log_file) as f:
-                log = f.read().splitlines()
-        except IOError:
-            log = []
-
+        log, total = servicelog.read(log_file)
         return cls(id, log)
 
     def output_as_dict(self):
         result = {
             'id': self.id,
             'log': self.log,
+            'offset': self.offset,
+            'limit': self.limit,
+            'total': self.total,
         }
         return result
 
     def update(self, entry):
-        with open(self.record, 'a') as f:
-            f.write('{0}'.format(entry))
+        # append entry (list of fields) to service log
+        PlanetStateDb().append_service_log(self.id, [entry])
 
 class ServiceRegistryStacks(object):
     def __init__(self, service_id, stacks):
@@ -248,23 +390,14 @@ class ServiceRegistryStacks(object):
 
     @classmethod
     def init_from_id(cls, service_id):
-        # connect to database
+        # connect to database and find stacks deployed for service
         db = PlanetStateDb()
+        deployed_stacks = db.list_stacks(service_id)
 
-        # prepare path to file and call init_from_file
-        service_path = os.path.join(db.db, service_id.strip('/'))
-
-        # any/all subdirs to service are assumed to be a deployed stack
-        try:
-            deployed_stacks = [stack for stack in os.listdir(service_path)
-                      if os.path.isdir(os.path.join(service_path, stack))]
-        except OSError:
-            deployed_stacks = []
-
+        # stack information queried as accessed
         stacks = dict()
         for stack in deployed_stacks:
-            service_stack_id = '/'.join([service_id, stack])
-            stacks[stack] = ServiceRegistryStack.init_from_id(service_stack_id)
+            stacks[stack] = ServiceRegistryStack(service_id, stack)
 
         return cls(service_id, stacks)
 
@@ -277,7 +410,30 @@ class ServiceRegistryStack(object):
     def __init__(self, service_id, stack_name, stack_info=None):
         self.service_id = service_id
         self.stack_name = stack_name
-        self.stack_info = stack_info
+        self._stack_info = stack_info
+
+    @property
+    def stack_info(self):
+        # query stack information on first access
+        if self._stack_info is None:
+            query = PlanetStateDbQuery.init_from_id('/'.join([self.service_id, self.stack_name]))
+            self._stack_info = query.format_result_set(query.execute())
+        return self._stack_info
+
+    @stack_info.setter
+    def stack_info(self, stack_info):
+        self._stack_info = stack_info
+
+    def __getstate__(self):
+        # serialized stack materializes stack information
+        return {
+            'service_id': self.service_id,
+            'stack_name': self.stack_name,
+            'stack_info': self.stack_info,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state['service_id'], state['stack_name'], state.get('stack_info'))
 
     @property
     def record(self):
@@ -321,7 +477,7 @@ class ServiceRegistryStack(object):
 
         # acquire provider stack status
         stack_status = None
-        planet = Planet(planet_name)
+        planet = planet_registry.get(planet_name)
 
         # TODO/DECISION: fail silently and let context determine action or raise errors?
         # attempt to acquire stack status
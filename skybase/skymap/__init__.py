@@ -1,9 +1,27 @@
 import re
+import threading
+import collections
+
 from skybase import config as sky_cfg
 from skybase.actions.auth.db import find_user_roles
 
 rest_cfg = sky_cfg.SkyConfig.init_from_file('restapi', config_dir=sky_cfg.CONFIG_DIR)
 
+# routing maps (restapi queues, roles) compiled once into one allow and one deny regex per
+# route; allowed routes memoized per 'group command planet' text.  compiled matchers keyed
+# by routing map identity: config registry shares parsed data until file changes, and
+# maps must not be modified in place once matched against.
+MAX_DECISIONS = 4096
+MAX_MATCHERS = 16
+
+# inline flags apply to whole pattern and group references are renumbered when patterns
+# joined; rule groups using either matched pattern by pattern
+UNSAFE_TO_COMBINE = re.compile(r'\(\?[a-zA-Z]|\(\?P=|\\[1-9]')
+
+# python 2.7 re supports at most 99 capturing groups per pattern; rules joined into as
+# few patterns as stay within limit
+MAX_GROUPS = 99
+
 # extract rule group for queue
 def get_rule_group(routes, rule_type):
     return (routes or {}).get(rule_type, []) or []
@@ -14,25 +32,106 @@ def get_rule_matches(rule_group, command):
         if re.match(rule, command):
             return True
 
-def get_allowed_routes(family=None, command=None, planet='', routing_map=None):
-    #join command components together as target text for regex pattern match
-    command = ' '.join([str(family), str(command), str(planet)])
-    allowed_routes = []
+def combine_rules(rules):
+    return re.compile('|'.join('(?:{0})'.format(rule) for rule in rules))
+
+def compile_rule_group(rule_group):
+    # list of compiled patterns matching where any rule in group matches
+    if not rule_group:
+        return []
+    if any(UNSAFE_TO_COMBINE.search(rule) for rule in rule_group):
+        return [re.compile(rule) for rule in rule_group]
+
+    patterns = []
+    rules, groups = [], 0
+    for rule in rule_group:
+        rule_groups = re.compile(rule).groups
+        if rules and groups + rule_groups > MAX_GROUPS:
+            patterns.append(combine_rules(rules))
+            rules, groups = [], 0
+        rules.append(rule)
+        groups += rule_groups
+    patterns.append(combine_rules(rules))
+    return patterns
+
+
+class RouteMatcher(object):
+    '''
+    allow/deny rules of routing map compiled once, with bounded memo of allowed routes
+    per command text.  returned route lists shared between callers and must be treated
+    as read-only.
+    '''
+
+    def __init__(self, routing_map):
+        self.routing_map = routing_map
+        self.rules = [
+            (route,
+             compile_rule_group(get_rule_group(routing_map[route], 'allow')),
+             compile_rule_group(get_rule_group(routing_map[route], 'deny')))
+            for route in routing_map
+        ]
+
+        self._lock = threading.Lock()
+        self._decisions = collections.OrderedDict()
 
-    for route in routing_map:
-        # extract allow/deny rule groups for route
-        allow_rule_group = get_rule_group(routing_map[route], 'allow')
-        deny_rule_group = get_rule_group(routing_map[route], 'deny')
+    def match(self, command):
+        # routes with any allow rule and no deny rule matching command text
+        return [route for route, allow, deny in self.rules
+                if any(p.match(command) for p in allow) and not any(p.match(command) for p in deny)]
 
-        # test command against allow/deny rule groups
-        allow = get_rule_matches(allow_rule_group, command)
-        deny = get_rule_matches(deny_rule_group, command)
+    def allowed_routes(self, command):
+        with self._lock:
+            routes = self._decisions.pop(command, None)
+            if routes is not None:
+                # most recently used decisions kept at end
+                self._decisions[command] = routes
+                return routes
 
-        # test allow/deny match results
-        if allow and not deny:
-            allowed_routes.append(route)
+        routes = self.match(command)
 
-    return allowed_routes
+        with self._lock:
+            self._decisions[command] = routes
+            while len(self._decisions) > MAX_DECISIONS:
+                self._decisions.popitem(last=False)
+        return routes
+
+
+class RouteMatcherRegistry(object):
+    '''
+    process-wide registry of compiled routing maps
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matchers = dict()
+
+    def get(self, routing_map):
+        with self._lock:
+            # matcher holds routing map so its id cannot be reused while entry exists
+            matcher = self._matchers.get(id(routing_map))
+            if matcher and matcher.routing_map is routing_map:
+                return matcher
+
+            matcher = RouteMatcher(routing_map)
+            if len(self._matchers) >= MAX_MATCHERS:
+                # maps replaced by config reload
+                self._matchers.clear()
+            self._matchers[id(routing_map)] = matcher
+            return matcher
+
+    def invalidate(self):
+        with self._lock:
+            self._matchers.clear()
+
+
+# shared by all route and role checks within process
+route_matcher_registry = RouteMatcherRegistry()
+
+
+def get_allowed_routes(family=None, command=None, planet='', routing_map=None):
+    #join command components together as target text for regex pattern match
+    command = ' '.join([str(family), str(command), str(planet)])
+    return list(route_matcher_registry.get(routing_map).allowed_routes(command))
 
 # TODO: renaming required for group.command.planet AND group.command; can_role_execute_command() maybe?
 def role_allowed_for_planet(role, family, command, planet_name, routing_map=rest_cfg.data.get('roles')):
@@ -40,10 +139,14 @@ def role_allowed_for_planet(role, family, command, planet_name, routing_map=rest
     return role in allowed_roles
 
 # TODO: renaming required for group.command.planet AND group.command; can_user_execute_command() maybe?
-def can_modify_planet(access_key, group, command, planet, routing_map=rest_cfg.data.get('roles')):
-    roles = find_user_roles(access_key)
-    # test each role for first allowed access to planet
+def can_modify_planet(access_key, group, command, planet, routing_map=rest_cfg.data.get('roles'), roles=None):
+    # roles of session token or from auth db
+    if roles is None:
+        roles = find_user_roles(access_key)
+    # allowed roles matched once; test each role for first allowed access to planet
+    allowed_roles = get_allowed_routes(group, command, planet, routing_map)
     for role in roles:
-        if role_allowed_for_planet(role, group, command, planet, routing_map):
+        if role in allowed_roles:
             return True
-    return False
\ No newline at end of file
+    return False
+
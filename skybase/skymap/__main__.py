@@ -0,0 +1,61 @@
+import sys
+import time
+import random
+
+from skybase.skymap import RouteMatcher, get_allowed_routes, get_rule_group, get_rule_matches
+
+# routing decisions per second for uncompiled rule loop, compiled matcher and memoized
+# matcher over generated routing map:
+#   python -m skybase.skymap [routes] [planets] [requests]
+
+ROUTES = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+PLANETS = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+REQUESTS = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+
+GROUPS = ['service', 'state', 'pack', 'reference', 'route', 'user', 'admin', 'postproc']
+COMMANDS = ['deploy', 'status', 'delete_stacks', 'record_state', 'get_ips', 'update', 'list', 'info']
+ENVS = ['dev', 'qa', 'stage', 'prod']
+
+# five allow and one deny rule per route, shaped like restapi.yaml queues and roles
+routing_map = dict()
+for n in range(ROUTES):
+    routing_map['route{0}'.format(n)] = {
+        'allow': ['.* .* {0}-.*-region{1}'.format(env, n) for env in ENVS] + [
+            '{0} .*'.format(GROUPS[n % len(GROUPS)])],
+        'deny': ['service (status|delete_stacks) .*-region{0}'.format(n)],
+    }
+
+planets = ['{0}-app{1}-region{2}'.format(ENVS[n % len(ENVS)], n, n % ROUTES) for n in range(PLANETS)]
+rng = random.Random(0)
+# requests concentrated on hot planets, as automation against few environments
+requests = [(rng.choice(GROUPS), rng.choice(COMMANDS), planets[int(rng.paretovariate(1.2)) % PLANETS])
+            for _ in range(REQUESTS)]
+
+def uncompiled(family, command, planet):
+    command = ' '.join([str(family), str(command), str(planet)])
+    return [route for route in routing_map
+            if get_rule_matches(get_rule_group(routing_map[route], 'allow'), command)
+            and not get_rule_matches(get_rule_group(routing_map[route], 'deny'), command)]
+
+matcher = RouteMatcher(routing_map)
+
+def compiled(family, command, planet):
+    return matcher.match(' '.join([family, command, planet]))
+
+def memoized(family, command, planet):
+    return get_allowed_routes(family, command, planet, routing_map)
+
+for request in requests[:500]:
+    assert uncompiled(*request) == compiled(*request) == memoized(*request), request
+
+rules = sum(len(r['allow']) + len(r['deny']) for r in routing_map.values())
+distinct = len(set(requests))
+print '{0} routes, {1} rules, {2} planets, {3} requests ({4} distinct)'.format(
+    ROUTES, rules, PLANETS, REQUESTS, distinct)
+# uncompiled loop recompiles rules once more than re module caches; timed on sample
+for name, decide, sample in [('uncompiled', uncompiled, requests[:500]), ('compiled', compiled, requests),
+                             ('memoized', memoized, requests)]:
+    start = time.time()
+    for request in sample:
+        decide(*request)
+    print '{0:10}: {1:.0f} decisions/s'.format(name, len(sample) / (time.time() - start))
@@ -1,12 +1,12 @@
 import logging
 import os
-import yaml
 
 from skybase import config as sky_cfg
 from skybase.skytask import SkyTask
 from skybase import skytask
 from skybase.actions import sky_chef as sky_chef_actions
 from skybase.utils.logger import Logger
+from skybase.utils import yamlio
 
 def chef_update_environment_add_arguments(parser):
 
@@ -43,7 +43,7 @@ class UpdateEnvironment(SkyTask):
         if os.path.exists(knife_config_path):
             planet_env_yaml = os.path.join(knife_env_path, self.args['planet'] + '.yaml')
             with open(planet_env_yaml, 'r') as f:
-                planet_env_attr = yaml.load(f)
+                planet_env_attr = yamlio.load(f)
                 chef_env_attr = planet_env_attr['services']['chefserver']['chef_environment']['default_attributes']
                 chef_env_final = chef_env_attr.copy()
                 chef_env_final.update(planet_env_attr)
@@ -1,7 +1,7 @@
 import logging
 
 from skybase.skytask import SkyTask
-from skybase.planet import Planet
+from skybase.planet import planet_registry
 from skybase.utils.logger import Logger
 from skybase import skytask
 from skybase.actions.dbstate import PlanetStateQueryTypes, PlanetStateDbQuery
@@ -42,23 +42,22 @@ class GetIps(SkyTask):
             self.args['skybase_id'],
             query_type = PlanetStateQueryTypes.WILDCARD)
 
-        # execute query and return standard result
-        query_result = query.format_result_set(query.execute())
-
         # tabular output header
-        service_output = '\n{0}\t\t{1}\t\t{2}\n\n'.format('ip_address', 'role_name', 'stack_name')
+        service_output = ['\n{0}\t\t{1}\t\t{2}\n\n'.format('ip_address', 'role_name', 'stack_name')]
 
         # gather and format state information for each stack, role, and
-        # instance ip address for query result
-        for result in query_result:
+        # instance ip address as query results are read
+        for record in query.iter_execute():
 
             # unpack query result
-            recid, instance_info = result.items()[0]
-            stackname = instance_info['cloud']['stack_name']
+            if not record.cloud:
+                continue
+            recid = record.id
+            stackname = record.cloud.stack_name
 
-            # TODO: performance / DRY enhancement: register planet and only init when not present
+            # acquire shared planet from registry
             planet_name = recid.split('/')[1]
-            planet = Planet(planet_name)
+            planet = planet_registry.get(planet_name)
 
             # get stack status
             stack_status = call_cloud_api(
@@ -68,7 +67,6 @@ class GetIps(SkyTask):
             )
 
             # report state information if stack launch complete
-            stack_output = ''
             if stack_status == 'CREATE_COMPLETE':
                 # call cloud provider for ip addresses
                 stack_info = call_cloud_api(
@@ -76,26 +74,21 @@ class GetIps(SkyTask):
                     stack_name=stackname,
                     action='get_instance_ip',
                 )
-                
+
                 # parse stack, role, instance info for ip addresses and
                 # present in tabular format
                 for instance_role_name, instances in stack_info.items():
                     # prepare output line for each ip address
                     for inst in instances:
-                        # prepare complete line of output
-                        role_ip_info = '{0}\t\t{1}\t\t{2}\n\n'.format(str(inst['private_ip_address']), instance_role_name, stackname)
-
-                        # accumulate stack output
-                        stack_output += role_ip_info
+                        # accumulate complete line of output
+                        service_output.append('{0}\t\t{1}\t\t{2}\n\n'.format(
+                            str(inst['private_ip_address']), instance_role_name, stackname))
             else:
                 # accumulate stack output
-                stack_output += '\n\nWARNING: Stack "{0}" Status is "{1}" - no IP info \n'.format(
-                    stackname, stack_status)
-
-            # accumulate service output
-            service_output = service_output + stack_output
+                service_output.append('\n\nWARNING: Stack "{0}" Status is "{1}" - no IP info \n'.format(
+                    stackname, stack_status))
 
         # prepare results
-        self.result.output = service_output.strip()
+        self.result.output = ''.join(service_output).strip()
         self.result.format = skytask.output_format_raw
         return self.result
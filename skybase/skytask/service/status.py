@@ -1,7 +1,7 @@
 import logging
 
 from skybase.skytask import SkyTask
-from skybase.planet import Planet
+from skybase.planet import planet_registry
 from skybase.utils.logger import Logger
 from skybase import skytask
 from skybase.actions.dbstate import PlanetStateQueryTypes, PlanetStateDbQuery
@@ -58,6 +58,36 @@ def service_status_add_arguments(parser):
         help='retrieve information for instances'
     )
 
+    parser.add_argument(
+        '--limit',
+        dest='limit',
+        action='store',
+        type=int,
+        default=None,
+        help='maximum number of records returned; result includes total for paging'
+    )
+
+    parser.add_argument(
+        '--offset',
+        dest='offset',
+        action='store',
+        type=int,
+        default=0,
+        help='number of records to skip (default 0)'
+    )
+
+    parser.add_argument(
+        '--fields',
+        dest='fields',
+        action='store',
+        type=lambda fields: [field.strip() for field in fields.split(',') if field.strip()],
+        default=None,
+        help='comma separated record fields to return: {0}'.format(', '.join(STATUS_FIELDS))
+    )
+
+# record fields available for projection; cloud provider queried only for stack_status and roles
+STATUS_FIELDS = ['skybase_id', 'stack_id', 'stack_name', 'stack_status', 'roles']
+
 class Status(SkyTask):
     def __init__(self, all_args=None, runner_cfg=None):
         SkyTask.__init__(self, all_args, runner_cfg)
@@ -67,6 +97,18 @@ class Status(SkyTask):
         self.runner_cfg = runner_cfg
 
     def preflight_check(self):
+        preflight_result = []
+
+        unknown_fields = set(self.args.get('fields') or []) - set(STATUS_FIELDS)
+        if unknown_fields:
+            self.preflight_check_result.status = 'FAIL'
+            preflight_result.append('unknown fields: {0}'.format(', '.join(sorted(unknown_fields))))
+
+        if (self.args.get('limit') or 0) < 0 or (self.args.get('offset') or 0) < 0:
+            self.preflight_check_result.status = 'FAIL'
+            preflight_result.append('limit and offset must not be negative')
+
+        self.preflight_check_result.set_output(preflight_result)
         return self.preflight_check_result
 
     def execute(self):
@@ -77,6 +119,15 @@ class Status(SkyTask):
         continent_tag = self.args.get('tag')
         stack_name = self.args.get('stack_name')
         verbose = self.args.get('verbose')
+        limit = self.args.get('limit')
+        offset = self.args.get('offset')
+        fields = self.args.get('fields')
+
+        def is_selected(field):
+            return not fields or field in fields
+
+        # page and projection applied by query; only records in page read from state db
+        page_args = {'limit': limit, 'offset': offset, 'fields': fields}
 
         # test if any query filtering args are provided to drive type of query
         no_query_args = skybase_id == planet_name == service_name == continent_tag == stack_name == None
@@ -90,10 +141,11 @@ class Status(SkyTask):
                 tag=continent_tag,
                 stack=stack_name,
                 query_type=PlanetStateQueryTypes.DRILLDOWN,
+                **page_args
             )
         elif skybase_id:
             # query by unique skybase id
-            query = PlanetStateDbQuery.init_from_id(skybase_id,)
+            query = PlanetStateDbQuery.init_from_id(skybase_id, **page_args)
         else:
             # query by provided arguments
             query = PlanetStateDbQuery(
@@ -102,22 +154,35 @@ class Status(SkyTask):
                 tag=continent_tag,
                 stack=stack_name,
                 query_type=PlanetStateQueryTypes.WILDCARD,
+                **page_args
             )
 
-        # execute query and return standard result
-        query_result = query.format_result_set(query.execute())
+        # execute query and return standard result; records read and formatted one at a time
+        query_result = []
+        for record in query.iter_execute():
+            result = query.format_record(record)
+            query_result.append(result)
+
+            # extend query results if working with skybase ID or filter args that return stacks;
+            # cloud provider queried only for page of results and only when status fields selected
+            if not no_query_args:
+                # unpack query result; record ids only above stack level
+                if not record.cloud:
+                    continue
+                recid, info = result.items()[0]
 
+                # add skybase ID
+                if is_selected('skybase_id'):
+                    info['skybase_id'] = recid
 
-        # extend query results if working with skybase ID or filter args that return stacks
-        if not no_query_args:
-            for result in query_result:
-                # unpack query result
-                recid, info = result.items()[0]
-                stackname = info['cloud']['stack_name']
+                if not (is_selected('stack_status') or (verbose and is_selected('roles'))):
+                    continue
+
+                stackname = record.cloud.stack_name
 
-                # TODO: performance / DRY enhancement: register planet and only init when not present
+                # acquire shared planet from registry
                 planet_name = recid.split('/')[1]
-                planet = Planet(planet_name)
+                planet = planet_registry.get(planet_name)
 
                 # get stack status
                 try:
@@ -129,14 +194,12 @@ class Status(SkyTask):
                 except Exception as e:
                     stack_status = e.message
 
-                # add skybase ID
-                info['skybase_id'] = recid
-
                 # add status to results
-                info['cloud'].update({'stack_status': stack_status})
+                if is_selected('stack_status'):
+                    info['cloud'].update({'stack_status': stack_status})
 
                 # query cloud provider for current state information
-                if verbose and stack_status == 'CREATE_COMPLETE':
+                if verbose and is_selected('roles') and stack_status == 'CREATE_COMPLETE':
                     instance_info = call_cloud_api(
                         planet=planet,
                         stack_name=stackname,
@@ -145,6 +208,15 @@ class Status(SkyTask):
                     # insert roles info into query result object
                     info['roles'] = instance_info
 
+        # paged output includes total number of matching records
+        if query.is_paged():
+            query_result = {
+                'records': query_result,
+                'total': query.total,
+                'offset': query.offset,
+                'limit': query.limit,
+            }
+
         # execute query
         self.result.output = query_result
         self.result.format = skytask.output_format_json
@@ -1,7 +1,6 @@
 import logging
 import os
 
-import yaml
 import boto.exception
 
 import skybase.actions.state
@@ -14,6 +13,7 @@ from skybase.utils.logger import Logger
 from skybase import skytask
 from skybase.service import SkyService, SkyRuntime, SkySystem
 from skybase.utils import simple_error_format, all_true
+from skybase.utils import yamlio
 from skybase.planet import Planet
 from skybase.actions.skyenv import artiball_transfer
 from skybase.api.salt import SkySaltAPI
@@ -177,7 +177,7 @@ class Update(SkyTask):
             preflight_result.append(SkyBaseValidationError(simple_error_format(e)))
         else:
             try:
-                self.target_service = yaml.load(serialized_record)
+                self.target_service = yamlio.load_object(serialized_record)
                 self.runtime.tag = self.target_service.tag
             except Exception as e:
                 self.preflight_check_result.status = 'FAIL'
@@ -311,6 +311,7 @@ class Update(SkyTask):
                         record_id=self.id,
                         service_record=self.target_service.serialize_as_yaml(),
                         credentials=sky_cfg.SkyConfig.init_from_file('credentials').data,
+                        version=self.target_service.version,
                     )
             except SkyBaseError as e:
                 self.result.output['update_service_registry'] = simple_error_format(e)
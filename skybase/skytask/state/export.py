@@ -0,0 +1,61 @@
+import logging
+
+from skybase.skytask import SkyTask
+from skybase.utils.logger import Logger
+from skybase import skytask
+from skybase.actions.dbstate import PlanetStateDb
+import skybase.actions.dbstate.bulk
+import skybase.actions.state.local
+
+
+def state_export_add_arguments(parser):
+
+    parser.add_argument(
+        '-f', '--file',
+        dest='snapshot_file',
+        action='store',
+        required=True,
+        help='snapshot file to write (gzip compressed tar)'
+    )
+
+    parser.add_argument(
+        '--no-before-images',
+        dest='before_images',
+        action='store_false',
+        default=True,
+        help='exclude record before images from snapshot'
+    )
+
+    parser.add_argument(
+        '-m', '--mode',
+        dest='exec_mode',
+        action='store',
+        choices={'local'},
+        default='local',
+        help='execution mode (default local)'
+    )
+
+
+class Export(SkyTask):
+    '''
+    stream planet state db, archive and before images into single checksummed snapshot file.
+    runs on host holding state db.
+    '''
+    def __init__(self, all_args=None, runner_cfg=None):
+        SkyTask.__init__(self, all_args, runner_cfg)
+        self.logger = Logger(logging.getLogger(__name__), logging.INFO)
+        self.name = 'state.export'
+        self.args = all_args
+        self.runner_cfg = runner_cfg
+        self.snapshot_file = self.args.get('snapshot_file')
+        self.before_images = self.args.get('before_images')
+
+    def preflight_check(self):
+        return self.preflight_check_result
+
+    def execute(self):
+        db = PlanetStateDb(runner_cfg=self.runner_cfg)
+        bi_store = skybase.actions.state.local.get_bi_store() if self.before_images else None
+        self.result.output = skybase.actions.dbstate.bulk.export_db(db, bi_store, self.snapshot_file)
+        self.result.format = skytask.output_format_json
+        return self.result
@@ -0,0 +1,62 @@
+import os
+import logging
+
+from skybase.skytask import SkyTask
+from skybase.utils.logger import Logger
+from skybase import skytask
+from skybase.actions.dbstate import PlanetStateDb
+import skybase.actions.dbstate.bulk
+import skybase.actions.state.local
+
+
+def state_import_add_arguments(parser):
+
+    parser.add_argument(
+        '-f', '--file',
+        dest='snapshot_file',
+        action='store',
+        required=True,
+        help='snapshot file written by state export'
+    )
+
+    parser.add_argument(
+        '-m', '--mode',
+        dest='exec_mode',
+        action='store',
+        choices={'local'},
+        default='local',
+        help='execution mode (default local)'
+    )
+
+
+class Import(SkyTask):
+    '''
+    verify and load state db snapshot, rebuilding state db indexes in single pass.
+    common --apply option loads snapshot into empty state db; default verifies snapshot
+    checksums only.  runs on host holding state db and snapshot file.
+    '''
+    def __init__(self, all_args=None, runner_cfg=None):
+        SkyTask.__init__(self, all_args, runner_cfg)
+        self.logger = Logger(logging.getLogger(__name__), logging.INFO)
+        self.name = 'state.import'
+        self.args = all_args
+        self.runner_cfg = runner_cfg
+        self.snapshot_file = self.args.get('snapshot_file')
+        self.apply = self.args.get('apply')
+
+    def preflight_check(self):
+        preflight_result = []
+
+        if not os.path.isfile(self.snapshot_file):
+            self.preflight_check_result.status = 'FAIL'
+            preflight_result.append('snapshot file not found: {0}'.format(self.snapshot_file))
+
+        self.preflight_check_result.set_output(preflight_result)
+        return self.preflight_check_result
+
+    def execute(self):
+        db = PlanetStateDb(runner_cfg=self.runner_cfg)
+        bi_store = skybase.actions.state.local.get_bi_store() if self.apply else None
+        self.result.output = skybase.actions.dbstate.bulk.import_db(db, bi_store, self.snapshot_file, apply=self.apply)
+        self.result.format = skytask.output_format_json
+        return self.result
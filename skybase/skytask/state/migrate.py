@@ -0,0 +1,52 @@
+import logging
+
+from skybase.skytask import SkyTask
+from skybase.utils.logger import Logger
+from skybase import skytask
+from skybase.actions.dbstate import PlanetStateDb
+import skybase.actions.dbstate.sqlite
+
+
+def state_migrate_add_arguments(parser):
+
+    parser.add_argument(
+        '-m', '--mode',
+        dest='exec_mode',
+        action='store',
+        choices={'local', 'restapi'},
+        default='restapi',
+        help='execution mode (default REST api)'
+    )
+
+
+class Migrate(SkyTask):
+    '''
+    one-shot migration of planet state records from directory layout to sqlite backend.
+    common --apply option writes records to sqlite database; default reports records
+    to be migrated.
+    '''
+    def __init__(self, all_args=None, runner_cfg=None):
+        SkyTask.__init__(self, all_args, runner_cfg)
+        self.logger = Logger(logging.getLogger(__name__), logging.INFO)
+        self.name = 'state.migrate'
+        self.args = all_args
+        self.runner_cfg = runner_cfg
+        self.apply = self.args.get('apply')
+        self.db = None
+
+    def preflight_check(self):
+        preflight_result = []
+
+        # require destination sqlite file in runner configuration
+        self.db = PlanetStateDb(runner_cfg=self.runner_cfg, backend=PlanetStateDb.SQLITE)
+        if not self.db.sqlite_file:
+            self.preflight_check_result.status = 'FAIL'
+            preflight_result.append('runner service_state.sqlite_file required')
+
+        self.preflight_check_result.set_output(preflight_result)
+        return self.preflight_check_result
+
+    def execute(self):
+        self.result.output = skybase.actions.dbstate.sqlite.migrate_from_directory(self.db, apply=self.apply)
+        self.result.format = skytask.output_format_json
+        return self.result
@@ -15,9 +15,16 @@ def state_read_add_arguments(parser):
     parser.add_argument(
         '-i', '--id',
         dest='skybase_id',
+        action='append',
+        default=None,
+        help='target skybase service registry id; repeat to read several records')
+
+    parser.add_argument(
+        '--prefix',
+        dest='prefix',
         action='store',
-        required=True,
-        help='target skybase service registry id')
+        default=None,
+        help='read all service registry records under /planet[/service] prefix')
 
     parser.add_argument(
         '-f', '--format',
@@ -28,6 +35,24 @@ def state_read_add_arguments(parser):
         help='output format'
     )
 
+    parser.add_argument(
+        '--log-limit',
+        dest='log_limit',
+        action='store',
+        type=int,
+        default=None,
+        help='number of most recent service log entries (default runner service_state.log_tail; 0 for all)'
+    )
+
+    parser.add_argument(
+        '--log-offset',
+        dest='log_offset',
+        action='store',
+        type=int,
+        default=0,
+        help='number of most recent service log entries to skip (default 0)'
+    )
+
     parser.add_argument(
         '-m', '--mode',
         dest='exec_mode',
@@ -47,26 +72,49 @@ class Read(SkyTask):
         self.runner_cfg = runner_cfg
         self.mode = self.args.get('exec_mode')
         self.format = self.args.get('format')
-        self.id = self.args.get('skybase_id')
+        self.ids = self.args.get('skybase_id') or []
+        self.prefix = self.args.get('prefix')
+        self.log_limit = self.args.get('log_limit')
+        self.log_offset = self.args.get('log_offset')
 
     def preflight_check(self):
+        preflight_result = []
+
+        if not (self.ids or self.prefix):
+            self.preflight_check_result.status = 'FAIL'
+            preflight_result.append('--id or --prefix required')
+
+        self.preflight_check_result.set_output(preflight_result)
         return self.preflight_check_result
 
     def execute(self):
 
-        # attempt to read state db record
+        # attempt to read state db record; several records read in single batch request
         try:
-            result = skybase.actions.state.read(
-                mode=self.mode,
-                record_id=self.id,
-                credentials=sky_cfg.SkyConfig.init_from_file('credentials').data,
-                format=self.format
-            )
+            if len(self.ids) == 1 and not self.prefix:
+                result = skybase.actions.state.read(
+                    mode=self.mode,
+                    record_id=self.ids[0],
+                    credentials=sky_cfg.SkyConfig.init_from_file('credentials').data,
+                    format=self.format,
+                    log_limit=self.log_limit,
+                    log_offset=self.log_offset,
+                )
+            else:
+                result = skybase.actions.state.read_many(
+                    mode=self.mode,
+                    record_ids=self.ids,
+                    prefix=self.prefix,
+                    credentials=sky_cfg.SkyConfig.init_from_file('credentials').data,
+                    format=self.format,
+                    log_limit=self.log_limit,
+                    log_offset=self.log_offset,
+                )
         except skybase.exceptions.SkyBaseError as e:
             result = simple_error_format(e)
 
-        # set result output mode; --format default = json
-        if self.format == 'yaml':
+        # set result output mode; --format default = json; batch of records always json
+        if self.format == 'yaml' and len(self.ids) == 1 and not self.prefix:
             self.result.format = skytask.output_format_raw
         else:
             self.result.format = skytask.output_format_json
@@ -4,9 +4,9 @@ import os
 import errno
 from collections import OrderedDict
 
-import yaml
-
 from skybase.utils import dict_from_indexed_list
+from skybase.utils import yamlcache
+from skybase.utils import yamlio
 
 
 class UnsortableList(list):
@@ -21,12 +21,17 @@ class UnsortableOrderedDict(OrderedDict):
 def read_yaml_from_file(yaml_file):
     # Read YAML file and return Dictionary
     with open(yaml_file, 'r') as yf:
-        return yaml.load(yf)
+        return yamlio.load_file_data(yf.read())
+
+def read_cached_yaml_from_file(yaml_file):
+    # Read YAML file read by every CLI run (configs, planets, artiball manifest and service
+    # deployment and app config); served from persistent cache when unchanged
+    return yamlcache.load(yaml_file, yamlio.load_file_data)
 
 def write_dict_to_yaml_file(d, yaml_file):
     # Read YAML file and return Dictionary
     with open(yaml_file, 'w') as yf:
-        yaml.dump(d, yf, default_flow_style=False)
+        yamlio.dump(d, yf)
 
 def getKeyFromDict(dataDict, mapList):
     try:
@@ -0,0 +1,153 @@
+import os
+import time
+import hashlib
+import tempfile
+import cPickle as pickle
+
+from skybase.utils import mkdir_path
+
+# persistent compiled cache for parsed yaml files.  each source file has one pickle
+# sidecar in cache directory holding parsed data plus source path, size, mtime and
+# content digest.  stat match serves sidecar directly; stat mismatch falls back to
+# content digest before re-parsing.  used only for files read by every CLI run (configs,
+# planets, artiball manifest, service deployment and app config) through
+# read_cached_yaml_from_file; state db files are not cached, so sidecars stay bounded by
+# number of config, planet and artiball files.
+#
+# cache directory taken from environment; empty value disables cache
+CACHE_DIR_ENV = 'SKYBASE_YAML_CACHE_DIR'
+DEFAULT_CACHE_DIR = '~/.skybase/cache/yaml'
+CACHE_FORMAT_VERSION = 1
+
+# files modified within this window are verified by digest; mtime granularity too coarse
+MTIME_TRUST_AGE = 2
+
+stats = {
+    'hits': 0,
+    'misses': 0,
+    'errors': 0,
+}
+
+
+def get_cache_dir():
+    cache_dir = os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+    if not cache_dir:
+        return None
+    return os.path.expanduser(cache_dir)
+
+def get_sidecar_filename(cache_dir, yaml_file):
+    key = hashlib.sha1(os.path.abspath(yaml_file)).hexdigest()
+    return os.path.join(cache_dir, key + '.pickle')
+
+def read_sidecar(sidecar):
+    # missing, truncated or incompatible sidecar treated as cache miss
+    try:
+        with open(sidecar, 'rb') as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != CACHE_FORMAT_VERSION:
+        return None
+    return entry
+
+def write_sidecar(cache_dir, sidecar, entry):
+    # write to temp file and rename so concurrent readers never see partial sidecar
+    try:
+        mkdir_path(cache_dir)
+        fd, temp_file = tempfile.mkstemp(dir=cache_dir, prefix='.sidecar-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_file, sidecar)
+        except Exception:
+            os.remove(temp_file)
+            raise
+    except Exception:
+        stats['errors'] += 1
+
+def load(yaml_file, parse):
+    '''
+    return parsed contents of yaml_file using persistent cache when available.
+    parse is called with file contents on cache miss.
+    '''
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        with open(yaml_file, 'r') as yf:
+            return parse(yf.read())
+
+    path = os.path.abspath(yaml_file)
+    sidecar = get_sidecar_filename(cache_dir, path)
+
+    with open(yaml_file, 'r') as yf:
+        st = os.fstat(yf.fileno())
+        entry = read_sidecar(sidecar)
+        if entry and entry['path'] != path:
+            entry = None
+
+        # fast path: unchanged stat signature on file not modified very recently
+        is_stat_trusted = (time.time() - st.st_mtime) > MTIME_TRUST_AGE
+        if entry and is_stat_trusted and (entry['size'], entry['mtime']) == (st.st_size, st.st_mtime):
+            stats['hits'] += 1
+            return entry['data']
+
+        content = yf.read()
+
+    digest = hashlib.sha1(content).hexdigest()
+
+    if entry and entry['digest'] == digest:
+        # contents unchanged (e.g. touched or copied); refresh stat signature
+        stats['hits'] += 1
+        data = entry['data']
+    else:
+        stats['misses'] += 1
+        data = parse(content)
+
+    write_sidecar(cache_dir, sidecar, {
+        'version': CACHE_FORMAT_VERSION,
+        'path': path,
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'digest': digest,
+        'data': data,
+    })
+
+    return data
+
+
+if __name__ == '__main__':
+    # benchmark cold parse vs warm cache load:
+    #   python skybase/utils/yamlcache/__init__.py [yaml_file ...]
+    # defaults to service1 artiball yaml; pass rendered planet yaml as argument
+    import sys
+    import shutil
+    import timeit
+    from skybase.utils import make_temp_directory
+    from skybase.utils import yamlio
+
+    ROUNDS = 200
+
+    examples_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../examples')
+    yaml_files = sys.argv[1:] or [
+        os.path.join(examples_dir, 'service1/skybase/skybase.yaml'),
+        os.path.join(examples_dir, 'service1/skybase/deployment/main_deployment.yaml'),
+        os.path.join(examples_dir, 'service1/skybase/app_config/main_app_config.yaml'),
+    ]
+
+    with make_temp_directory() as temp_dir:
+        os.environ[CACHE_DIR_ENV] = temp_dir
+        for source_file in yaml_files:
+            # age copy of file past mtime trust window so warm loads take stat-only path
+            yaml_file = os.path.join(temp_dir, os.path.basename(source_file))
+            shutil.copy(source_file, yaml_file)
+            aged = time.time() - 2 * MTIME_TRUST_AGE
+            os.utime(yaml_file, (aged, aged))
+
+            cold = timeit.timeit(lambda: yamlio.load(open(yaml_file).read()), number=ROUNDS)
+            load(yaml_file, yamlio.load)
+            warm = timeit.timeit(lambda: load(yaml_file, yamlio.load), number=ROUNDS)
+
+            print '{0}\n\tcold: {1:.3f}ms\twarm: {2:.3f}ms\tspeedup: {3:.1f}x'.format(
+                os.path.normpath(source_file),
+                1000 * cold / ROUNDS,
+                1000 * warm / ROUNDS,
+                cold / warm)
@@ -0,0 +1,112 @@
+import yaml
+
+# single yaml i/o layer for skybase.  prefer libyaml C loader/dumper when PyYAML was
+# built with it; fall back to pure python implementation otherwise.
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CLoader as Loader
+    from yaml import CDumper as Dumper
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader
+    from yaml import SafeDumper
+    from yaml import Loader
+    from yaml import Dumper
+    HAS_LIBYAML = False
+
+# raised by both pure python and libyaml implementations
+from yaml import YAMLError
+from yaml.scanner import ScannerError
+from yaml.parser import ParserError
+
+
+class FileDataLoader(SafeLoader):
+    '''
+    safe loader also accepting python/unicode, python/str and python/tuple tags written by
+    default dumper before yaml i/o moved to safe dumper; all other python tags rejected
+    '''
+
+
+def construct_python_unicode(loader, node):
+    return loader.construct_scalar(node)
+
+def construct_python_str(loader, node):
+    return loader.construct_scalar(node).encode('utf-8')
+
+def construct_python_tuple(loader, node):
+    return tuple(loader.construct_sequence(node))
+
+FileDataLoader.add_constructor(u'tag:yaml.org,2002:python/unicode', construct_python_unicode)
+FileDataLoader.add_constructor(u'tag:yaml.org,2002:python/str', construct_python_str)
+FileDataLoader.add_constructor(u'tag:yaml.org,2002:python/tuple', construct_python_tuple)
+
+
+def load(stream):
+    # parse yaml document containing standard types only
+    return yaml.load(stream, Loader=SafeLoader)
+
+def load_file_data(stream):
+    # parse yaml file written by skybase, including files written by default dumper
+    return yaml.load(stream, Loader=FileDataLoader)
+
+def dump(data, stream=None, **kwargs):
+    # emit standard types as block style yaml; returns string if no stream provided
+    kwargs.setdefault('default_flow_style', False)
+    kwargs.setdefault('Dumper', SafeDumper)
+    return yaml.dump(data, stream, **kwargs)
+
+def load_object(stream):
+    # parse yaml document that may contain python object tags (e.g. serialized ServiceRegistryRecord)
+    return yaml.load(stream, Loader=Loader)
+
+def dump_object(data, stream=None, **kwargs):
+    # emit python objects with python object tags
+    return yaml.dump(data, stream, Dumper=Dumper, **kwargs)
+
+
+if __name__ == '__main__':
+    # benchmark pure python vs libyaml over synthetic planet state db:
+    #   python skybase/utils/yamlio/__init__.py [number_of_resource_files]
+    import os
+    import sys
+    import time
+    from skybase.utils import make_temp_directory, mkdir_path
+
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    def timed(func, *args):
+        start = time.time()
+        func(*args)
+        return time.time() - start
+
+    def write_db(db, dumper):
+        for n in range(record_count):
+            record_dir = os.path.join(db, 'dev-aws-us-west-1', 'service{0}'.format(n / 100), 'tag', 'stack{0}'.format(n % 100))
+            mkdir_path(record_dir)
+            resource = {
+                'cloud': {
+                    'provider': 'aws',
+                    'id': 'arn:aws:cloudformation:us-west-1:123456789012:stack/stack{0}/{1:032x}'.format(n, n),
+                    'name': 'service{0}-tag-stack{1}'.format(n / 100, n % 100),
+                }
+            }
+            with open(os.path.join(record_dir, 'resources.yaml'), 'w') as f:
+                yaml.dump(resource, f, Dumper=dumper, default_flow_style=False)
+
+    def read_db(db, loader):
+        for path, dirs, files in os.walk(db):
+            for name in files:
+                with open(os.path.join(path, name)) as f:
+                    yaml.load(f, Loader=loader)
+
+    implementations = [('python', yaml.SafeLoader, yaml.SafeDumper)]
+    if HAS_LIBYAML:
+        implementations.append(('libyaml', yaml.CSafeLoader, yaml.CSafeDumper))
+
+    print '{0} resource files'.format(record_count)
+    for name, loader, dumper in implementations:
+        with make_temp_directory() as db:
+            write_time = timed(write_db, db, dumper)
+            read_time = timed(read_db, db, loader)
+        print '\t{0}:\twrite {1:.2f}s\tread {2:.2f}s'.format(name, write_time, read_time)
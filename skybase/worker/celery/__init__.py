@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 from skybase import config as sky_cfg
 
@@ -21,3 +22,10 @@ app.conf.update(
     BROKER_URL = worker_cfg.data['BROKER_URL'],
     CELERY_RESULT_BACKEND = worker_cfg.data['CELERY_RESULT_BACKEND'],
 )
+
+
+@worker_process_init.connect
+def build_state_index(**kwargs):
+    # build in-memory planet state db index in each worker process
+    import skybase.actions.dbstate
+    skybase.actions.dbstate.build_state_index()
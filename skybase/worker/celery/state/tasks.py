@@ -37,6 +37,21 @@ def read(self, id, **kwargs):
 
     return result
 
+@app.task(bind=True)
+def read_many(self, record_ids=None, prefix=None, **kwargs):
+
+    try:
+        logger.info('attempt to read state db records ({0}, {1}, {2})'.format(record_ids, prefix, kwargs))
+
+        # attempt to read state db records from local resources
+        result = skybase.actions.state.local.read_many(record_ids, prefix, **kwargs)
+
+    except skybase.exceptions.SkyBaseError as e:
+        logger.info('failed to read ServiceRegistryRecords({0}, {1})'.format(record_ids, prefix))
+        result = simple_error_format(e)
+
+    return result
+
 @app.task(bind=True)
 def update(self, record_id, record_object, **kwargs):
 
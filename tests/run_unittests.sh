@@ -1 +1,3 @@
 #!/usr/bin/env bash
+# run unit tests under tests/ from repository root; extra arguments passed to nose
+cd "$(dirname "$0")/.." && python -m nose tests "$@"
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from skybase.actions.dbstate import bistore
+
+# small segments so rewriting few before images rolls over and compacts segments
+SEGMENT_SIZE = 4096
+
+
+class BeforeImageStoreCompactionTest(unittest.TestCase):
+    '''
+    readers take no store lock; compaction in other writer must not fail reads
+    '''
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.temp_dir, 'bi')
+        self.reader = bistore.BeforeImageStore(self.store_dir, segment_size=SEGMENT_SIZE)
+        # separate store object as used by writer in other process
+        self.writer = bistore.BeforeImageStore(self.store_dir, segment_size=SEGMENT_SIZE)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def put_generation(self, store, keys, generation):
+        for key in keys:
+            store.put(key, '/planet/service/tag', generation, {'key': key, 'generation': generation, 'pad': 'x' * 200})
+
+    def compact_on_first_read(self):
+        '''
+        patch reader so writer rewrites every segment and compacts between reader index
+        lookup and frame read
+        '''
+        keys = ['key{0}'.format(n) for n in range(10)]
+        read_frame = self.reader._read_frame
+        state = {'generation': 0, 'raced': False}
+
+        def racing_read_frame(segment, offset, length):
+            if not state['raced']:
+                state['raced'] = True
+                # live before images rewritten until segment looked up is dead and compacted
+                while os.path.exists(self.reader.get_segment_filename(segment)):
+                    state['generation'] += 1
+                    self.put_generation(self.writer, keys, state['generation'])
+            return read_frame(segment, offset, length)
+
+        self.put_generation(self.writer, keys, 0)
+        return keys, state, mock.patch.object(self.reader, '_read_frame', side_effect=racing_read_frame)
+
+    def test_get_during_compaction(self):
+        keys, state, patcher = self.compact_on_first_read()
+        with patcher as read_frame:
+            value = self.reader.get('key3')
+
+        self.assertEqual(value['key'], 'key3')
+        self.assertEqual(value['generation'], state['generation'])
+        # first read found segment removed; second read at moved location
+        self.assertEqual(read_frame.call_count, 2)
+
+    def test_iter_items_during_compaction(self):
+        keys, state, patcher = self.compact_on_first_read()
+        with patcher:
+            items = list(self.reader.iter_items())
+
+        self.assertEqual(sorted(key for key, record_id, timestamp, value in items), sorted(keys))
+
+    def test_dropped_before_image_not_found(self):
+        self.writer.put('key1', '/planet/service/tag', 1, {'key': 'key1'})
+        row = self.reader._lookup('key1')
+        with self.writer.conn:
+            self.writer.conn.execute('delete from before_images where key = ?', ('key1',))
+        with mock.patch.object(self.reader, '_read_frame', side_effect=IOError(2, 'No such file or directory')):
+            self.assertEqual(self.reader._read_live_frame('key1', row), None)
+
+    def test_concurrent_reads_and_compaction(self):
+        keys = ['key{0}'.format(n) for n in range(20)]
+        self.put_generation(self.writer, keys, 0)
+        errors = []
+        stop = threading.Event()
+
+        def write():
+            try:
+                for generation in range(1, 40):
+                    self.put_generation(self.writer, keys, generation)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                stop.set()
+
+        def read():
+            store = bistore.BeforeImageStore(self.store_dir, segment_size=SEGMENT_SIZE)
+            try:
+                while not stop.is_set():
+                    for key in keys:
+                        self.assertEqual(store.get(key)['key'], key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+
+        self.assertEqual(errors, [])
+        # writer compacted segments while readers ran
+        self.assertTrue(self.writer.list_segments()[0] > 1)
+        self.assertEqual(sorted(self.reader.get(key)['generation'] for key in keys), [39] * len(keys))
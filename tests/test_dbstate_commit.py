@@ -0,0 +1,354 @@
+import os
+import time
+import signal
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+import skybase.exceptions
+from skybase.utils import yamlio
+from skybase.actions.dbstate import PlanetStateDb, RECORD_VERSION_KEY, RECORD_LOCK_SUFFIX, state_index_registry
+from skybase.actions.dbstate import commit
+from skybase.actions.dbstate import servicelog
+from skybase.actions.dbstate import sqlite
+
+# seconds test waits for writer threads
+WAIT_TIMEOUT = 10
+
+
+class RunnerConfig(object):
+    def __init__(self, root, backend):
+        self.data = {'service_state': {
+            'db': os.path.join(root, 'DB'),
+            'archive': os.path.join(root, 'ARCHIVE'),
+            'resources': 'resources.yaml',
+            'backend': backend,
+            'sqlite_file': os.path.join(root, 'planet_state.sq3'),
+        }}
+
+
+def make_record(n, stacks=('stack1', 'stack2'), version=0):
+    service_id = '/planet/service{0}/tag'.format(n)
+    resources = dict((stack, {'cloud': {'provider': 'aws', 'id': 'id-{0}-{1}'.format(n, stack),
+                                        'name': 'name-{0}-{1}'.format(n, stack)}})
+                     for stack in stacks)
+    log_entries = [['2016-01-01 00:00:00.000000', 'DEPLOY', 'service', '1.0', 'b1', 'tag', stack]
+                   for stack in stacks]
+    files = {
+        'metadata.yaml': {'app_version': '1.0', RECORD_VERSION_KEY: version},
+        'blueprint.yaml': {'stacks': dict((stack, {}) for stack in stacks)},
+    }
+    return commit.StagedServiceRecord(service_id, files, resources, log_entries, version_file='metadata.yaml')
+
+
+class CommitTestCase(unittest.TestCase):
+    backend = PlanetStateDb.DIRECTORY
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PlanetStateDb(runner_cfg=RunnerConfig(self.temp_dir, self.backend))
+        self.committer = commit.GroupCommitter()
+
+    def tearDown(self):
+        state_index_registry.invalidate()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def service_path(self, record):
+        return os.path.join(self.db.db, record.service_id.strip('/'))
+
+    def read_file(self, record, filename):
+        with open(os.path.join(self.service_path(record), filename)) as f:
+            return yamlio.load(f)
+
+    def read_log(self, record):
+        return servicelog.read(os.path.join(self.service_path(record), servicelog.FILENAME))[0]
+
+    def list_dir(self, path):
+        try:
+            return sorted(os.listdir(path))
+        except OSError:
+            return []
+
+    def staging_entries(self):
+        # private staging directories and queued records
+        return ([name for name in self.list_dir(self.db.staging)
+                 if name not in [commit.QUEUE_DIRNAME, commit.RESULTS_DIRNAME, commit.COMMIT_LOCK_FILENAME]] +
+                self.list_dir(commit.get_queue_dir(self.db)))
+
+    def service_entries(self, record):
+        return self.list_dir(os.path.dirname(self.service_path(record)))
+
+    def assert_complete(self, record):
+        self.assertEqual(self.read_file(record, 'blueprint.yaml'), record.files['blueprint.yaml'])
+        self.assertEqual(len(self.read_log(record)), len(record.log_entries))
+        self.assertEqual(sorted(self.db.list_stacks(record.service_id)), sorted(record.stacks))
+        self.assertFalse(os.path.exists(os.path.join(self.service_path(record), commit.MANIFEST_FILENAME)))
+
+
+class StagedServiceRecordTest(CommitTestCase):
+
+    def test_new_record_renamed_into_place(self):
+        record = make_record(1)
+        with mock.patch.object(commit, '_replace', wraps=commit._replace) as replace:
+            self.committer.commit(self.db, record)
+
+        # whole staged directory moved into db by single rename
+        replace.assert_called_once_with(record.staging_dir, self.service_path(record))
+        self.assertTrue(record.done)
+        self.assertIsNone(record.error)
+        self.assert_complete(record)
+        for stack, resources in record.stacks.items():
+            if self.backend == PlanetStateDb.DIRECTORY:
+                self.assertEqual(self.read_file(record, os.path.join(stack, self.db.resources)), resources)
+            self.assertEqual(self.db.find_stack_record_id(resources['cloud']['id']),
+                             record.get_stack_record_id(stack))
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_existing_record_merged(self):
+        first = make_record(1, stacks=['stack1', 'stack3'])
+        first.files['extra.yaml'] = {'kept': True}
+        self.committer.commit(self.db, first)
+        second = make_record(1, stacks=['stack1', 'stack2'])
+        with mock.patch.object(commit, 'swap_record', wraps=commit.swap_record) as swap_record:
+            self.committer.commit(self.db, second)
+
+        # merged record swapped in whole: stacks replaced or added, unchanged files and
+        # stacks kept, log appended and record version continued
+        self.assertEqual(swap_record.call_count, 1)
+        self.assertEqual(sorted(self.db.list_stacks(second.service_id)), ['stack1', 'stack2', 'stack3'])
+        self.assertEqual(self.read_file(second, 'extra.yaml'), {'kept': True})
+        self.assertEqual(len(self.read_log(second)), 4)
+        self.assertEqual(self.read_file(second, 'metadata.yaml')[RECORD_VERSION_KEY], 1)
+        self.assertEqual(self.service_entries(second), ['.tag' + RECORD_LOCK_SUFFIX, 'tag'])
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_crash_before_rename_leaves_db_untouched(self):
+        # writer killed after staging record, before moving it into db
+        record = make_record(1)
+        commit.stage_record(self.db, record)
+
+        self.assertFalse(os.path.exists(self.service_path(record)))
+        self.assertEqual(self.db.list_service_ids(), [])
+        self.assertEqual(self.db.find_stack_record_id('id-1-stack1'), None)
+        self.assertEqual(self.staging_entries(), [os.path.basename(record.staging_dir)])
+
+        # recent staging directory may belong to live writer
+        self.assertEqual(commit.cleanup_staging(self.db), 0)
+        self.assertTrue(os.path.isdir(record.staging_dir))
+
+        old = time.time() - commit.STAGING_MAX_AGE - 1
+        os.utime(record.staging_dir, (old, old))
+        self.assertEqual(commit.cleanup_staging(self.db), 1)
+        self.assertEqual(self.staging_entries(), [])
+
+        # same record committed again once writer restarts
+        retry = make_record(1)
+        self.committer.commit(self.db, retry)
+        self.assert_complete(retry)
+
+    def test_failed_install_removes_staging(self):
+        record = make_record(1)
+        with mock.patch.object(commit, 'install_record', side_effect=OSError('disk full')):
+            self.assertRaises(skybase.exceptions.StateDBError, self.committer.commit, self.db, record)
+
+        self.assertIn('disk full', str(record.error))
+        self.assertFalse(os.path.exists(self.service_path(record)))
+        self.assertEqual(self.staging_entries(), [])
+        self.assertEqual(self.list_dir(commit.get_results_dir(self.db)), [])
+
+    def test_crash_between_swap_renames_restores_record(self):
+        first = make_record(1, stacks=['stack1'])
+        self.committer.commit(self.db, first)
+
+        # writer killed after moving live record to backup, before moving merged record in
+        second = make_record(1, stacks=['stack2'])
+        commit.stage_record(self.db, second)
+        commit.queue_record(self.db, second)
+        service_path = self.service_path(first)
+        os.rename(service_path, commit.get_backup_path(service_path))
+
+        # restarted worker restores live record, then commits record left queued
+        commit.cleanup_staging(self.db)
+        self.assertEqual(sorted(self.db.list_stacks(second.service_id)), ['stack1', 'stack2'])
+        self.assertEqual(len(self.read_log(second)), 2)
+        self.assertEqual(self.service_entries(second), ['.tag' + RECORD_LOCK_SUFFIX, 'tag'])
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_crash_after_swap_removes_backup(self):
+        first = make_record(1)
+        self.committer.commit(self.db, first)
+        service_path = self.service_path(first)
+        shutil.copytree(service_path, commit.get_backup_path(service_path))
+
+        commit.cleanup_staging(self.db)
+        self.assertEqual(self.service_entries(first), ['.tag' + RECORD_LOCK_SUFFIX, 'tag'])
+        self.assert_complete(first)
+
+    def test_crash_before_stack_records_written(self):
+        # writer killed after installing record, before writing its stack records
+        record = make_record(1)
+        with mock.patch.object(commit, 'write_stack_records', side_effect=OSError('killed')):
+            self.assertRaises(skybase.exceptions.StateDBError, self.committer.commit, self.db, record)
+        self.assertTrue(os.path.exists(os.path.join(self.service_path(record), commit.MANIFEST_FILENAME)))
+
+        # stack records written from manifest kept in installed record
+        commit.cleanup_staging(self.db)
+        self.assert_complete(record)
+        for stack, resources in record.stacks.items():
+            self.assertEqual(self.db.find_stack_record_id(resources['cloud']['id']), record.get_stack_record_id(stack))
+
+
+class SqliteStagedServiceRecordTest(StagedServiceRecordTest):
+    backend = PlanetStateDb.SQLITE
+
+
+class GroupCommitterTest(CommitTestCase):
+
+    def commit_concurrently(self, first, others):
+        '''
+        commit first record, holding its flush until others queued behind it; return
+        service ids of records in each flush
+        '''
+        batches = []
+        flushing = threading.Event()
+        release = threading.Event()
+        flush = commit.flush
+
+        def held_flush(db, batch):
+            batches.append(sorted(record.service_id for record in batch))
+            if len(batches) == 1:
+                flushing.set()
+                release.wait(WAIT_TIMEOUT)
+            flush(db, batch)
+
+        errors = []
+
+        def writer(record):
+            try:
+                self.committer.commit(self.db, record)
+            except Exception as e:
+                errors.append(e)
+
+        with mock.patch.object(commit, 'flush', side_effect=held_flush):
+            threads = [threading.Thread(target=writer, args=(first,))]
+            threads[0].start()
+            self.assertTrue(flushing.wait(WAIT_TIMEOUT))
+
+            for record in others:
+                threads.append(threading.Thread(target=writer, args=(record,)))
+                threads[-1].start()
+
+            # wait for all other writers to queue behind running flush
+            deadline = time.time() + WAIT_TIMEOUT
+            while time.time() < deadline:
+                if len(self.list_dir(commit.get_queue_dir(self.db))) == 1 + len(others):
+                    break
+                time.sleep(0.01)
+            release.set()
+
+            for thread in threads:
+                thread.join(WAIT_TIMEOUT)
+                self.assertFalse(thread.is_alive())
+
+        return batches, errors
+
+    def test_concurrent_writers_share_flush(self):
+        first = make_record(0)
+        others = [make_record(n) for n in range(1, 9)]
+        batches, errors = self.commit_concurrently(first, others)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(batches, [[first.service_id], sorted(record.service_id for record in others)])
+        self.assertEqual(self.committer.stats, {'flushes': 2, 'records': 9})
+        for record in [first] + others:
+            self.assertTrue(record.done)
+            self.assert_complete(record)
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_failed_record_does_not_fail_batch(self):
+        first = make_record(0)
+        bad = make_record(1)
+        # service directory cannot be created; fails while installing
+        os.makedirs(os.path.join(self.db.db, 'planet'))
+        open(os.path.dirname(self.service_path(bad)), 'w').close()
+        good = make_record(2)
+        batches, errors = self.commit_concurrently(first, [bad, good])
+
+        self.assertEqual(batches[1], sorted([bad.service_id, good.service_id]))
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(bad.error is errors[0])
+        self.assertTrue(isinstance(bad.error, skybase.exceptions.StateDBError))
+        self.assert_complete(good)
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_failed_staging_raises_in_writer(self):
+        record = make_record(1)
+        # not representable by safe dumper
+        record.files['metadata.yaml'] = {'app_version': object()}
+        self.assertRaises(Exception, self.committer.commit, self.db, record)
+
+        self.assertTrue(record.done)
+        self.assertFalse(os.path.exists(self.service_path(record)))
+        self.assertEqual(self.staging_entries(), [])
+
+    def test_writer_processes_share_flush(self):
+        records = [make_record(n) for n in range(6)]
+        pids = []
+
+        # writers forked before commit lock taken; forked lock file descriptor would keep lock
+        start_fd, go_fd = os.pipe()
+        for record in records:
+            pid = os.fork()
+            if pid == 0:
+                status = 2
+                try:
+                    os.read(start_fd, 1)
+                    committer = commit.GroupCommitter()
+                    committer.commit(self.db, record)
+                    status = committer.stats['flushes']
+                finally:
+                    os._exit(status)
+            pids.append(pid)
+
+        # writer processes queue records while commit lock held, as behind running flush
+        with commit.commit_lock(self.db):
+            os.write(go_fd, 'x' * len(records))
+            deadline = time.time() + WAIT_TIMEOUT
+            while time.time() < deadline:
+                if len(self.list_dir(commit.get_queue_dir(self.db))) == len(records):
+                    break
+                time.sleep(0.01)
+        os.close(start_fd)
+        os.close(go_fd)
+
+        # first writer to take lock commits every queued record in single flush
+        statuses = []
+        for pid in pids:
+            deadline = time.time() + WAIT_TIMEOUT
+            while time.time() < deadline:
+                done, status = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    break
+                time.sleep(0.01)
+            else:
+                os.kill(pid, signal.SIGKILL)
+                done, status = os.waitpid(pid, 0)
+            statuses.append(os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1)
+
+        self.assertEqual(sorted(statuses), [0] * (len(records) - 1) + [1])
+        for record in records:
+            self.assert_complete(record)
+        self.assertEqual(self.staging_entries(), [])
+
+
+class SqliteGroupCommitterTest(GroupCommitterTest):
+    backend = PlanetStateDb.SQLITE
+
+    def test_concurrent_writers_share_flush(self):
+        with mock.patch.object(sqlite, '_insert_stack', wraps=sqlite._insert_stack) as insert_stack:
+            super(SqliteGroupCommitterTest, self).test_concurrent_writers_share_flush()
+        self.assertEqual(insert_stack.call_count, 9 * 2)
+        self.assertEqual(sqlite.count_records(self.db, []), 9 * 2)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import skybase.config
+from skybase.utils import yamlio
+from skybase.actions.dbstate import PlanetStateDb, state_index_registry
+from skybase.actions.dbstate import servicelog
+from skybase.actions.dbstate.index import PlanetStateIndex
+from skybase.service.state import ServiceRegistryRecord
+
+SERVICE_ID = '/dev-planet/service/tag'
+STACKS = ['stack1', 'stack2', 'stack3']
+
+
+class ServiceRegistryRecordIOTest(unittest.TestCase):
+    '''
+    service record components read from state db only as accessed
+    '''
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config_dir = os.path.join(self.temp_dir, 'config')
+        os.mkdir(config_dir)
+        with open(os.path.join(config_dir, 'runner.yaml'), 'w') as f:
+            yamlio.dump({'service_state': {
+                'db': os.path.join(self.temp_dir, 'DB'),
+                'archive': os.path.join(self.temp_dir, 'ARCHIVE'),
+                'resources': 'resources.yaml',
+                'backend': PlanetStateDb.DIRECTORY,
+            }}, f)
+
+        patchers = [
+            mock.patch.object(skybase.config, 'CONFIG_DIR', config_dir),
+            mock.patch.dict(os.environ, {'SKYBASE_YAML_CACHE_DIR': ''}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.write_record()
+
+        # every test starts from cold index; readers counted from here
+        state_index_registry.invalidate()
+        self.index_read = self.patch_reader(PlanetStateIndex, 'read')
+        self.log_read = self.patch_reader(servicelog, 'read')
+        self.list_stacks = self.patch_reader(PlanetStateDb, 'list_stacks')
+
+    def tearDown(self):
+        state_index_registry.invalidate()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def patch_reader(self, target, name):
+        # count calls while keeping original behaviour
+        patcher = mock.patch.object(target, name, autospec=True, side_effect=getattr(target, name))
+        reader = patcher.start()
+        self.addCleanup(patcher.stop)
+        return reader
+
+    def write_record(self):
+        db = PlanetStateDb()
+        service_path = os.path.join(db.db, SERVICE_ID.strip('/'))
+        os.makedirs(service_path)
+        with open(os.path.join(service_path, 'metadata.yaml'), 'w') as f:
+            yamlio.dump({'app_name': 'service', 'app_version': '1.0', 'build_id': 'b1',
+                         'source_artiball': 'service_1.0.tar.gz'}, f)
+        with open(os.path.join(service_path, 'blueprint.yaml'), 'w') as f:
+            yamlio.dump({'definition': {'service_name': 'service'},
+                         'stacks': dict((stack, {'roles': {'web': {}}}) for stack in STACKS)}, f)
+        for stack in STACKS:
+            db.write_stack_record(os.path.join(SERVICE_ID, stack),
+                                  {'cloud': {'provider': 'aws', 'id': 'id-' + stack, 'name': 'name-' + stack}})
+        db.append_service_log(SERVICE_ID, [['2016-01-01 00:00:00.000000', 'DEPLOY', 'service', '1.0', 'b1', 'tag']])
+
+    def read_files(self):
+        # basenames of files read through state db index
+        return sorted(os.path.basename(call[0][1]) for call in self.index_read.call_args_list)
+
+    def test_init_reads_nothing(self):
+        ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        self.assertEqual(self.index_read.call_count, 0)
+        self.assertEqual(self.log_read.call_count, 0)
+        self.assertEqual(self.list_stacks.call_count, 0)
+
+    def test_blueprint_only(self):
+        record = ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        self.assertEqual(sorted(record.blueprint.get_stack_roles('stack1')), ['web'])
+        self.assertEqual(sorted(record.blueprint.stacks), STACKS)
+
+        self.assertEqual(self.read_files(), ['blueprint.yaml'])
+        self.assertEqual(self.log_read.call_count, 0)
+        self.assertEqual(self.list_stacks.call_count, 0)
+
+    def test_metadata_only(self):
+        record = ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        self.assertEqual(record.metadata.version, '1.0')
+        self.assertEqual(record.metadata.build, 'b1')
+
+        self.assertEqual(self.read_files(), ['metadata.yaml'])
+        self.assertEqual(self.log_read.call_count, 0)
+        self.assertEqual(self.list_stacks.call_count, 0)
+
+    def test_stack_grain_only(self):
+        record = ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        grains = [record.stacks.stacks[stack].salt_grain_skybase_id for stack in sorted(record.stacks.deployed_stacks)]
+        self.assertEqual(grains, ['skybase:skybase_id:dev-planet-service-tag-{0}*'.format(stack) for stack in STACKS])
+
+        # stack names listed once; stack records not read
+        self.assertEqual(self.list_stacks.call_count, 1)
+        self.assertEqual(self.index_read.call_count, 0)
+        self.assertEqual(self.log_read.call_count, 0)
+
+    def test_output_as_dict(self):
+        record = ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        result = record.output_as_dict()
+        self.assertEqual(sorted(result['stacks']), STACKS)
+        self.assertEqual(result['log']['total'], 1)
+
+        # each component read once, one resources file per stack
+        self.assertEqual(self.read_files(), ['blueprint.yaml', 'metadata.yaml'] + ['resources.yaml'] * len(STACKS))
+        self.assertEqual(self.log_read.call_count, 1)
+        self.assertEqual(self.list_stacks.call_count, 1)
+
+    def test_components_memoized(self):
+        record = ServiceRegistryRecord.init_from_id(SERVICE_ID)
+        record.output_as_dict()
+        record.output_as_dict()
+        record.metadata
+        record.blueprint
+
+        self.assertEqual(self.index_read.call_count, 2 + len(STACKS))
+        self.assertEqual(self.log_read.call_count, 1)
+        self.assertEqual(self.list_stacks.call_count, 1)